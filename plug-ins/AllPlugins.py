@@ -0,0 +1,25 @@
+import sys
+import os
+
+# Maya doesn't put the plug-in folder on the path, the shared mayaPlugins package lives next to this file
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+if PLUGIN_DIR not in sys.path:
+    sys.path.append(PLUGIN_DIR)
+
+from mayaPlugins import bootstrap
+
+# Registers every command in mayaPlugins.bootstrap.COMMANDS, for auto-loading them all at startup in place of the
+# plug-ins one at a time. The plug-in each command lives in is only imported the first time the command runs
+
+edgeCache = bootstrap.lazyImport("mayaPlugins.edgeCache")
+
+
+# Initialize the script plug-in
+def initializePlugin(mobject):
+    bootstrap.register(mobject)
+
+# Uninitialize the script plug-in
+def uninitializePlugin(mobject):
+    bootstrap.deregister(mobject)
+    if bootstrap.isLoaded(edgeCache):
+        edgeCache.clear()
@@ -1,42 +1,122 @@
 import sys
+import os
 import maya.OpenMaya as OpenMaya
 import maya.OpenMayaMPx as OpenMayaMPx
 from maya import cmds
 
+# Maya doesn't put the plug-in folder on the path, the shared mayaPlugins package lives next to this file
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+if PLUGIN_DIR not in sys.path:
+    sys.path.append(PLUGIN_DIR)
+
+from mayaPlugins import bootstrap
+from mayaPlugins import cmdsProfiler
+from mayaPlugins import shadingNetworks
+
+materialRegistry = bootstrap.lazyImport("mayaPlugins.materialRegistry")
+
+cmdsProfiler.register(__name__)
+
 kPluginCmdName = "createLambert"
+kConsolidateCmdName = "consolidateMaterials"
+
+kTypeFlag = "-t"
+kTypeLongFlag = "-type"
+kAttributeFlag = "-at"
+kAttributeLongFlag = "-attribute"
+
+DEFAULT_NAME = "TestLambert"
 
 # Command
 class scriptedCommand(OpenMayaMPx.MPxCommand):
     def __init__(self):
         OpenMayaMPx.MPxCommand.__init__(self)
+        self.modifier = None
         
     # Invoked when the command is run.
+    # Creates a shader and shading group for every name given, all of them in one undoable step.
+    # A name whose definition is already in the scene gets the network that is there
+    def doIt(self,argList):
+        argData = OpenMaya.MArgDatabase(self.syntax(), argList)
+        names = OpenMaya.MStringArray()
+        argData.getObjects(names)
+        node_type = "lambert"
+        if argData.isFlagSet(kTypeFlag):
+            node_type = argData.flagArgumentString(kTypeFlag, 0)
+        # -attribute name value, the value as text so a colour can be "0.5 0.2 0.1" and a string attribute a string
+        values = {}
+        for use in range(argData.numberOfFlagUses(kAttributeFlag)):
+            flagArgs = OpenMaya.MArgList()
+            argData.getFlagArgumentList(kAttributeFlag, use, flagArgs)
+            try:
+                values[flagArgs.asString(0)] = shadingNetworks.parse_value(node_type, flagArgs.asString(0), flagArgs.asString(1))
+            except ValueError as error:
+                cmds.error(str(error))
+
+        specs = [(name, node_type, values) for name in list(names) or [DEFAULT_NAME]]
+        handles, self.modifier = shadingNetworks.create_shaders(specs, materialRegistry.MaterialRegistry())
+        for material, sg in handles:
+            self.appendToResult(material.name())
+            self.appendToResult(sg.name())
+
+    def redoIt(self):
+        self.modifier.doIt()
+
+    def undoIt(self):
+        self.modifier.undoIt()
+
+    def isUndoable(self):
+        return True
+
+class consolidateCommand(OpenMayaMPx.MPxCommand):
+    def __init__(self):
+        OpenMayaMPx.MPxCommand.__init__(self)
+        self.modifier = None
+
+    # Invoked when the command is run.
+    # Merges the shading groups, the ones given or every one in the scene, whose networks are the same
     def doIt(self,argList):
-        create_shadder("TestLambert")
+        argData = OpenMaya.MArgDatabase(self.syntax(), argList)
+        names = OpenMaya.MStringArray()
+        argData.getObjects(names)
+        merged, self.modifier = materialRegistry.consolidate(list(names))
+        print("%d duplicate shading groups merged" % merged)
+        self.setResult(merged)
+
+    def redoIt(self):
+        self.modifier.doIt()
+
+    def undoIt(self):
+        self.modifier.undoIt()
+
+    def isUndoable(self):
+        return True
 
 def create_shadder(name, node_type="lambert"):
-    material = cmds.shadingNode(node_type, name=name, asShader=True)
-    sg = cmds.sets(name="%sSG" % name, empty=True, renderable=True, noSurfaceShader=True)
-    cmds.connectAttr("%s.outColor" % material, "%s.surfaceShader" % sg)
-    return material, sg
+    """Creates one shader and its shading group, or finds the ones already made the same way, returns their names.
+        Many at once are far quicker through shadingNetworks.create_shaders or the createLambert command, which can
+        also undo them"""
+    (material, sg), = shadingNetworks.create_shaders([(name, node_type, None)], materialRegistry.MaterialRegistry())[0]
+    return material.name(), sg.name()
     
-# Creator
-def cmdCreator():
-    return OpenMayaMPx.asMPxPtr( scriptedCommand() )
+# Syntax
+def syntaxCreator():
+    syntax = OpenMaya.MSyntax()
+    syntax.addFlag(kTypeFlag, kTypeLongFlag, OpenMaya.MSyntax.kString)
+    syntax.addFlag(kAttributeFlag, kAttributeLongFlag, OpenMaya.MSyntax.kString, OpenMaya.MSyntax.kString)
+    syntax.makeFlagMultiUse(kAttributeFlag)
+    syntax.setObjectType(OpenMaya.MSyntax.kStringObjects)
+    return syntax
+
+def consolidateSyntaxCreator():
+    syntax = OpenMaya.MSyntax()
+    syntax.setObjectType(OpenMaya.MSyntax.kStringObjects)
+    return syntax
     
 # Initialize the script plug-in
 def initializePlugin(mobject):
-    mplugin = OpenMayaMPx.MFnPlugin(mobject)
-    try:
-        mplugin.registerCommand( kPluginCmdName, cmdCreator )
-    except:
-        sys.stderr.write( "Failed to register command: %s\n" % kPluginCmdName )
-        raise
+    bootstrap.register(mobject, __name__)
 
 # Uninitialize the script plug-in
 def uninitializePlugin(mobject):
-    mplugin = OpenMayaMPx.MFnPlugin(mobject)
-    try:
-        mplugin.deregisterCommand( kPluginCmdName )
-    except:
-        sys.stderr.write( "Failed to unregister command: %s\n" % kPluginCmdName )
\ No newline at end of file
+    bootstrap.deregister(mobject)
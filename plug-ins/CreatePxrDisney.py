@@ -4,160 +4,602 @@ import maya.OpenMaya as OpenMaya
 import maya.OpenMayaMPx as OpenMayaMPx
 from maya import cmds
 
+# Maya doesn't put the plug-in folder on the path, the shared mayaPlugins package lives next to this file
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+if PLUGIN_DIR not in sys.path:
+    sys.path.append(PLUGIN_DIR)
+
+from mayaPlugins import bootstrap
+from mayaPlugins import cmdsProfiler
+from mayaPlugins import pbrTextures
+from mayaPlugins import shadingNetworks
+
+# only imported the first time a command needs them
+texConversion = bootstrap.lazyImport("mayaPlugins.texConversion")
+imageHeaders = bootstrap.lazyImport("mayaPlugins.imageHeaders")
+textureProxies = bootstrap.lazyImport("mayaPlugins.textureProxies")
+materialRegistry = bootstrap.lazyImport("mayaPlugins.materialRegistry")
+texturePaths = bootstrap.lazyImport("mayaPlugins.texturePaths")
+from mayaPlugins.pbrTextures import (BASE_COLOR, EMIT_COLOR, METALLIC, SPECULAR, ROUGHNESS, BUMP_NORMAL, DISPLACEMENT, ORM,
+                                     IMAGE_TYPE_NAMES)
+
 # Brian Royston
 # 2021
 
+cmdsProfiler.register(__name__)
+
 
 kPluginCmdName = "createDisney"
+kSwapCmdName = "swapDisneyTextures"
+kRelinkCmdName = "relinkTextures"
 
-BASE_COLOR = 0
-EMIT_COLOR = 1
-METALLIC = 2
-SPECULAR = 3
-ROUGHNESS = 4
-BUMP_NORMAL = 5
-DISPLACEMENT = 6 
-
-NUM_IMAGE_TYPES = 7
-
-IMAGE_KEY_WORDS = {
-    BASE_COLOR : {"col", "diff"},
-    EMIT_COLOR : {"emit", "emission", "glow"},
-    METALLIC : {"metal"},
-    SPECULAR : {"specular"},
-    ROUGHNESS : {"rough"},
-    BUMP_NORMAL : {"bump", "nor"},
-    DISPLACEMENT : {"disp"},
-}
-
-IMAGE_TYPE_NAMES = {
-    BASE_COLOR : "Base",
-    EMIT_COLOR : "Emit",
-    METALLIC : "Metal",
-    SPECULAR : "Specular",
-    ROUGHNESS : "Rough",
-    BUMP_NORMAL : "Bump",
-    DISPLACEMENT : "Disp",
-}
+kRootFlag = "-r"
+kRootLongFlag = "-root"
+kReferenceFlag = "-ref"
+kReferenceLongFlag = "-reference"
+kWorkersFlag = "-w"
+kWorkersLongFlag = "-workers"
+kManifestFlag = "-m"
+kManifestLongFlag = "-manifest"
+kTexFlag = "-tx"
+kTexLongFlag = "-tex"
+kConverterFlag = "-c"
+kConverterLongFlag = "-converter"
+kProxyFlag = "-px"
+kProxyLongFlag = "-proxy"
+kFullFlag = "-f"
+kFullLongFlag = "-full"
+kSearchRootFlag = "-sr"
+kSearchRootLongFlag = "-searchRoot"
+kCheckFlag = "-ck"
+kCheckLongFlag = "-check"
+
+# what a file node showing a proxy keeps, the texture it renders with and the image its proxy was made from
+FULL_PATH_ATTRIBUTE = ("createDisneyFullPath", "cdfp")
+SOURCE_PATH_ATTRIBUTE = ("createDisneySourcePath", "cdsp")
+# node type -> the attribute holding its texture path, what relinkTextures checks
+TEXTURE_PATH_ATTRIBUTES = {"file" : "fileTextureName", "PxrBump" : "filename", "PxrNormalMap" : "filename"}
+
+# the place2dTexture attribute -> file attribute connections of every file node
+PLACE2D_CONNECTIONS = [
+    ("coverage", "coverage"),
+    ("mirrorU", "mirrorU"),
+    ("mirrorV", "mirrorV"),
+    ("noiseUV", "noiseUV"),
+    ("offset", "offset"),
+    ("outUV", "uvCoord"),
+    ("outUvFilterSize", "uvFilterSize"),
+    ("repeatUV", "repeatUV"),
+    ("rotateFrame", "rotateFrame"),
+    ("rotateUV", "rotateUV"),
+    ("stagger", "stagger"),
+    ("translateFrame", "translateFrame"),
+    ("vertexCameraOne", "vertexCameraOne"),
+    ("vertexUvOne", "vertexUvOne"),
+    ("vertexUvThree", "vertexUvThree"),
+    ("vertexUvTwo", "vertexUvTwo"),
+    ("wrapU", "wrapU"),
+    ("wrapV", "wrapV"),
+]
+
+# data maps are read as they are, with no colour transform
+RAW = "raw"
+# the image types that hold data rather than colour, and the ones of those read through outAlpha
+DATA_TYPES = {METALLIC, SPECULAR, ROUGHNESS, BUMP_NORMAL, DISPLACEMENT, ORM}
+ALPHA_TYPES = {METALLIC, SPECULAR, ROUGHNESS, DISPLACEMENT}
 
 # Command
 class scriptedCommand(OpenMayaMPx.MPxCommand):
     def __init__(self):
         OpenMayaMPx.MPxCommand.__init__(self)
+        self.modifiers = []
         
     # Invoked when the command is run.
+    # With -root every texture set under the folder is built in one go, otherwise a dialog asks for one folder
+    def doIt(self,argList):
+        argData = OpenMaya.MArgDatabase(self.syntax(), argList)
+        if not argData.isFlagSet(kRootFlag):
+            self.modifiers = build_network()
+            return
+        root = argData.flagArgumentString(kRootFlag, 0)
+        reference = None
+        if argData.isFlagSet(kReferenceFlag):
+            reference = argData.flagArgumentString(kReferenceFlag, 0)
+        workers = None
+        if argData.isFlagSet(kWorkersFlag):
+            workers = argData.flagArgumentInt(kWorkersFlag, 0)
+        manifest = None
+        if argData.isFlagSet(kManifestFlag):
+            manifest = argData.flagArgumentString(kManifestFlag, 0)
+        # -converter on its own implies -tex
+        converter = None
+        if argData.isFlagSet(kConverterFlag):
+            converter = argData.flagArgumentString(kConverterFlag, 0)
+        convert = argData.isFlagSet(kTexFlag) or converter is not None
+        proxy_size = 0
+        if argData.isFlagSet(kProxyFlag):
+            proxy_size = argData.flagArgumentInt(kProxyFlag, 0) or textureProxies.DEFAULT_PROXY_SIZE
+        materials, self.modifiers = build_library(root, reference, workers, manifest, convert, converter, proxy_size)
+        for material in materials:
+            self.appendToResult(material)
+
+    def redoIt(self):
+        for modifier in self.modifiers:
+            modifier.doIt()
+
+    def undoIt(self):
+        for modifier in reversed(self.modifiers):
+            modifier.undoIt()
+
+    # a referenced library is written to disk, which can't be undone
+    def isUndoable(self):
+        return len(self.modifiers) > 0
+
+class swapCommand(OpenMayaMPx.MPxCommand):
+    def __init__(self):
+        OpenMayaMPx.MPxCommand.__init__(self)
+        self.modifiers = []
+
+    # Invoked when the command is run.
+    # Points every file node createDisney -proxy made at its proxy, -proxy, or its full resolution texture, -full
     def doIt(self,argList):
-        build_network()
+        argData = OpenMaya.MArgDatabase(self.syntax(), argList)
+        if argData.isFlagSet(kProxyFlag) == argData.isFlagSet(kFullFlag):
+            cmds.error("%s needs one of -proxy or -full" % kSwapCmdName)
+        size = 0
+        if argData.isFlagSet(kProxyFlag):
+            size = argData.flagArgumentInt(kProxyFlag, 0) or textureProxies.DEFAULT_PROXY_SIZE
+        swapped, self.modifiers = swap_textures(size)
+        self.setResult(swapped)
 
-def create_place2d(name):
-    place2d_node = cmds.shadingNode("place2dTexture", name=name, asTexture=True) # creates node
+    def redoIt(self):
+        for modifier in self.modifiers:
+            modifier.doIt()
+
+    def undoIt(self):
+        for modifier in reversed(self.modifiers):
+            modifier.undoIt()
+
+    def isUndoable(self):
+        return len(self.modifiers) > 0
+
+class relinkCommand(OpenMayaMPx.MPxCommand):
+    def __init__(self):
+        OpenMayaMPx.MPxCommand.__init__(self)
+        self.modifiers = []
+
+    # Invoked when the command is run.
+    # Points the texture paths that are missing at where they are now under the search roots, or with -check only
+    # lists them. Returns the paths still missing
+    def doIt(self,argList):
+        argData = OpenMaya.MArgDatabase(self.syntax(), argList)
+        roots = []
+        for use in range(argData.numberOfFlagUses(kSearchRootFlag)):
+            flagArgs = OpenMaya.MArgList()
+            argData.getFlagArgumentList(kSearchRootFlag, use, flagArgs)
+            roots.append(flagArgs.asString(0))
+        workers = None
+        if argData.isFlagSet(kWorkersFlag):
+            workers = argData.flagArgumentInt(kWorkersFlag, 0)
+        missing, self.modifiers = relink_textures(roots, workers, argData.isFlagSet(kCheckFlag))
+        for path in missing:
+            self.appendToResult(path)
+
+    def redoIt(self):
+        for modifier in self.modifiers:
+            modifier.doIt()
+
+    def undoIt(self):
+        for modifier in reversed(self.modifiers):
+            modifier.undoIt()
+
+    def isUndoable(self):
+        return len(self.modifiers) > 0
+
+def create_place2d(builder, name):
+    place2d_node = builder.create("place2dTexture", name, shadingNetworks.TEXTURE) # creates node
     return place2d_node
 
-def create_file(name, filepath, place2d):
-    file_node = cmds.shadingNode("file", name=name, asTexture=True) # creates node
-
-    cmds.setAttr("%s.fileTextureName" % file_node, filepath, type = "string") #sets filepath
-
-    # connecting it to the place2dd
-    cmds.connectAttr("%s.coverage" % place2d, "%s.coverage" % file_node)
-    cmds.connectAttr("%s.mirrorU" % place2d, "%s.mirrorU" % file_node)
-    cmds.connectAttr("%s.mirrorV" % place2d, "%s.mirrorV" % file_node)
-    cmds.connectAttr("%s.noiseUV" % place2d, "%s.noiseUV" % file_node)
-    cmds.connectAttr("%s.offset" % place2d, "%s.offset" % file_node)
-    cmds.connectAttr("%s.outUV" % place2d, "%s.uvCoord" % file_node)
-    cmds.connectAttr("%s.outUvFilterSize" % place2d, "%s.uvFilterSize" % file_node)
-    cmds.connectAttr("%s.repeatUV" % place2d, "%s.repeatUV" % file_node)
-    cmds.connectAttr("%s.rotateFrame" % place2d, "%s.rotateFrame" % file_node)
-    cmds.connectAttr("%s.rotateUV" % place2d, "%s.rotateUV" % file_node)
-    cmds.connectAttr("%s.stagger" % place2d, "%s.stagger" % file_node)
-    cmds.connectAttr("%s.translateFrame" % place2d, "%s.translateFrame" % file_node)
-    cmds.connectAttr("%s.vertexCameraOne" % place2d, "%s.vertexCameraOne" % file_node)
-    cmds.connectAttr("%s.vertexUvOne" % place2d, "%s.vertexUvOne" % file_node)
-    cmds.connectAttr("%s.vertexUvThree" % place2d, "%s.vertexUvThree" % file_node)
-    cmds.connectAttr("%s.vertexUvTwo" % place2d, "%s.vertexUvTwo" % file_node)
-    cmds.connectAttr("%s.wrapU" % place2d, "%s.wrapU" % file_node)
-    cmds.connectAttr("%s.wrapV" % place2d, "%s.wrapV" % file_node)
+def create_file(builder, name, filepath, place2d):
+    file_node = builder.create("file", name, shadingNetworks.TEXTURE) # creates node
+
+    builder.set_string(file_node, "fileTextureName", filepath) #sets filepath
+    if "<UDIM>" in filepath:
+        builder.set_int(file_node, "uvTilingMode", 3) # UDIM (Mari)
+
+    # connecting it to the place2d
+    for place2d_attribute, file_attribute in PLACE2D_CONNECTIONS:
+        builder.connect(place2d, place2d_attribute, file_node, file_attribute)
     return file_node
 
-def create_lambert(name):
-    lambert = cmds.shadingNode("lambert", name=name, asShader=True)
+def create_lambert(builder, name):
+    lambert = builder.create("lambert", name, shadingNetworks.SHADER)
     return lambert
 
-def create_disney(name):
-    material = cmds.shadingNode("PxrDisney", name=name, asShader=True) # creates node
-    lambert = create_lambert("%s_Lambert" %name)
-    sg = cmds.sets(name="%sSG" % name, empty=True, renderable=True, noSurfaceShader=True) # creates SG to attatch to
-    cmds.connectAttr("%s.outColor" % lambert, "%s.surfaceShader" % sg) # attaches to SG
-    cmds.connectAttr("%s.outColor" % material, "%s.rman__surface" % sg) # attaches to SG
-    return material, sg 
+def create_disney(builder, name):
+    material = builder.create("PxrDisney", name, shadingNetworks.SHADER) # creates node
+    lambert = create_lambert(builder, "%s_Lambert" %name)
+    sg = builder.shading_group("%sSG" % name) # creates SG to attatch to
+    builder.connect(lambert, "outColor", sg, "surfaceShader") # attaches to SG
+    builder.connect(material, "outColor", sg, "rman__surface") # attaches to SG
+    return material, sg, lambert
+
+
+def color_space_candidates():
+    """The input colour space names for each encoding, the first one the scene's OCIO config has is used: Maya's legacy
+        config, its OCIO v2 config and ACES. Keyed by imageHeaders' encodings, so made here rather than when the
+        plug-in loads, which would import imageHeaders with it"""
+    return {
+        imageHeaders.SRGB : ["sRGB", "sRGB Encoded Rec.709 (sRGB)", "Utility - sRGB - Texture"],
+        imageHeaders.LINEAR : ["scene-linear Rec 709/sRGB", "scene-linear Rec.709-sRGB", "Utility - Linear - sRGB"],
+        RAW : ["Raw", "Utility - Raw"],
+    }
 
+def input_color_spaces():
+    """Returns encoding -> the colour space the scene's OCIO config has for it, leaving out the ones it has none for"""
+    names = set(cmds.colorManagementPrefs(query = True, inputSpaceNames = True) or [])
+    color_spaces = {}
+    for encoding, candidates in color_space_candidates().items():
+        for name in candidates:
+            if name in names:
+                color_spaces[encoding] = name
+                break
+    return color_spaces
 
-def link_file(sg, file_node, disney_node, image_type, fileName):
+def set_color_space(builder, file_node, image_type, info, color_spaces):
+    """Sets a file node's colour space from its role, data maps are raw and colour maps follow their header, and uses
+        the luminance as alpha for the single value maps with no alpha channel. Without a header the colour maps are
+        left to the file rules"""
+    encoding = RAW if image_type in DATA_TYPES else info.encoding if info else None
+    if encoding in color_spaces:
+        builder.set_string(file_node, "colorSpace", color_spaces[encoding])
+        builder.set_bool(file_node, "ignoreColorSpaceFileRules", True)
+    if image_type in ALPHA_TYPES and info is not None:
+        builder.set_bool(file_node, "alphaIsLuminance", not info.alpha)
+
+def link_file(builder, sg, file_node, disney_node, image_type, fileName, info = None):
     if image_type is BASE_COLOR:
-        cmds.connectAttr("%s.outColor" % file_node, "%s.baseColor" % disney_node)
+        builder.connect(file_node, "outColor", disney_node, "baseColor")
     elif image_type is EMIT_COLOR:
-        cmds.connectAttr("%s.outColor" % file_node, "%s.emitColor" % disney_node)
+        builder.connect(file_node, "outColor", disney_node, "emitColor")
     elif image_type is METALLIC: 
-        cmds.connectAttr("%s.outAlpha" % file_node, "%s.metallic" % disney_node)
+        builder.connect(file_node, "outAlpha", disney_node, "metallic")
     elif image_type is SPECULAR: 
-        cmds.connectAttr("%s.outAlpha" % file_node, "%s.specular" % disney_node)
+        builder.connect(file_node, "outAlpha", disney_node, "specular")
     elif image_type is ROUGHNESS: 
-        cmds.connectAttr("%s.outAlpha" % file_node, "%s.roughness" % disney_node)
+        builder.connect(file_node, "outAlpha", disney_node, "roughness")
+    elif image_type is ORM:
+        # occlusion in red is left out, PxrDisney has no input for it
+        builder.connect(file_node, "outColorG", disney_node, "roughness")
+        builder.connect(file_node, "outColorB", disney_node, "metallic")
     elif image_type is BUMP_NORMAL:  
-        cmds.connectAttr("%s.resultN" % file_node, "%s.bumpNormal" % disney_node)   
+        builder.connect(file_node, "resultN", disney_node, "bumpNormal")
     elif image_type is DISPLACEMENT: 
-        disp = cmds.shadingNode("PxrDisplace", name= "%s_Disp" % fileName, asShader=True) # creates node
-        cmds.connectAttr("%s.outAlpha" % file_node, "%s.dispScalar" % disp)    
-        cmds.setAttr("%s.dispAmount" % disp, 0.1) 
-        cmds.connectAttr("%s.outColor" % disp, "%s.displacementShader" % sg) 
+        disp = builder.create("PxrDisplace", "%s_Disp" % fileName, shadingNetworks.SHADER) # creates node
+        builder.connect(file_node, "outAlpha", disp, "dispScalar")
+        # float displacement is in scene units already, 8 and 16 bit maps only go from 0 to 1
+        builder.set_float(disp, "dispAmount", 1.0 if info is not None and info.floating else 0.1)
+        builder.connect(disp, "outColor", sg, "displacementShader")
+        return disp
 
 def build_network():
+    """Builds the network for a folder picked in a dialog, returns the modifiers that made it"""
     filepath = cmds.fileDialog2(caption = "Select the folder of the PBR", okCaption = "Select", fileMode = 2, startingDirectory = cmds.workspace(rd =True, q=True, dir=True ))[0]
-    fileName = filepath[filepath.rfind("/"):]
+    # a node name from the folder's, the builder renames nodes to it as it is
+    fileName = pbrTextures.set_name(filepath, filepath)
     print(filepath)
     print(fileName)
-    place2d_node = create_place2d("%s_Place2D" % fileName)
-    disney_node, sg = create_disney(fileName)
-    for file in os.listdir(filepath):
-        if file.endswith(".tex"):
+    files, sub_folders, stats = pbrTextures.scan_folder(filepath)
+    headers = imageHeaders.read_headers([path for image_type, path in files])
+    builder = shadingNetworks.NetworkBuilder()
+    build_texture_set(builder, fileName, files, headers, input_color_spaces(), registry = materialRegistry.MaterialRegistry())
+    return [builder.doIt()]
+
+def texture_set_key(files, headers = None, color_spaces = None, proxies = None):
+    """The definition hash of a texture set's network: its textures and what their headers and proxies change"""
+    textures = []
+    for (image_type, path), info, proxy in zip(files, headers or [None] * len(files), proxies or [None] * len(files)):
+        header = (info.channels, info.floating, info.alpha, info.encoding) if info is not None else None
+        textures.append((IMAGE_TYPE_NAMES[image_type], os.path.abspath(path).replace("\\", "/"), header, proxy is not None))
+    return materialRegistry.definition_key("PxrDisney", textures, color_spaces or {})
+
+def build_texture_set(builder, fileName, files, headers = None, color_spaces = None, proxies = None, registry = None):
+    """Queues the PxrDisney network for one folder's classified (image type, path) files on a NetworkBuilder, returns
+        every node of the network and whether it queued them. The image headers, when there are any, pick the colour spaces and tell a height bump
+        map from an RGB normal map. The file nodes given a (proxy, source) show the proxy and keep both full paths.
+        Given a materialRegistry.MaterialRegistry, a set already made the same way returns the nodes of that network
+        instead, the shading group and PxrDisney first, which whatever made it owns, and a new one is stamped for the
+        next time"""
+    key = texture_set_key(files, headers, color_spaces, proxies) if registry else None
+    if registry and registry.find(key) is not None:
+        return registry.network(key), False
+    place2d_node = create_place2d(builder, "%s_Place2D" % fileName)
+    disney_node, sg, lambert = create_disney(builder, fileName)
+    nodes = [place2d_node, disney_node, lambert, sg]
+    for (best_image_type, path), info, proxy in zip(files, headers or [None] * len(files), proxies or [None] * len(files)):
+        if best_image_type == BUMP_NORMAL and info is not None and info.channels >= 3:
+            file_node = builder.create("PxrNormalMap", "%s_Normal" % fileName, shadingNetworks.TEXTURE) # creates node
+            builder.set_string(file_node, "filename", path)
+        elif best_image_type == BUMP_NORMAL:
+            file_node = builder.create("PxrBump", "%s_Bump" % fileName, shadingNetworks.TEXTURE) # creates node
+            builder.set_string(file_node, "filename", path)
+            builder.set_float(file_node, "scale", 0.1)
+        else:
+            file_node = create_file(builder, fileName + "_File_" + IMAGE_TYPE_NAMES[best_image_type], proxy[0] if proxy else path, place2d_node)
+            set_color_space(builder, file_node, best_image_type, info, color_spaces or {})
+            if proxy:
+                # only file nodes get proxies, the viewport doesn't draw the RenderMan bump and normal nodes
+                builder.add_string(file_node, FULL_PATH_ATTRIBUTE[0], FULL_PATH_ATTRIBUTE[1], path)
+                builder.add_string(file_node, SOURCE_PATH_ATTRIBUTE[0], SOURCE_PATH_ATTRIBUTE[1], proxy[1])
+        nodes.append(file_node)
+        disp = link_file(builder, sg, file_node, disney_node, best_image_type, fileName, info)
+        if disp:
+            nodes.append(disp)
+    if registry:
+        registry.add(builder, key, disney_node, sg)
+    return nodes, True
+
+def build_library(root, reference = None, workers = None, manifest = None, convert = False, converter = None, proxy_size = 0):
+    """Builds a PxrDisney network for every texture set under root. The folders are walked and the files classified
+        in threads first, then every network is queued on one NetworkBuilder and made in a single doIt with the
+        viewport refresh suspended.
+        A manifest, root/.createDisney.json unless another path is given, records every set's file stats and nodes, so
+        a repeat run only rebuilds the sets whose files changed and deletes the ones whose folders are gone.
+        Given a reference path the networks are exported there and referenced back in, that file is written whole
+        so any change rebuilds all of it. With convert every source image is converted to .tex first, see
+        convert_textures. The headers of the sets being built are read in threads to set up their file nodes.
+        With a proxy size the file nodes show downsampled proxies, see make_proxies, until swapDisneyTextures -full.
+        Returns the PxrDisney nodes and the modifiers to undo the build with, none when referenced"""
+    if not os.path.isdir(root):
+        cmds.error("No such folder: %s" % root)
+    print("// createDisney //")
+    manifest = manifest or os.path.join(root, pbrTextures.MANIFEST_NAME)
+    previous = pbrTextures.load_manifest(manifest)
+    texture_sets = pbrTextures.find_texture_sets(root, workers)
+    print("%d texture sets found under %s" % (len(texture_sets), root))
+    if convert:
+        convert_textures(texture_sets, converter, workers)
+    for texture_set in texture_sets:
+        texture_set.proxy_size = proxy_size
+
+    if reference:
+        namespace = os.path.splitext(os.path.basename(reference))[0]
+        unchanged = len(previous) == len(texture_sets) and all(pbrTextures.is_unchanged(texture_set, previous.get(texture_set.folder)) for texture_set in texture_sets)
+        if unchanged and is_referenced(reference):
+            print("Nothing changed, %s is up to date" % reference)
+            return ["%s:%s" % (namespace, previous[texture_set.folder]["nodes"][1]) for texture_set in texture_sets], []
+        if is_referenced(reference):
+            cmds.file(reference, removeReference = True)
+        previous = {}
+
+    # stale networks go first so the rebuilt ones can take their names
+    stale = shadingNetworks.NetworkBuilder()
+    builder = shadingNetworks.NetworkBuilder()
+    reused = {}
+    changed = []
+    deleted = []
+    for texture_set in texture_sets:
+        entry = previous.pop(texture_set.folder, None)
+        if pbrTextures.is_unchanged(texture_set, entry) and cmds.objExists(entry["nodes"][1]):
+            reused[texture_set.folder] = entry
             continue
-        best_image_type = -1
-        largest_index = -1
-        for image_type in range(NUM_IMAGE_TYPES):
-            for keyWord in IMAGE_KEY_WORDS[image_type]:  
-                indexFound = file.lower().find(keyWord)       
-                if indexFound > largest_index:
-                    best_image_type = image_type
-                    largest_index = indexFound
-                    continue     
-        if best_image_type >= 0:
-            if best_image_type == BUMP_NORMAL:
-                file_node =  cmds.shadingNode("PxrBump", name= "%s_Bump" % fileName, asTexture=True) # creates node
-                cmds.setAttr("%s.filename" % file_node, filepath + "/" + file, type = "string") 
-                cmds.setAttr("%s.scale" % file_node, 0.1) 
-            else:
-                file_node = create_file(fileName + "_File_" + IMAGE_TYPE_NAMES[best_image_type], filepath + "/" + file, place2d_node)
-            link_file(sg, file_node, disney_node, best_image_type, fileName)
+        # a network reused from elsewhere is left to whatever made it
+        if entry is not None and entry.get("owned", True):
+            deleted += entry["nodes"]
+        changed.append(texture_set)
+    # what is left had its folder removed, or emptied of textures
+    for entry in previous.values():
+        if entry.get("owned", True):
+            deleted += entry["nodes"]
+    stale.delete(deleted)
+    # networks already in the scene are reused, unless they are about to go or the library is written out whole
+    registry = None if reference else materialRegistry.MaterialRegistry(exclude = deleted)
+
+    imageHeaders.read_texture_sets(changed, workers)
+    if proxy_size:
+        make_proxies(changed, proxy_size, workers)
+    color_spaces = input_color_spaces()
+    networks = {}
+    for texture_set in changed:
+        networks[texture_set.folder] = build_texture_set(builder, texture_set.name, texture_set.files, texture_set.headers,
+                                                         color_spaces, texture_set.proxies, registry)
+
+    cmds.refresh(suspend = True)
+    try:
+        modifiers = [stale.doIt(), builder.doIt()]
+    finally:
+        cmds.refresh(suspend = False)
+    print("%d texture sets built, %d unchanged" % (len(networks), len(reused)))
+
+    materials = []
+    nodes = []
+    built = {}
+    for texture_set in texture_sets:
+        if texture_set.folder in reused:
+            built[texture_set.folder] = reused[texture_set.folder]
+        else:
+            network, owned = networks[texture_set.folder]
+            network = [node.name() for node in network]
+            if owned:
+                nodes += network
+            built[texture_set.folder] = pbrTextures.manifest_entry(texture_set, network, owned)
+        materials.append(built[texture_set.folder]["nodes"][1])
+
+    try:
+        pbrTextures.save_manifest(manifest, built)
+    except OSError as error:
+        # a read only library still builds, it just can't skip anything next time
+        cmds.warning("Could not write the manifest %s: %s" % (manifest, error))
+
+    if reference and nodes:
+        write_reference(nodes, reference)
+        return ["%s:%s" % (namespace, material) for material in materials], []
+    return materials, modifiers
+
+def convert_textures(texture_sets, converter = None, workers = None):
+    """Converts the source images without an up to date .tex beside them in a pool of converter processes, so
+        RenderMan doesn't convert them on every render, and points the texture sets at the .tex files.
+        A failed conversion is a warning and leaves that texture on its source image"""
+    command = texConversion.converter_command(converter)
+    if command is None:
+        cmds.error("No texture converter found, give one with -converter or %s" % texConversion.CONVERTER_VARIABLE)
+    ran, failures = texConversion.convert_texture_sets(texture_sets, command, workers)
+    for source, error in failures:
+        cmds.warning("Could not convert %s: %s" % (source, error))
+    print("%d textures converted to .tex, %d failed" % (ran - len(failures), len(failures)))
+
+def resizer_command():
+    """The proxy resizer's argument list, a command error if there is none or it would make full size proxies"""
+    try:
+        command = textureProxies.proxy_command()
+    except ValueError as error:
+        cmds.error(str(error))
+    if command is None:
+        cmds.error("No image resizer found for the proxies, give one with %s" % textureProxies.PROXY_COMMAND_VARIABLE)
+    return command
+
+def make_proxies(texture_sets, size, workers = None):
+    """Makes or reuses downsampled proxies of the texture sets' source images in the local proxy cache and sets the
+        sets' proxies. The viewport then loads a few megabytes where the full textures take gigabytes. A texture a
+        proxy can't be made for is a warning and shows at full resolution"""
+    command = resizer_command()
+    sources = [source for texture_set in texture_sets for source in texture_set.sources]
+    headers = [info for texture_set in texture_sets for info in texture_set.headers]
+    proxies, failures = textureProxies.make_proxies(sources, command, size, headers = headers, workers = workers)
+    for source, error in failures:
+        cmds.warning("Could not make a proxy of %s: %s" % (source, error))
+    for texture_set in texture_sets:
+        texture_set.proxies = [(proxies[source], source) if source in proxies else None for source in texture_set.sources]
+    print("%d proxies in %s" % (len(proxies), textureProxies.cache_folder()))
+
+def swap_textures(size = 0, workers = None):
+    """Points the file nodes createDisney made proxies for at proxies of size, made again if they were evicted, or
+        at their full resolution textures when size is 0. Returns how many were swapped and the modifiers to undo it"""
+    nodes = cmds.ls("*.%s" % FULL_PATH_ATTRIBUTE[0], recursive = True, objectsOnly = True) or []
+    selection = OpenMaya.MSelectionList()
+    for node in nodes:
+        selection.add(node)
+    file_nodes = []
+    full_paths = []
+    sources = []
+    for i in range(selection.length()):
+        node = OpenMaya.MObject()
+        selection.getDependNode(i, node)
+        function = OpenMaya.MFnDependencyNode(node)
+        file_nodes.append(shadingNetworks.Node(function.typeName(), node))
+        full_paths.append(function.findPlug(FULL_PATH_ATTRIBUTE[0]).asString())
+        sources.append(function.findPlug(SOURCE_PATH_ATTRIBUTE[0]).asString())
+
+    paths = full_paths
+    if size:
+        command = resizer_command()
+        proxies, failures = textureProxies.make_proxies(sources, command, size, headers = imageHeaders.read_headers(sources, workers), workers = workers)
+        for source, error in failures:
+            cmds.warning("Could not make a proxy of %s: %s" % (source, error))
+        paths = [proxies.get(source, full_path) for source, full_path in zip(sources, full_paths)]
+
+    builder = shadingNetworks.NetworkBuilder()
+    for file_node, path in zip(file_nodes, paths):
+        builder.set_string(file_node, "fileTextureName", path)
+    cmds.refresh(suspend = True)
+    try:
+        modifier = builder.doIt()
+    finally:
+        cmds.refresh(suspend = False)
+    return len(file_nodes), [modifier]
+
+def texture_paths():
+    """Returns (Node, attribute, path) for every texture path in the scene: those of the file, PxrBump and
+        PxrNormalMap nodes and the full and source paths kept by the file nodes showing proxies"""
+    # the RenderMan types only exist with RenderMan loaded, and ls with no type lists everything
+    known = set(cmds.allNodeTypes())
+    node_types = [node_type for node_type in sorted(TEXTURE_PATH_ATTRIBUTES) if node_type in known]
+    if not node_types:
+        return []
+    entries = []
+    names = cmds.ls(type = node_types) or []
+    for node in shadingNetworks.depend_nodes(names):
+        function = OpenMaya.MFnDependencyNode(node)
+        handle = shadingNetworks.Node(function.typeName(), node)
+        for attribute in (TEXTURE_PATH_ATTRIBUTES[function.typeName()], FULL_PATH_ATTRIBUTE[0], SOURCE_PATH_ATTRIBUTE[0]):
+            if function.hasAttribute(attribute):
+                path = function.findPlug(attribute).asString()
+                if path:
+                    entries.append((handle, attribute, path))
+    return entries
+
+def relink_textures(roots = None, workers = None, check = False):
+    """Checks every texture path in the scene, each folder listed once in a pool of threads, and points the missing
+        ones at the files of the same name under the search roots, $MAYA_PBR_SEARCH_ROOTS unless they are given.
+        Every path is set in one MDGModifier. With check nothing is changed. Returns the paths still missing, or
+        with check all the missing ones, and the modifiers to undo the relink with"""
+    entries = texture_paths()
+    paths = [path for node, attribute, path in entries]
+    if check:
+        fixes, missing = {}, texturePaths.find_missing(paths, workers)
+    else:
+        fixes, missing = texturePaths.relink(paths, texturePaths.search_roots(roots), workers)
+    for path in missing:
+        print("// Missing texture: %s" % path)
+    print("%d texture paths checked, %d missing, %d relinked" % (len(set(paths)), len(fixes) + len(missing), len(fixes)))
+    if not fixes:
+        return missing, []
+
+    builder = shadingNetworks.NetworkBuilder()
+    for node, attribute, path in entries:
+        if path in fixes:
+            builder.set_string(node, attribute, fixes[path])
+    cmds.refresh(suspend = True)
+    try:
+        modifier = builder.doIt()
+    finally:
+        cmds.refresh(suspend = False)
+    return missing, [modifier]
+
+def is_referenced(path):
+    """Whether the file at path is referenced in the scene"""
+    path = os.path.normcase(os.path.abspath(path))
+    return any(os.path.normcase(os.path.abspath(reference)) == path for reference in cmds.file(query = True, reference = True) or [])
+
+def write_reference(nodes, path):
+    """Exports the nodes to path, deletes them and references the file back in under a namespace named after it"""
+    cmds.select(nodes, replace = True, noExpand = True)
+    cmds.file(path, exportSelected = True, force = True, type = "mayaAscii" if path.lower().endswith(".ma") else "mayaBinary")
+    cmds.delete(nodes)
+    cmds.file(path, reference = True, namespace = os.path.splitext(os.path.basename(path))[0])
 
 
     
-# Creator
-def cmdCreator():
-    return OpenMayaMPx.asMPxPtr( scriptedCommand() )
+# Syntax
+def syntaxCreator():
+    syntax = OpenMaya.MSyntax()
+    syntax.addFlag(kRootFlag, kRootLongFlag, OpenMaya.MSyntax.kString)
+    syntax.addFlag(kReferenceFlag, kReferenceLongFlag, OpenMaya.MSyntax.kString)
+    syntax.addFlag(kWorkersFlag, kWorkersLongFlag, OpenMaya.MSyntax.kLong)
+    syntax.addFlag(kManifestFlag, kManifestLongFlag, OpenMaya.MSyntax.kString)
+    syntax.addFlag(kTexFlag, kTexLongFlag)
+    syntax.addFlag(kConverterFlag, kConverterLongFlag, OpenMaya.MSyntax.kString)
+    syntax.addFlag(kProxyFlag, kProxyLongFlag, OpenMaya.MSyntax.kLong)
+    return syntax
+
+def swapSyntaxCreator():
+    syntax = OpenMaya.MSyntax()
+    syntax.addFlag(kProxyFlag, kProxyLongFlag, OpenMaya.MSyntax.kLong)
+    syntax.addFlag(kFullFlag, kFullLongFlag)
+    return syntax
+
+def relinkSyntaxCreator():
+    syntax = OpenMaya.MSyntax()
+    syntax.addFlag(kSearchRootFlag, kSearchRootLongFlag, OpenMaya.MSyntax.kString)
+    syntax.makeFlagMultiUse(kSearchRootFlag)
+    syntax.addFlag(kWorkersFlag, kWorkersLongFlag, OpenMaya.MSyntax.kLong)
+    syntax.addFlag(kCheckFlag, kCheckLongFlag)
+    return syntax
     
 # Initialize the script plug-in
 def initializePlugin(mobject):
-    mplugin = OpenMayaMPx.MFnPlugin(mobject)
-    try:
-        mplugin.registerCommand( kPluginCmdName, cmdCreator )
-    except:
-        sys.stderr.write( "Failed to register command: %s\n" % kPluginCmdName )
-        raise
+    bootstrap.register(mobject, __name__)
 
 # Uninitialize the script plug-in
 def uninitializePlugin(mobject):
-    mplugin = OpenMayaMPx.MFnPlugin(mobject)
-    try:
-        mplugin.deregisterCommand( kPluginCmdName )
-    except:
-        sys.stderr.write( "Failed to unregister command: %s\n" % kPluginCmdName )
\ No newline at end of file
+    bootstrap.deregister(mobject)
@@ -1,8 +1,17 @@
 import sys
+import os
 import maya.OpenMaya as OpenMaya
 import maya.OpenMayaMPx as OpenMayaMPx
 from maya import cmds
 
+# Maya doesn't put the plug-in folder on the path, the shared mayaPlugins package lives next to this file
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+if PLUGIN_DIR not in sys.path:
+    sys.path.append(PLUGIN_DIR)
+
+from mayaPlugins import shadingNetworks
+from mayaPlugins import materialRegistry
+
 kPluginCmdName = "spHelloWorld"
 
 # Command
@@ -12,13 +21,12 @@ class scriptedCommand(OpenMayaMPx.MPxCommand):
         
     # Invoked when the command is run.
     def doIt(self,argList):
-        print "Hello World!"
+        print("Hello World!")
 
 def create_shadder(name, node_type="PxrDisney"):
-    material = cmds.shadingNode(node_type, name=name, asShader=True)
-    sg = cmds.sets(name="%sSG" % name, empty=True, renderable=True, noSurfaceShader=True)
-    cmds.connectAttr("%s.outColor" % material, "%s.surfaceShader" % sg)
-    return material, sg
+    """Creates one shader and its shading group, or finds the ones already made the same way, returns their names"""
+    (material, sg), = shadingNetworks.create_shaders([(name, node_type, None)], materialRegistry.MaterialRegistry())[0]
+    return material.name(), sg.name()
     
 # Creator
 def cmdCreator():
@@ -4,160 +4,99 @@ import maya.OpenMaya as OpenMaya
 import maya.OpenMayaMPx as OpenMayaMPx
 from maya import cmds
 
+# Maya doesn't put the plug-in folder on the path, the shared mayaPlugins package lives next to this file
+PLUGIN_DIR = os.path.dirname(os.path.abspath(__file__))
+if PLUGIN_DIR not in sys.path:
+    sys.path.append(PLUGIN_DIR)
+
+from mayaPlugins import bootstrap
+from mayaPlugins import cmdsProfiler
+
+# NumPy and the edge code are only imported the first time the command runs
+bevelSolver = bootstrap.lazyImport("mayaPlugins.bevelSolver")
+edgeCache = bootstrap.lazyImport("mayaPlugins.edgeCache")
+edgeSharpness = bootstrap.lazyImport("mayaPlugins.edgeSharpness")
+
 # Brian Royston
 # 2021
 
+cmdsProfiler.register(__name__)
+
+
+
+kPluginCmdName = "selectHardSoftEdges"
+
+kHardFlag = "-hd"
+kHardLongFlag = "-hard"
+kSoftFlag = "-sf"
+kSoftLongFlag = "-soft"
+kAngleFlag = "-a"
+kAngleLongFlag = "-angle"
+kAddFlag = "-add"
+kAddLongFlag = "-addSelection"
+
 
-kPluginCmdName = "createDisney"
-
-BASE_COLOR = 0
-EMIT_COLOR = 1
-METALLIC = 2
-SPECULAR = 3
-ROUGHNESS = 4
-BUMP_NORMAL = 5
-DISPLACEMENT = 6 
-
-NUM_IMAGE_TYPES = 7
-
-IMAGE_KEY_WORDS = {
-    BASE_COLOR : {"col", "diff"},
-    EMIT_COLOR : {"emit", "emission", "glow"},
-    METALLIC : {"metal"},
-    SPECULAR : {"specular"},
-    ROUGHNESS : {"rough"},
-    BUMP_NORMAL : {"bump", "nor"},
-    DISPLACEMENT : {"disp"},
-}
-
-IMAGE_TYPE_NAMES = {
-    BASE_COLOR : "Base",
-    EMIT_COLOR : "Emit",
-    METALLIC : "Metal",
-    SPECULAR : "Specular",
-    ROUGHNESS : "Rough",
-    BUMP_NORMAL : "Bump",
-    DISPLACEMENT : "Disp",
-}
 
 # Command
 class scriptedCommand(OpenMayaMPx.MPxCommand):
     def __init__(self):
         OpenMayaMPx.MPxCommand.__init__(self)
-        
+
     # Invoked when the command is run.
+    # Selects the hard edges of the meshes given, or of the selected ones, by their smoothing flags or by the angle
+    # between their faces, and returns them as edge ranges
     def doIt(self,argList):
-        build_network()
-
-def create_place2d(name):
-    place2d_node = cmds.shadingNode("place2dTexture", name=name, asTexture=True) # creates node
-    return place2d_node
-
-def create_file(name, filepath, place2d):
-    file_node = cmds.shadingNode("file", name=name, asTexture=True) # creates node
-
-    cmds.setAttr("%s.fileTextureName" % file_node, filepath, type = "string") #sets filepath
-
-    # connecting it to the place2dd
-    cmds.connectAttr("%s.coverage" % place2d, "%s.coverage" % file_node)
-    cmds.connectAttr("%s.mirrorU" % place2d, "%s.mirrorU" % file_node)
-    cmds.connectAttr("%s.mirrorV" % place2d, "%s.mirrorV" % file_node)
-    cmds.connectAttr("%s.noiseUV" % place2d, "%s.noiseUV" % file_node)
-    cmds.connectAttr("%s.offset" % place2d, "%s.offset" % file_node)
-    cmds.connectAttr("%s.outUV" % place2d, "%s.uvCoord" % file_node)
-    cmds.connectAttr("%s.outUvFilterSize" % place2d, "%s.uvFilterSize" % file_node)
-    cmds.connectAttr("%s.repeatUV" % place2d, "%s.repeatUV" % file_node)
-    cmds.connectAttr("%s.rotateFrame" % place2d, "%s.rotateFrame" % file_node)
-    cmds.connectAttr("%s.rotateUV" % place2d, "%s.rotateUV" % file_node)
-    cmds.connectAttr("%s.stagger" % place2d, "%s.stagger" % file_node)
-    cmds.connectAttr("%s.translateFrame" % place2d, "%s.translateFrame" % file_node)
-    cmds.connectAttr("%s.vertexCameraOne" % place2d, "%s.vertexCameraOne" % file_node)
-    cmds.connectAttr("%s.vertexUvOne" % place2d, "%s.vertexUvOne" % file_node)
-    cmds.connectAttr("%s.vertexUvThree" % place2d, "%s.vertexUvThree" % file_node)
-    cmds.connectAttr("%s.vertexUvTwo" % place2d, "%s.vertexUvTwo" % file_node)
-    cmds.connectAttr("%s.wrapU" % place2d, "%s.wrapU" % file_node)
-    cmds.connectAttr("%s.wrapV" % place2d, "%s.wrapV" % file_node)
-    return file_node
-
-def create_lambert(name):
-    lambert = cmds.shadingNode("lambert", name=name, asShader=True)
-    return lambert
-
-def create_disney(name):
-    material = cmds.shadingNode("PxrDisney", name=name, asShader=True) # creates node
-    lambert = create_lambert("%s_Lambert" %name)
-    sg = cmds.sets(name="%sSG" % name, empty=True, renderable=True, noSurfaceShader=True) # creates SG to attatch to
-    cmds.connectAttr("%s.outColor" % lambert, "%s.surfaceShader" % sg) # attaches to SG
-    cmds.connectAttr("%s.outColor" % material, "%s.rman__surface" % sg) # attaches to SG
-    return material, sg 
-
-
-def link_file(sg, file_node, disney_node, image_type, fileName):
-    if image_type is BASE_COLOR:
-        cmds.connectAttr("%s.outColor" % file_node, "%s.baseColor" % disney_node)
-    elif image_type is EMIT_COLOR:
-        cmds.connectAttr("%s.outColor" % file_node, "%s.emitColor" % disney_node)
-    elif image_type is METALLIC: 
-        cmds.connectAttr("%s.outAlpha" % file_node, "%s.metallic" % disney_node)
-    elif image_type is SPECULAR: 
-        cmds.connectAttr("%s.outAlpha" % file_node, "%s.specular" % disney_node)
-    elif image_type is ROUGHNESS: 
-        cmds.connectAttr("%s.outAlpha" % file_node, "%s.roughness" % disney_node)
-    elif image_type is BUMP_NORMAL:  
-        cmds.connectAttr("%s.resultN" % file_node, "%s.bumpNormal" % disney_node)   
-    elif image_type is DISPLACEMENT: 
-        disp = cmds.shadingNode("PxrDisplace", name= "%s_Disp" % fileName, asShader=True) # creates node
-        cmds.connectAttr("%s.outAlpha" % file_node, "%s.dispScalar" % disp)    
-        cmds.setAttr("%s.dispAmount" % disp, 0.1) 
-        cmds.connectAttr("%s.outColor" % disp, "%s.displacementShader" % sg) 
-
-def build_network():
-    filepath = cmds.fileDialog2(caption = "Select the folder of the PBR", okCaption = "Select", fileMode = 2, startingDirectory = cmds.workspace(rd =True, q=True, dir=True ))[0]
-    fileName = filepath[filepath.rfind("/"):]
-    print(filepath)
-    print(fileName)
-    place2d_node = create_place2d("%s_Place2D" % fileName)
-    disney_node, sg = create_disney(fileName)
-    for file in os.listdir(filepath):
-        if file.endswith(".tex"):
-            continue
-        best_image_type = -1
-        largest_index = -1
-        for image_type in range(NUM_IMAGE_TYPES):
-            for keyWord in IMAGE_KEY_WORDS[image_type]:  
-                indexFound = file.lower().find(keyWord)       
-                if indexFound > largest_index:
-                    best_image_type = image_type
-                    largest_index = indexFound
-                    continue     
-        if best_image_type >= 0:
-            if best_image_type == BUMP_NORMAL:
-                file_node =  cmds.shadingNode("PxrBump", name= "%s_Bump" % fileName, asTexture=True) # creates node
-                cmds.setAttr("%s.filename" % file_node, filepath + "/" + file, type = "string") 
-                cmds.setAttr("%s.scale" % file_node, 0.1) 
-            else:
-                file_node = create_file(fileName + "_File_" + IMAGE_TYPE_NAMES[best_image_type], filepath + "/" + file, place2d_node)
-            link_file(sg, file_node, disney_node, best_image_type, fileName)
-
-
-    
-# Creator
-def cmdCreator():
-    return OpenMayaMPx.asMPxPtr( scriptedCommand() )
-    
+        argData = OpenMaya.MArgDatabase(self.syntax(), argList)
+        if argData.isFlagSet(kHardFlag) and argData.isFlagSet(kSoftFlag):
+            cmds.error("selectHardSoftEdges takes one of -hard and -soft")
+        hard = not argData.isFlagSet(kSoftFlag)
+        angle = None
+        if argData.isFlagSet(kAngleFlag):
+            angle = argData.flagArgumentDouble(kAngleFlag, 0)
+        objects = OpenMaya.MStringArray()
+        argData.getObjects(objects)
+
+        names = selectEdges(list(objects), hard, angle, argData.isFlagSet(kAddFlag))
+        for name in names:
+            self.appendToResult(name)
+
+def polyMeshes(objects = None):
+    """The polygon mesh transforms among objects, or among the selection when there are none"""
+    objects = objects or cmds.ls(selection = True, objectsOnly = True)
+    if not objects:
+        return []
+    return cmds.filterExpand(objects, selectionMask = 12, fullPath = True) or []
+
+def selectEdges(objects = None, hard = True, angle = None, add = False):
+    """Selects the hard or soft edges of the meshes with one select, returns them as edge ranges. The meshes come
+        from edgeCache, so asking again after an edit only rereads and recomputes what the edit changed"""
+    names = []
+    for mesh in polyMeshes(objects):
+        edges = edgeSharpness.classifyEdges(edgeCache.edgeMesh(mesh, angle is not None), hard, angle)
+        names += bevelSolver.componentNames(mesh, "e", edges)
+    if names:
+        cmds.select(names, add = add, replace = not add)
+    elif not add:
+        cmds.select(clear = True)
+    return names
+
+
+# Syntax
+def syntaxCreator():
+    syntax = OpenMaya.MSyntax()
+    syntax.addFlag(kHardFlag, kHardLongFlag)
+    syntax.addFlag(kSoftFlag, kSoftLongFlag)
+    syntax.addFlag(kAngleFlag, kAngleLongFlag, OpenMaya.MSyntax.kDouble)
+    syntax.addFlag(kAddFlag, kAddLongFlag)
+    syntax.setObjectType(OpenMaya.MSyntax.kStringObjects)
+    return syntax
+
 # Initialize the script plug-in
 def initializePlugin(mobject):
-    mplugin = OpenMayaMPx.MFnPlugin(mobject)
-    try:
-        mplugin.registerCommand( kPluginCmdName, cmdCreator )
-    except:
-        sys.stderr.write( "Failed to register command: %s\n" % kPluginCmdName )
-        raise
+    bootstrap.register(mobject, __name__)
 
 # Uninitialize the script plug-in
 def uninitializePlugin(mobject):
-    mplugin = OpenMayaMPx.MFnPlugin(mobject)
-    try:
-        mplugin.deregisterCommand( kPluginCmdName )
-    except:
-        sys.stderr.write( "Failed to unregister command: %s\n" % kPluginCmdName )
\ No newline at end of file
+    bootstrap.deregister(mobject)
+    if bootstrap.isLoaded(edgeCache):
+        edgeCache.clear()
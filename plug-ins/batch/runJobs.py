@@ -0,0 +1,64 @@
+"""Runs a JSON or YAML job manifest of scenes and plug-in commands under mayapy, with no GUI, sharded across worker
+    processes. Writes each job's status, timings and error as JSON, and exits with 1 if any job failed.
+
+    mayapy batch/runJobs.py jobs.json --workers 8 --output results.json
+    mayapy batch/runJobs.py jobs.yaml --shard 3/16 --workers 4 --output results.3.json
+
+See mayaPlugins.batchJobs for the manifest.
+"""
+import sys
+import os
+import json
+import time
+import argparse
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PLUGIN_DIR not in sys.path:
+    sys.path.append(PLUGIN_DIR)
+
+from mayaPlugins import batchJobs
+
+
+def parseShard(text):
+    """I/N, the I'th of N shards counting from 0"""
+    try:
+        shard, shards = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("expected I/N, not %s" % text)
+    return shard, shards
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("manifest", help = "JSON job manifest, or YAML with PyYAML installed")
+    parser.add_argument("--workers", type = int, default = 1, help = "worker processes, each its own Maya session. 1 runs the jobs in this one")
+    parser.add_argument("--shard", type = parseShard, default = (0, 1), help = "I/N, run every N'th job from the I'th on, for splitting a manifest across farm tasks")
+    parser.add_argument("--list", action = "store_true", help = "print the jobs of the shard as expanded and stop, without starting Maya")
+    parser.add_argument("--output", help = "JSON results path, printed if not given")
+    args = parser.parse_args(argv)
+
+    shard, shards = args.shard
+    try:
+        jobs = batchJobs.shardJobs(batchJobs.loadManifest(args.manifest), shard, shards)
+    except (OSError, ValueError) as error:
+        parser.error(str(error))
+    if args.list:
+        json.dump(jobs, sys.stdout, indent = 2, sort_keys = True)
+        sys.stdout.write("\n")
+        return 0
+
+    start = time.perf_counter()
+    results = batchJobs.runJobs(jobs, args.workers)
+    for result in results:
+        sys.stderr.write("%-6s %8s  %s%s\n" % (result["status"], "%.2fs" % result["seconds"] if result["seconds"] is not None else "-",
+                                               result["name"], "  " + result["error"] if result["error"] else ""))
+    report = batchJobs.report(results, os.path.abspath(args.manifest), shard, shards, args.workers, time.perf_counter() - start)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent = 2, sort_keys = True, default = str)
+    else:
+        json.dump(report, sys.stdout, indent = 2, sort_keys = True, default = str)
+        sys.stdout.write("\n")
+    return 1 if report["failedCount"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
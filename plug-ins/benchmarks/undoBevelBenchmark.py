@@ -0,0 +1,252 @@
+"""Benchmarks undoBevel's face selection and two edge modes outside Maya, on procedurally beveled cubes, cylinders and
+    chamfered grids. The UndoBevel plug-in itself plans and applies each command, through the standInMaya modules on the
+    standInMesh cmds. Writes wall time, cmds calls by name and peak memory as JSON.
+
+    python benchmarks/undoBevelBenchmark.py --sizes 1000 10000 100000 --output report.json
+"""
+import io
+import sys
+import os
+import math
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+import contextlib
+import collections
+import numpy as np
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PLUGIN_DIR not in sys.path:
+    sys.path.append(PLUGIN_DIR)
+
+from mayaPlugins import bevelSolver
+from mayaPlugins import standInMesh
+from mayaPlugins import standInMaya
+
+# the plug-in itself runs, on the stand-in meshes
+standInMaya.install()
+import UndoBevel
+
+SHAPES = ["cube", "cylinder", "grid"]
+DEFAULT_SIZES = [1000, 10000]
+# the calls UndoBevel makes, always reported so one more of any of them per bevel shows up: 2 polyInfo and an xform
+# through the edgeCache to read a mesh, and a setAttr per run of moved vertices, a polyDelEdge and a polyMergeVertex
+# to apply a plan. The per vertex queries and moves it no longer makes stay listed, so one coming back shows up as
+# more than 0
+TRACKED_CALLS = ["polyInfo", "xform", "getAttr", "setAttr", "polyDelEdge", "polyMergeVertex",
+                 "pointPosition", "polyListComponentConversion", "polyMoveVertex"]
+
+
+class CountingCmds(object):
+    """Wraps a StandInCmds and counts every call by command name"""
+    def __init__(self, cmds):
+        self.cmds = cmds
+        self.calls = collections.Counter(dict((name, 0) for name in TRACKED_CALLS))
+
+    def __getattr__(self, name):
+        command = getattr(self.cmds, name)
+        def counted(*args, **kwargs):
+            self.calls[name] += 1
+            return command(*args, **kwargs)
+        return counted
+
+
+class SweptMesh(object):
+    """A grid of points swept along a profile (i) and a path (j) and joined with quads, plus optional caps.
+        Remembers which quads come from the chamfer segments of the profile"""
+    def __init__(self, grid, closedProfile, closedPath, chamferSegments):
+        profileCount, pathCount = len(grid), len(grid[0])
+        points = [point for row in grid for point in row]
+        vertex = lambda i, j: (i % profileCount) * pathCount + j % pathCount
+
+        faces = []
+        chamfers = []
+        for i in range(profileCount if closedProfile else profileCount - 1):
+            for j in range(pathCount if closedPath else pathCount - 1):
+                if i in chamferSegments:
+                    chamfers.append(len(faces))
+                faces.append((vertex(i, j), vertex(i, j + 1), vertex(i + 1, j + 1), vertex(i + 1, j)))
+
+        # caps wind against the quads next to them so all the normals face the same way
+        if closedProfile and not closedPath:
+            faces.append([vertex(i, 0) for i in range(profileCount)])
+            faces.append([vertex(i, pathCount - 1) for i in reversed(range(profileCount))])
+        if closedPath and not closedProfile:
+            faces.append([vertex(0, j) for j in reversed(range(pathCount))])
+            faces.append([vertex(profileCount - 1, j) for j in range(pathCount)])
+
+        self.mesh = standInMesh.HalfEdgeMesh(points, faces)
+        self.chamfers = chamfers
+
+    def rails(self, face):
+        """The 2 path direction edges of a chamfer quad, the pair the two edge mode is given"""
+        halves = list(self.mesh.faceHalfEdges(face))
+        return self.mesh.edge[halves[0]], self.mesh.edge[halves[2]]
+
+
+def beveledCube(bevels, size = 1.0, chamfer = 0.1):
+    """A box with its 4 vertical edges chamfered, split into enough rows to give about the given number of bevel faces"""
+    rows = max(1, bevels // 4)
+    h = size / 2.0
+    profile = [(-h + chamfer, -h), (h - chamfer, -h), (h, -h + chamfer), (h, h - chamfer),
+               (h - chamfer, h), (-h + chamfer, h), (-h, h - chamfer), (-h, -h + chamfer)]
+    heights = np.linspace(0.0, size, rows + 1).tolist()
+    grid = [[(u, y, v) for y in heights] for u, v in profile]
+    return SweptMesh(grid, True, False, set([1, 3, 5, 7]))
+
+def beveledCylinder(bevels, radius = 1.0, height = 2.0, chamfer = 0.1):
+    """A capped cylinder with both rims chamfered, with enough sides to give about the given number of bevel faces"""
+    sides = max(8, bevels // 2)
+    profile = [(radius - chamfer, 0.0), (radius, chamfer), (radius, height - chamfer), (radius - chamfer, height)]
+    angles = [2.0 * math.pi * j / sides for j in range(sides)]
+    grid = [[(r * math.cos(a), y, r * math.sin(a)) for a in angles] for r, y in profile]
+    return SweptMesh(grid, False, True, set([0, 2]))
+
+def chamferedGrid(bevels, height = 0.3, chamfer = 0.1):
+    """An open sheet of parallel square ridges with both top edges chamfered, about square in ridges by rows.
+        The chamfers run out to the open border of the sheet"""
+    ridges = max(1, int(math.sqrt(bevels / 2.0)))
+    rows = max(1, bevels // (2 * ridges))
+    profile = []
+    for k in range(ridges):
+        profile += [(k, 0.0), (k + 0.25, 0.0), (k + 0.25, height - chamfer), (k + 0.25 + chamfer, height),
+                    (k + 0.75 - chamfer, height), (k + 0.75, height - chamfer), (k + 0.75, 0.0)]
+    profile.append((ridges, 0.0))
+    # 7 segments a ridge: floor, wall, chamfer, top, chamfer, wall, floor
+    chamferSegments = set([7 * k + 2 for k in range(ridges)] + [7 * k + 4 for k in range(ridges)])
+    lengths = np.linspace(0.0, rows * chamfer * 2.0, rows + 1).tolist()
+    grid = [[(u, v, y) for y in lengths] for u, v in profile]
+    return SweptMesh(grid, False, False, chamferSegments)
+
+GENERATORS = {"cube" : beveledCube, "cylinder" : beveledCylinder, "grid" : chamferedGrid}
+
+
+def undoBevel(tolerance):
+    """One undoBevel command on the current selection, planned and applied by the plug-in as its doIt and redoIt do.
+        Returns the number of edges it deleted"""
+    deleted = 0
+    # what the plug-in prints would end up in the report
+    with contextlib.redirect_stdout(io.StringIO()):
+        for plan in UndoBevel.planUndoBevel(tolerance):
+            UndoBevel.applyPlan(plan)
+            deleted += len(plan.deletedEdges)
+    return deleted
+
+def findEdge(mesh, ends):
+    """The edge between 2 points of the mesh, found by position since every command renumbers the mesh. None if
+        either end has moved or gone"""
+    vertices = [np.flatnonzero((mesh.points == end).all(axis = 1)) for end in ends]
+    if len(vertices[0]) == 0 or len(vertices[1]) == 0:
+        return None
+    edges = [edge for edge in mesh.vertexEdges(int(vertices[0][0])) if int(vertices[1][0]) in mesh.edgeVertices(edge)]
+    return edges[0] if edges else None
+
+def runFaces(swept, cmds, tolerance, pairs):
+    """The face selection mode: every chamfer face selected, one command"""
+    cmds.select(bevelSolver.componentNames("bevelMesh", "f", swept.chamfers))
+    return 1, undoBevel(tolerance), 0
+
+def runEdges(swept, cmds, tolerance, pairs):
+    """The two edge mode: one command per chamfer, for every other one of the first chamfers so no two share a vertex"""
+    mesh = swept.mesh
+    rails = [[mesh.points[list(mesh.edgeVertices(edge))].copy() for edge in swept.rails(face)] for face in swept.chamfers[:2 * pairs:2]]
+    runs, deleted, errors = 0, 0, 0
+    for ends1, ends2 in rails:
+        runs += 1
+        edge1, edge2 = findEdge(mesh, ends1), findEdge(mesh, ends2)
+        if edge1 is None or edge2 is None:
+            errors += 1
+            continue
+        cmds.select(["bevelMesh.e[%d]" % edge1, "bevelMesh.e[%d]" % edge2])
+        try:
+            deleted += undoBevel(tolerance)
+        except (bevelSolver.BevelError, RuntimeError):
+            errors += 1
+    return runs, deleted, errors
+
+MODES = {"faces" : runFaces, "edges" : runEdges}
+
+def run(shape, bevels, mode, tolerance, pairs, traced):
+    """Builds a fresh mesh and runs one mode on it, the build is not part of the timing or the memory.
+        Returns the swept mesh, the counted cmds, the results of the mode, the wall time and the peak traced memory"""
+    swept = GENERATORS[shape](bevels)
+    cmds = CountingCmds(standInMesh.StandInCmds({"bevelMesh" : swept.mesh}))
+    standInMaya.setCmds(cmds)
+
+    if traced:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        results = MODES[mode](swept, cmds, tolerance, pairs) + (None,)
+    except Exception as exception:
+        # a failing case is part of the report, not the end of the run
+        results = (1, 0, 1, "%s: %s" % (type(exception).__name__, exception))
+    wallTime = time.perf_counter() - start
+    peak = 0
+    if traced:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return swept, cmds, results, wallTime, peak
+
+def measure(shape, bevels, mode, tolerance, pairs, memory = True):
+    """Times one mode on a shape, then runs it again under tracemalloc for the peak memory, tracing slows it down too much to time"""
+    swept, cmds, results, wallTime, peak = run(shape, bevels, mode, tolerance, pairs, False)
+    peak = run(shape, bevels, mode, tolerance, pairs, True)[4] if memory else None
+    runs, deleted, errors, error = results
+
+    return {
+        "shape" : shape,
+        "mode" : mode,
+        "bevelFaces" : len(swept.chamfers),
+        "vertices" : swept.mesh.vertexCount(),
+        "edges" : swept.mesh.edgeCount(),
+        "faces" : swept.mesh.faceCount(),
+        "commands" : runs,
+        "deletedEdges" : deleted,
+        "errors" : errors,
+        "error" : error,
+        "wallTime" : wallTime,
+        "wallTimePerCommand" : wallTime / max(runs, 1),
+        "peakMemory" : peak,
+        "calls" : dict(cmds.calls),
+    }
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.splitlines()[0])
+    parser.add_argument("--shapes", nargs = "+", choices = SHAPES, default = SHAPES)
+    parser.add_argument("--modes", nargs = "+", choices = sorted(MODES), default = sorted(MODES))
+    parser.add_argument("--sizes", nargs = "+", type = int, default = DEFAULT_SIZES, help = "about how many bevel faces each mesh has")
+    parser.add_argument("--pairs", type = int, default = 10, help = "how many chamfers the two edge mode is run on, one command each")
+    parser.add_argument("--tolerance", type = float, default = bevelSolver.DEFAULT_TOLERANCE)
+    parser.add_argument("--no-memory", dest = "memory", action = "store_false", help = "skip the second, traced run that measures peak memory")
+    parser.add_argument("--output", help = "JSON report path, printed if not given")
+    args = parser.parse_args(argv)
+
+    cases = []
+    for shape in args.shapes:
+        for size in args.sizes:
+            for mode in args.modes:
+                case = measure(shape, size, mode, args.tolerance, args.pairs, args.memory)
+                line = "%-8s %-5s %7d bevels  %8.3fs" % (shape, mode, case["bevelFaces"], case["wallTime"])
+                if case["peakMemory"] is not None:
+                    line += "  %10d bytes" % case["peakMemory"]
+                sys.stderr.write(line + "\n")
+                cases.append(case)
+
+    report = {
+        "python" : platform.python_version(),
+        "numpy" : np.__version__,
+        "platform" : platform.platform(),
+        "cases" : cases,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent = 2, sort_keys = True)
+    else:
+        json.dump(report, sys.stdout, indent = 2, sort_keys = True)
+        sys.stdout.write("\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Shared code for the plug-ins in this folder. Nothing in here is a plug-in itself."""
@@ -0,0 +1,281 @@
+"""Runs the plug-ins' commands on scenes without a GUI, from a JSON or YAML job manifest, for the render farm. Maya is
+    only imported in the processes that run jobs: each starts a maya.standalone session, loads the AllPlugins plug-in
+    once and takes jobs one at a time, opening each job's scene, running its operations and saving it. Every job comes
+    back as a plain result with its timings and, if it failed, the error and traceback, so one bad scene doesn't stop
+    the rest. A manifest looks like
+
+    {"jobs" : [{"scene" : "props/crate.mb", "operations" : ["undoBevel", "consolidateMaterials"], "save" : true},
+               {"scenes" : ["a.mb", "b.mb"], "operations" : [{"command" : "undoBevel", "objects" : ["hull"],
+                                                               "flags" : {"tolerance" : 0.02}}], "save" : "out/"},
+               {"name" : "library", "operations" : [{"command" : "createDisney", "flags" : {"root" : "textures",
+                                                     "reference" : "library.mb"}}]}]}
+
+    Paths in it are relative to the manifest's folder"""
+import os
+import sys
+import json
+import time
+import signal
+import struct
+import platform
+import traceback
+import multiprocessing
+import multiprocessing.util
+import concurrent.futures
+
+# what every worker loads, the plug-in registering all the commands
+PLUGIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "AllPlugins.py")
+
+# the commands a job can run and what needs checking before one runs. selectHardSoftEdges is left out, all it
+# changes is the selection
+BATCH_COMMANDS = {"createDisney", "swapDisneyTextures", "relinkTextures", "createLambert", "consolidateMaterials", "undoBevel"}
+# flags holding paths, made absolute like the scenes
+PATH_FLAGS = {"root", "reference", "manifest", "searchRoot"}
+YAML_EXTENSIONS = {".yaml", ".yml"}
+
+# what a pool worker reports down its pipe, a job's index and whether it started it or was stopped in it
+EVENT = struct.Struct("<q?")
+
+# in a pool worker, the pipe it reports the jobs it starts and is stopped in on, and the index of the one it is running
+_events = None
+_running = None
+
+
+def loadManifest(path):
+    """Reads a JSON manifest, or a YAML one when PyYAML is installed in mayapy, and returns its jobs checked and
+        expanded, one per scene, with absolute paths"""
+    with open(path) as f:
+        if os.path.splitext(path)[1].lower() in YAML_EXTENSIONS:
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("%s is YAML, which needs PyYAML installed in mayapy, or write it as JSON" % path)
+            manifest = yaml.safe_load(f)
+        else:
+            manifest = json.load(f)
+    if isinstance(manifest, list):
+        manifest = {"jobs" : manifest}
+    if not isinstance(manifest, dict) or not isinstance(manifest.get("jobs"), list):
+        raise ValueError("%s has no list of jobs" % path)
+    return expandJobs(manifest["jobs"], os.path.dirname(os.path.abspath(path)))
+
+def absolutePath(path, folder):
+    return os.path.normpath(os.path.join(folder, os.path.expandvars(os.path.expanduser(path)))).replace("\\", "/")
+
+def operationSpec(operation, job):
+    """An operation as {"command", "objects", "flags", "select"}, from its dictionary or a bare command name"""
+    if isinstance(operation, str):
+        operation = {"command" : operation}
+    if not isinstance(operation, dict) or "command" not in operation:
+        raise ValueError("Job %s has an operation with no command: %r" % (job, operation))
+    command = operation["command"]
+    if command not in BATCH_COMMANDS:
+        raise ValueError("Job %s runs %s, which can't run in a batch. Expected one of %s" % (job, command, ", ".join(sorted(BATCH_COMMANDS))))
+    flags = dict(operation.get("flags") or {})
+    if command == "createDisney" and "root" not in flags:
+        raise ValueError("Job %s runs createDisney with no root flag, which would open a folder dialog" % job)
+    if command == "undoBevel" and not operation.get("select"):
+        # with nothing selected to undo, it finds every bevel on the meshes
+        flags.setdefault("auto", True)
+    return {"command" : command, "objects" : list(operation.get("objects") or []), "flags" : flags,
+            "select" : list(operation.get("select") or [])}
+
+def expandJobs(jobs, folder):
+    """Checks the jobs of a manifest and returns one per scene, named, numbered and with absolute paths. A job with
+        "scenes" becomes one job per scene, saved into the folder "save" names when it ends in a slash"""
+    expanded = []
+    for i, job in enumerate(jobs):
+        if not isinstance(job, dict):
+            raise ValueError("Job %d isn't a dictionary: %r" % (i, job))
+        scenes = job.get("scenes") or [job.get("scene")]
+        for scene in scenes:
+            scene = absolutePath(scene, folder) if scene else None
+            name = job.get("name") or (os.path.splitext(os.path.basename(scene))[0] if scene else "job%d" % i)
+            if len(scenes) > 1:
+                name = "%s/%s" % (job["name"], os.path.basename(scene)) if job.get("name") else os.path.basename(scene)
+            operations = [operationSpec(operation, name) for operation in job.get("operations") or []]
+            if not operations:
+                raise ValueError("Job %s has no operations" % name)
+            for operation in operations:
+                for flag in PATH_FLAGS & set(operation["flags"]):
+                    value = operation["flags"][flag]
+                    operation["flags"][flag] = [absolutePath(path, folder) for path in value] if isinstance(value, list) else absolutePath(value, folder)
+            save = job.get("save", False)
+            if save is True:
+                if not scene:
+                    raise ValueError("Job %s saves over its scene but has none" % name)
+                save = scene
+            elif save:
+                save = absolutePath(save, folder)
+                if save.endswith("/") or len(scenes) > 1:
+                    save = save.rstrip("/") + "/" + os.path.basename(scene or name + ".mb")
+            expanded.append({"index" : len(expanded), "name" : name, "scene" : scene, "operations" : operations, "save" : save or None})
+    return expanded
+
+def shardJobs(jobs, shard, shards):
+    """The jobs of one shard of several, every shards'th one from shard on, for splitting a manifest across farm tasks"""
+    if not 0 <= shard < shards:
+        raise ValueError("Shard %d of %d doesn't exist, shards count from 0" % (shard, shards))
+    return [job for job in jobs if job["index"] % shards == shard]
+
+
+def startMaya(pluginPath = PLUGIN_PATH):
+    """Starts a maya.standalone session in this process and loads the plug-ins, with undo off since nothing is undone.
+        The session is shut down as the process exits, which multiprocessing also does for its workers"""
+    import maya.standalone
+    maya.standalone.initialize(name = "python")
+    multiprocessing.util.Finalize(None, maya.standalone.uninitialize, exitpriority = 0)
+    from maya import cmds
+    cmds.undoInfo(state = False)
+    cmds.loadPlugin(pluginPath, quiet = True)
+
+def flagValues(flags):
+    """The flags of an operation as cmds takes them, the lists of lists a multi use flag with several arguments has in
+        JSON as lists of tuples"""
+    return dict((flag, [tuple(item) for item in value] if isinstance(value, list) and value and all(isinstance(item, list) for item in value) else value)
+                for flag, value in flags.items())
+
+def runOperation(cmds, operation):
+    """Runs one operation, on every mesh in the scene when undoBevel -auto is given none"""
+    if operation["select"]:
+        cmds.select(operation["select"], replace = True)
+    objects = operation["objects"]
+    if operation["command"] == "undoBevel" and operation["flags"].get("auto") and not objects:
+        shapes = cmds.ls(type = "mesh", noIntermediate = True, long = True) or []
+        objects = sorted(set(cmds.listRelatives(shapes, parent = True, fullPath = True) or [])) if shapes else []
+        if not objects:
+            return []
+    return getattr(cmds, operation["command"])(*objects, **flagValues(operation["flags"]))
+
+def startWorker(pluginPath, events):
+    """A pool worker's initializer, starts Maya and keeps the pipe to report the jobs it starts and is stopped in on"""
+    global _events
+    _events = events
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, stopWorker)
+    startMaya(pluginPath)
+
+def stopWorker(signum, frame):
+    """A pool worker's SIGTERM handler. A pool whose worker died terminates the others, which report the job they were
+        running as stopped rather than crashed. Where terminating is not a signal every running job is a suspect.
+        Sending takes no lock, a message this short going down the pipe in one write, so the signal can't deadlock
+        a worker it stops in the middle of reporting a start"""
+    if _running is not None:
+        _events.send_bytes(EVENT.pack(_running, False))
+    os._exit(1)
+
+def runPoolJob(job):
+    """Runs a job in a pool worker, first telling the parent it started, so a crash can be put down to the job that
+        was running rather than the ones still waiting"""
+    global _running
+    _running = job["index"]
+    _events.send_bytes(EVENT.pack(job["index"], True))
+    try:
+        return runJob(job)
+    finally:
+        _running = None
+
+def runJob(job):
+    """Opens a job's scene, or a new one, runs its operations in order and saves it. Returns the job's result, the
+        first operation to fail stopping it before anything is saved"""
+    from maya import cmds
+    result = {"index" : job["index"], "name" : job["name"], "scene" : job["scene"], "saved" : None, "status" : "ok",
+              "operations" : [], "error" : None, "traceback" : None, "worker" : os.getpid()}
+    start = time.perf_counter()
+    step = {"command" : "open"}
+    try:
+        if job["scene"]:
+            cmds.file(job["scene"], open = True, force = True)
+        else:
+            cmds.file(new = True, force = True)
+        result["openSeconds"] = time.perf_counter() - start
+        for operation in job["operations"]:
+            step = {"command" : operation["command"], "status" : "ok"}
+            result["operations"].append(step)
+            operationStart = time.perf_counter()
+            step["result"] = runOperation(cmds, operation)
+            step["seconds"] = time.perf_counter() - operationStart
+        if job["save"]:
+            step = {"command" : "save"}
+            saveStart = time.perf_counter()
+            if not os.path.isdir(os.path.dirname(job["save"])):
+                os.makedirs(os.path.dirname(job["save"]))
+            cmds.file(rename = job["save"])
+            cmds.file(save = True, force = True, type = "mayaAscii" if job["save"].lower().endswith(".ma") else "mayaBinary")
+            result["saved"] = job["save"]
+            result["saveSeconds"] = time.perf_counter() - saveStart
+    except Exception as error:
+        step["status"] = "failed"
+        result["status"] = "failed"
+        result["error"] = "%s: %s" % (step["command"], str(error).strip() or type(error).__name__)
+        result["traceback"] = traceback.format_exc()
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def crashedResult(job):
+    return {"index" : job["index"], "name" : job["name"], "scene" : job["scene"], "saved" : None, "status" : "failed",
+            "operations" : [], "error" : "the worker process running it died",
+            "traceback" : None, "worker" : None, "seconds" : None}
+
+def poolResults(jobs, workers, pluginPath, mpContext = None):
+    """Runs jobs in a pool of worker processes. Returns their results, the jobs lost to a worker dying and the indices
+        of the lost ones the dead worker was running"""
+    # mayapy is sys.executable here, spawned workers start clean rather than as copies of this process
+    context = mpContext or multiprocessing.get_context("spawn")
+    # written straight to the pipe, so a job's start is reported even if Maya crashes right after. A pipe rather than
+    # a queue, whose lock a worker terminated while holding it would never give back
+    events, workerEvents = context.Pipe(duplex = False)
+    started = set()
+    stopped = set()
+    def readEvents():
+        # read as jobs finish, so a long manifest doesn't fill the pipe and leave the workers waiting on it
+        while events.poll():
+            index, start = EVENT.unpack(events.recv_bytes())
+            (started if start else stopped).add(index)
+    results = []
+    lost = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers = min(workers, len(jobs)), mp_context = context,
+                                                initializer = startWorker, initargs = (pluginPath, workerEvents)) as pool:
+        futures = dict((pool.submit(runPoolJob, job), job) for job in jobs)
+        for future in concurrent.futures.as_completed(futures):
+            readEvents()
+            try:
+                results.append(future.result())
+            except concurrent.futures.process.BrokenProcessPool:
+                lost.append(futures[future])
+    readEvents()
+    events.close()
+    workerEvents.close()
+    return results, lost, (started - stopped) & set(job["index"] for job in lost)
+
+def runJobs(jobs, workers = 1, pluginPath = PLUGIN_PATH, mpContext = None):
+    """Runs jobs in this process, or in a pool of worker processes when workers is more than 1, each with its own
+        Maya session and taking the next job as it finishes one. The workers are spawned unless another
+        multiprocessing context is given. Returns the results in job order. A worker crashing Maya breaks the pool:
+        the job it was running is run again alone in a fresh worker, coming back failed if it crashes that one too,
+        and the rest go to a new pool"""
+    if not jobs:
+        return []
+    if workers <= 1:
+        startMaya(pluginPath)
+        return [runJob(job) for job in jobs]
+    results = []
+    while jobs:
+        done, lost, running = poolResults(jobs, workers, pluginPath, mpContext)
+        results += done
+        if not done and not running:
+            # nothing ever started, the workers couldn't start Maya
+            results += [crashedResult(job) for job in lost]
+            break
+        for job in lost:
+            if job["index"] in running:
+                results += poolResults([job], 1, pluginPath, mpContext)[0] or [crashedResult(job)]
+        jobs = [job for job in lost if job["index"] not in running]
+    return sorted(results, key = lambda result: result["index"])
+
+def report(results, manifest, shard, shards, workers, seconds):
+    """The results of a run with totals, what was run and where, as written out"""
+    failed = [result for result in results if result["status"] != "ok"]
+    return {"manifest" : manifest, "shard" : shard, "shards" : shards, "workers" : workers, "host" : platform.node(),
+            "python" : sys.version.split()[0], "seconds" : seconds, "jobCount" : len(results), "failedCount" : len(failed),
+            "failed" : [result["name"] for result in failed], "jobs" : results}
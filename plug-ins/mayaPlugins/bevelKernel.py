@@ -0,0 +1,244 @@
+"""Batched geometry for UndoBevel: line / plane intersection, chamfer detection and vertex welding. Works on plain NumPy arrays so it runs without Maya."""
+import math
+import numpy as np
+
+def dot(a, b):
+    """Row by row dot product of two (N, 3) arrays"""
+    return np.einsum('ij,ij->i', a, b)
+
+def linesFromEdges(points, edgeVertices, edges):
+    """Given the (E, 2) vertex ids of every edge, returns the lines r_vec = b_vec + t * p_vec extending the given edges as (N, 3) b and p"""
+    ends = edgeVertices[np.asarray(edges)]
+    a = points[ends[:, 0]]
+    b = points[ends[:, 1]]
+    return b, b - a
+
+def planesFromFaces(points, faceCorners, faces):
+    """Given the (F, 3) ids of 3 vertices of every face, returns the planes n_vec * r_vec = D extending the given faces as (N, 3) n and (N,) D"""
+    corners = faceCorners[np.asarray(faces)]
+    a = points[corners[:, 0]]
+    b = points[corners[:, 1]]
+    c = points[corners[:, 2]]
+    n = np.cross(b - a, c - a)
+    return n, dot(n, c)
+
+def intersectLinesPlanes(b, p, n, d, tolerance = 1e-9):
+    """Intersects N lines with N planes. Returns the (N, 3) points and a mask that is False where a line is parallel to its plane,
+        or either is degenerate. Masked points are left at the line's b_vec"""
+    denominator = dot(n, p)
+    valid = np.abs(denominator) > tolerance * np.linalg.norm(n, axis = 1) * np.linalg.norm(p, axis = 1)
+    t = np.zeros(len(denominator))
+    np.divide(d - dot(n, b), denominator, out = t, where = valid)
+    return b + t[:, np.newaxis] * p, valid
+
+def intersectEdgesFaces(points, edgeVertices, faceCorners, edges, faces, tolerance = 1e-9):
+    """Given N edge ids and N face ids, returns where each edge extended into a line hits its face extended into a plane, and the valid mask"""
+    b, p = linesFromEdges(points, edgeVertices, edges)
+    n, d = planesFromFaces(points, faceCorners, faces)
+    return intersectLinesPlanes(b, p, n, d, tolerance)
+
+def faceNormals(points, faceCorners):
+    """Returns the unit normal of every face as an (F, 3) array, zero for degenerate faces"""
+    n, d = planesFromFaces(points, faceCorners, np.arange(len(faceCorners)))
+    length = np.linalg.norm(n, axis = 1)[:, np.newaxis]
+    return np.divide(n, length, out = np.zeros_like(n), where = length > 0.0)
+
+def edgeBends(normals, edgeFaces):
+    """Given the (E, 2) faces of every edge, returns the angle in radians between the normals of the 2 faces.
+        Border and non-manifold edges have -1 as a face and get 0"""
+    manifold = (edgeFaces >= 0).all(axis = 1)
+    cosines = dot(normals[edgeFaces[:, 0]], normals[edgeFaces[:, 1]])
+    return np.where(manifold, np.arccos(np.clip(cosines, -1.0, 1.0)), 0.0)
+
+# how much narrower than the faces across its rails a chamfer has to be
+NARROWER = 1.0 - 1e-6
+
+def faceCentroids(points, faceOffsets, faceVertexIds):
+    """Returns the mean of the vertices of every face as an (F, 3) array, faceOffsets being where each face starts
+        in the flat faceVertexIds with the total at the end"""
+    sums = np.add.reduceat(points[faceVertexIds], faceOffsets[:-1], axis = 0)
+    return sums / np.diff(faceOffsets)[:, np.newaxis]
+
+def lineDistances(points, edgeVertices, edges, targets):
+    """Returns how far each target point is from the line through its edge"""
+    b, p = linesFromEdges(points, edgeVertices, edges)
+    length = np.linalg.norm(p, axis = 1)
+    return np.divide(np.linalg.norm(np.cross(targets - b, p), axis = 1), length, out = np.zeros(len(length)), where = length > 0.0)
+
+def detectChamfers(points, faceOffsets, faceVertexIds, normals, edgeVertices, edgeFaces, quadFaces, quadEdges, minAngle, maxAngle):
+    """Finds the quads that are single segment chamfers. A chamfer is bent by minAngle to maxAngle (radians) against the faces
+        across one pair of its opposite edges, the rails, and is narrower across its rails than either of those faces, so
+        the flat faces between 2 chamfers and the segments of a multi segment bevel are left out.
+        Chamfers joined across their other edges, the sides, make one run, the segments of the same bevel, and are
+        collapsed the same way: the rail moved, rails[:, 0], is on the side whose faces have the fewest corners, quads
+        before n-gons, then the shorter side. Returns the (K,) face ids and (K, 2) rail edge ids"""
+    bends = edgeBends(normals, edgeFaces)
+    rows = np.arange(len(quadFaces))
+
+    # the face edges are sorted by id, not in winding order: the opposite of the first edge is the one that shares no vertex with it
+    ends = edgeVertices[quadEdges]
+    touching = (ends[:, 1:, :, np.newaxis] == ends[:, :1, np.newaxis, :]).any(axis = (2, 3))
+    valid = (~touching).sum(axis = 1) == 1
+    opposite = np.argmin(touching, axis = 1) + 1
+    remaining = np.array([[2, 3], [1, 3], [1, 2]])[opposite - 1]
+    pair1 = np.stack((quadEdges[:, 0], quadEdges[rows, opposite]), axis = 1)
+    pair2 = np.stack((quadEdges[rows, remaining[:, 0]], quadEdges[rows, remaining[:, 1]]), axis = 1)
+
+    # either pair can be the rails: it has to be bent, and the quad narrower across it than the faces on the other side.
+    # A face's width across an edge is twice the distance from its centre to the edge, and faces within a hair of the
+    # same width, the faces of a regular prism, aren't narrower
+    centroids = faceCentroids(points, faceOffsets, faceVertexIds)
+    def railsTest(pair):
+        pairFaces = edgeFaces[pair]
+        across = np.where(pairFaces[:, :, 0] == quadFaces[:, np.newaxis], pairFaces[:, :, 1], pairFaces[:, :, 0])
+        width = lineDistances(points, edgeVertices, pair[:, 0], centroids[quadFaces])
+        acrossWidths = np.stack([lineDistances(points, edgeVertices, pair[:, k], centroids[np.maximum(across[:, k], 0)]) for k in range(2)], axis = 1)
+        bent = ((bends[pair] >= minAngle) & (bends[pair] <= maxAngle)).all(axis = 1)
+        narrow = (across >= 0).all(axis = 1) & (width[:, np.newaxis] < acrossWidths * NARROWER).all(axis = 1)
+        return bent & narrow, across
+
+    pair1Rails, across1 = railsTest(pair1)
+    pair2Rails, across2 = railsTest(pair2)
+    # the one bent more wins when both are
+    pair1First = pair1Rails & (~pair2Rails | (bends[pair1].min(axis = 1) >= bends[pair2].min(axis = 1)))
+    chamfer = valid & (pair1Rails | pair2Rails)
+    rails = np.where(pair1First[:, np.newaxis], pair1, pair2)
+    sides = np.where(pair1First[:, np.newaxis], pair2, pair1)
+    across = np.where(pair1First[:, np.newaxis], across1, across2)
+
+    faces, rails, sides, across = quadFaces[chamfer], rails[chamfer], sides[chamfer], across[chamfer]
+    rails = orientRuns(edgeVertices, rails, sides)
+    cornerCounts = np.diff(faceOffsets)[across]
+    lengths = np.linalg.norm(points[edgeVertices[rails, 1]] - points[edgeVertices[rails, 0]], axis = 2)
+    run = chamferRuns(sides)
+    corners = np.stack([np.bincount(run, weights = cornerCounts[:, k], minlength = run.max(initial = -1) + 1) for k in range(2)], axis = 1)
+    totals = np.stack([np.bincount(run, weights = lengths[:, k], minlength = run.max(initial = -1) + 1) for k in range(2)], axis = 1)
+    swap = (corners[:, 1] < corners[:, 0]) | ((corners[:, 1] == corners[:, 0]) & (totals[:, 1] < totals[:, 0]))
+    return faces, np.where(swap[run][:, np.newaxis], rails[:, ::-1], rails)
+
+def chamferRuns(sides):
+    """Given the (K, 2) side edges of K chamfers, numbers the runs of chamfers joined across a side. Returns the (K,) run
+        of each chamfer, runs numbered from 0 in the order of their first chamfer"""
+    parents = list(range(len(sides)))
+    def root(chamfer):
+        while parents[chamfer] != chamfer:
+            parents[chamfer] = parents[parents[chamfer]]
+            chamfer = parents[chamfer]
+        return chamfer
+
+    first = {}
+    for chamfer, edges in enumerate(sides.tolist()):
+        for edge in edges:
+            other = first.setdefault(edge, chamfer)
+            if other != chamfer:
+                parents[root(chamfer)] = root(other)
+    runs = {}
+    return np.array([runs.setdefault(root(chamfer), len(runs)) for chamfer in range(len(sides))], dtype = np.int64)
+
+def orientRuns(edgeVertices, rails, sides):
+    """Swaps the rails of chamfers so that along each run the first rails meet end to end: the side a chamfer shares with
+        the next one has its first rail's vertex on the first rail of both"""
+    rails = rails.copy()
+    railVertices = edgeVertices[rails].tolist()
+    bySide = {}
+    for chamfer, edges in enumerate(sides.tolist()):
+        for edge in edges:
+            bySide.setdefault(edge, []).append(chamfer)
+
+    done = [False] * len(rails)
+    for start in range(len(rails)):
+        if done[start]:
+            continue
+        done[start] = True
+        stack = [start]
+        while stack:
+            chamfer = stack.pop()
+            for edge in sides[chamfer].tolist():
+                vertex = [v for v in edgeVertices[edge].tolist() if v in railVertices[chamfer][0]]
+                for other in bySide[edge]:
+                    if done[other]:
+                        continue
+                    done[other] = True
+                    if vertex and vertex[0] not in railVertices[other][0]:
+                        rails[other] = rails[other, ::-1]
+                        railVertices[other] = railVertices[other][::-1]
+                    stack.append(other)
+    return rails
+
+def shortestEdgeLengths(points, edgeVertices, degenerate = 1e-9):
+    """Returns the length of the shortest edge around every vertex, the local scale the weld tolerance is relative to.
+        Edges of no length, between vertices moved onto the same point give or take float error, are left out: the ones
+        under degenerate times the longest edge"""
+    lengths = np.linalg.norm(points[edgeVertices[:, 1]] - points[edgeVertices[:, 0]], axis = 1)
+    shortest = np.full(len(points), np.inf)
+    cutoff = degenerate * lengths.max(initial = 0.0)
+    np.minimum.at(shortest, edgeVertices.ravel(), np.repeat(np.where(lengths > cutoff, lengths, np.inf), 2))
+    return np.where(np.isfinite(shortest), shortest, 0.0)
+
+# the 27 grid cells around and including a point's own cell
+NEIGHBOUR_CELLS = [(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)]
+
+def gridCells(points, cellSize):
+    """Returns the integer (x, y, z) cell of a uniform grid each point falls in"""
+    return np.floor(points / cellSize).astype(np.int64)
+
+def hashCells(cells):
+    """Packs (N, 3) cells into one int64 key each. Different cells can share a key, so keys are only a prefilter"""
+    return (cells[:, 0] * 73856093) ^ (cells[:, 1] * 19349663) ^ (cells[:, 2] * 83492791)
+
+def pointsNear(points, targets, radii):
+    """Returns the ids of the points within the radius of any target, and the radius of the target each one matched.
+        Only points in the grid cells around a target are measured, so this is linear in the number of points"""
+    if len(targets) == 0:
+        return np.zeros(0, dtype = np.int64), np.zeros(0)
+    cellSize = radii.max()
+    if cellSize <= 0.0:
+        return np.zeros(0, dtype = np.int64), np.zeros(0)
+
+    grid = {}
+    for target, cell in enumerate(gridCells(targets, cellSize).tolist()):
+        grid.setdefault(tuple(cell), []).append(target)
+    aroundTargets = np.array([(x + dx, y + dy, z + dz) for x, y, z in grid for dx, dy, dz in NEIGHBOUR_CELLS], dtype = np.int64)
+
+    cells = gridCells(points, cellSize)
+    candidates = np.nonzero(np.isin(hashCells(cells), hashCells(aroundTargets)))[0]
+    ids = []
+    matchedRadii = []
+    for point in candidates.tolist():
+        x, y, z = cells[point].tolist()
+        for dx, dy, dz in NEIGHBOUR_CELLS:
+            matched = [target for target in grid.get((x + dx, y + dy, z + dz), ()) if np.linalg.norm(points[point] - targets[target]) <= radii[target]]
+            if matched:
+                ids.append(point)
+                matchedRadii.append(radii[matched[0]])
+                break
+    return np.array(ids, dtype = np.int64), np.array(matchedRadii)
+
+def weldClusters(points, radii):
+    """Groups the points closer together than the smaller of their radii, through a uniform grid spatial hash in expected O(n).
+        Returns an index array for every cluster of 2 or more points"""
+    if len(points) < 2 or radii.max() <= 0.0:
+        return []
+    cells = gridCells(points, radii.max()).tolist()
+    grid = {}
+    for point, cell in enumerate(cells):
+        grid.setdefault(tuple(cell), []).append(point)
+
+    parents = list(range(len(points)))
+    def root(point):
+        while parents[point] != point:
+            parents[point] = parents[parents[point]]
+            point = parents[point]
+        return point
+
+    positions = points.tolist()
+    for point, (x, y, z) in enumerate(cells):
+        for dx, dy, dz in NEIGHBOUR_CELLS:
+            for other in grid.get((x + dx, y + dy, z + dz), ()):
+                if other > point and math.sqrt(sum((a - b) ** 2 for a, b in zip(positions[point], positions[other]))) <= min(radii[point], radii[other]):
+                    parents[root(other)] = root(point)
+
+    clusters = {}
+    for point in range(len(points)):
+        clusters.setdefault(root(point), []).append(point)
+    return [np.array(cluster, dtype = np.int64) for cluster in clusters.values() if len(cluster) > 1]
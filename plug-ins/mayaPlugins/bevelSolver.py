@@ -0,0 +1,452 @@
+"""The Maya-free part of UndoBevel: works out the vertex moves, edge deletions and weld targets for a mesh from plain arrays,
+    so the solve can run in worker processes, and outside Maya. Failures raise BevelError instead of calling cmds.error"""
+import math
+import concurrent.futures
+import numpy as np
+
+from mayaPlugins import bevelKernel
+
+DEFAULT_MIN_ANGLE = 10.0
+DEFAULT_MAX_ANGLE = 80.0
+# the weld tolerance is relative to the shortest edge around each moved vertex, so under 1 it never welds the ends of an edge
+DEFAULT_TOLERANCE = 0.01
+
+
+class BevelError(Exception):
+    """A bevel that can't be undone, UndoBevel reports it with cmds.error"""
+
+
+class BevelMesh(object):
+    """Plain array copy of one mesh: world space points, and the edge / face topology by integer id.
+        The face vertex array is in winding order so face normals point the same way, the per face lists are sorted by id
+        like polyListComponentConversion returns them. Moves only change the points here, and pickling sends just the arrays"""
+    def __init__(self, name, points, edgeVertices, faceOffsets, faceVertexIds, faceEdgeIds):
+        self.name = name
+        self.points = np.array(points, dtype = np.float64).reshape(-1, 3)
+        self.edgeVertexArray = np.asarray(edgeVertices, dtype = np.int64).reshape(-1, 2)
+        self.faceOffsets = np.asarray(faceOffsets, dtype = np.int64)
+        self.faceVertexIds = np.asarray(faceVertexIds, dtype = np.int64)
+        self.faceEdgeIds = np.asarray(faceEdgeIds, dtype = np.int64)
+        self.moved = set()
+
+        # lists of python ints for the per component lookups, the arrays are for bevelKernel
+        self.edgeVertices = [tuple(vertices) for vertices in self.edgeVertexArray.tolist()]
+        offsets = self.faceOffsets.tolist()
+        vertexIds = self.faceVertexIds.tolist()
+        edgeIds = self.faceEdgeIds.tolist()
+        self.faceVertices = [sorted(vertexIds[offsets[face]:offsets[face + 1]]) for face in range(len(offsets) - 1)]
+        self.faceEdges = [edgeIds[offsets[face]:offsets[face + 1]] for face in range(len(offsets) - 1)]
+        self.edgeFaces = [[] for i in range(len(self.edgeVertices))]
+        for face, edges in enumerate(self.faceEdges):
+            for edge in edges:
+                self.edgeFaces[edge].append(face)
+
+        self._vertexEdges = None
+        self._faceCornerArray = None
+        self._edgeFaceArray = None
+        self._quadArrays = None
+
+    def __getstate__(self):
+        return {
+            "name" : self.name,
+            "points" : self.points,
+            "edgeVertices" : self.edgeVertexArray,
+            "faceOffsets" : self.faceOffsets,
+            "faceVertexIds" : self.faceVertexIds,
+            "faceEdgeIds" : self.faceEdgeIds,
+            "moved" : self.moved,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(state["name"], state["points"], state["edgeVertices"], state["faceOffsets"], state["faceVertexIds"], state["faceEdgeIds"])
+        self.moved = state["moved"]
+
+    def position(self, vertex):
+        x, y, z = self.points[vertex].tolist()
+        return x, y, z
+
+    def move(self, vertex, x, y, z):
+        """Sets the position of a vertex in the copy only"""
+        self.points[vertex] = (x, y, z)
+        self.moved.add(vertex)
+
+    def vertexEdges(self, vertex):
+        """Returns the edges at a vertex, the lists for every vertex are built on first use"""
+        if self._vertexEdges is None:
+            self._vertexEdges = [[] for i in range(len(self.points))]
+            for edge, (vertex1, vertex2) in enumerate(self.edgeVertices):
+                self._vertexEdges[vertex1].append(edge)
+                self._vertexEdges[vertex2].append(edge)
+        return self._vertexEdges[vertex]
+
+    def faceCornerArray(self):
+        """Returns the first 3 vertices of every face in winding order, the ones its plane is built from, as an (F, 3) array"""
+        if self._faceCornerArray is None:
+            starts = self.faceOffsets[:-1, np.newaxis]
+            self._faceCornerArray = self.faceVertexIds[starts + np.arange(3)]
+        return self._faceCornerArray
+
+    def edgeFaceArray(self):
+        """Returns the 2 faces of every edge as an (E, 2) array, -1 for border and non-manifold edges"""
+        if self._edgeFaceArray is None:
+            self._edgeFaceArray = np.full((len(self.edgeFaces), 2), -1, dtype = np.int64)
+            for edge, faces in enumerate(self.edgeFaces):
+                if len(faces) == 2:
+                    self._edgeFaceArray[edge] = faces
+        return self._edgeFaceArray
+
+    def quadArrays(self):
+        """Returns the ids of the 4 sided faces and their edges as (Q,) and (Q, 4) arrays"""
+        if self._quadArrays is None:
+            quads = np.nonzero(np.diff(self.faceOffsets) == 4)[0]
+            self._quadArrays = (quads, self.faceEdgeIds[self.faceOffsets[quads][:, np.newaxis] + np.arange(4)])
+        return self._quadArrays
+
+
+class BevelPlan(object):
+    """Everything undoBevel is going to change on one mesh, worked out before any of it is applied"""
+    def __init__(self, mesh, movedVertices, deletedEdges, tolerance = None):
+        self.mesh = mesh.name
+        self.moves = dict((vertex, mesh.position(vertex)) for vertex in sorted(mesh.moved))
+        self.deletedEdges = sorted(deletedEdges)
+        # no tolerance means no weld, like the two edge mode
+        self.targets, self.radii = None, None
+        if tolerance is not None:
+            self.targets, self.radii = weldTargets(mesh, movedVertices, tolerance)
+
+
+def parseComponent(name):
+    """Given a component like pCube1.e[10:5000] or pCube1.e[12], returns the mesh, the component type and a range of the ids,
+        the range is never expanded into separate names"""
+    mesh, _, component = name.partition('.')
+    kind, _, numbers = component.partition('[')
+    first, _, last = numbers.rstrip(']').partition(':')
+    try:
+        return mesh, kind, range(int(first), int(last or first) + 1)
+    except ValueError:
+        raise BevelError("%s is not a component" % name)
+
+def groupComponents(names):
+    """Given component names, returns [mesh, type, int array of ids] for each mesh and type, in the order they first appear.
+        Whole objects in among them are skipped"""
+    groups = {}
+    for name in names:
+        if '[' not in name:
+            continue
+        mesh, kind, ids = parseComponent(name)
+        if (mesh, kind) not in groups:
+            groups[(mesh, kind)] = [mesh, kind, []]
+        groups[(mesh, kind)][2].append(ids)
+    return [[mesh, kind, np.concatenate([np.arange(ids.start, ids.stop) for ids in ranges])] for mesh, kind, ranges in groups.values()]
+
+def componentNames(mesh, kind, ids):
+    """Turns integer ids back into Maya component names, only used where a cmds call needs them. Runs of
+        consecutive ids become a single [#:#] name, found on the whole array so only the runs cost a string each"""
+    ids = np.unique(np.fromiter(ids, dtype = np.int64) if not isinstance(ids, np.ndarray) else ids.astype(np.int64))
+    if len(ids) == 0:
+        return []
+    breaks = np.flatnonzero(np.diff(ids) != 1) + 1
+    firsts = ids[np.concatenate(([0], breaks))].tolist()
+    lasts = ids[np.concatenate((breaks - 1, [len(ids) - 1]))].tolist()
+    return ["%s.%s[%d]" % (mesh, kind, first) if first == last else "%s.%s[%d:%d]" % (mesh, kind, first, last)
+            for first, last in zip(firsts, lasts)]
+
+def distance(x1, y1, z1, x2, y2, z2):
+    """Returns the distance between two points"""
+    return math.sqrt(math.pow(x1 - x2, 2.0) + math.pow(y1 - y2, 2.0) + math.pow(z1 - z2, 2.0))
+
+def closestVertex(mesh, edge, point):
+    """Given an edge and an x, y, z point, returns the vertex of the edge closest to that point"""
+    vertex1, vertex2 = mesh.edgeVertices[edge]
+    x1, y1, z1 = mesh.position(vertex1)
+    x2, y2, z2 = mesh.position(vertex2)
+    d1 = abs(distance(x1, y1, z1, point[0], point[1], point[2]))
+    d2 = abs(distance(x2, y2, z2, point[0], point[1], point[2]))
+
+    if d1 < d2:
+        return vertex1
+    else:
+        return vertex2
+
+def edgeLength(mesh, edge):
+    """Returns the length of a given edge"""
+    vertex1, vertex2 = mesh.edgeVertices[edge]
+    x1, y1, z1 = mesh.position(vertex1)
+    x2, y2, z2 = mesh.position(vertex2)
+    return distance(x1, y1, z1, x2, y2, z2)
+
+def calculateColisions(mesh, edges, faces):
+    """Given matching lists of edges and faces, calculates the points of intersection if each edge and face are
+        extended into a line and a plane, all in one bevelKernel pass. Returns None for the ones that are parallel"""
+    points, valid = bevelKernel.intersectEdgesFaces(mesh.points, mesh.edgeVertexArray, mesh.faceCornerArray(), edges, faces)
+    return [point.tolist() if isValid else None for point, isValid in zip(points, valid)]
+
+def edgesTouching(mesh, edge1, edge2):
+    """Returns whether the 2 edges share exactly 1 vertex"""
+    edge1Points = mesh.edgeVertices[edge1]
+    edge2Points = mesh.edgeVertices[edge2]
+
+    return edge1 != edge2 and ((edge1Points[0] in edge2Points) or (edge1Points[1] in edge2Points))
+
+def getNonSharedFaces(mesh, edges):
+    """Returns the faces that touch exactly one of the edges, in the order they are first found"""
+    nonSharedFaces = {}
+    sharedFaces = set()
+    for edge in edges:
+        for face in mesh.edgeFaces[edge]:
+            if face in nonSharedFaces:
+                del nonSharedFaces[face]
+                sharedFaces.add(face)
+            elif face not in sharedFaces:
+                nonSharedFaces[face] = True
+
+    return list(nonSharedFaces)
+
+def sideEdges(mesh, edge1, face1):
+    """Returns the edges at edge1's ends on face1, the lines its vertices move along"""
+    # only the edges at edge1's ends are looked at, so a long n-gon face1 costs no more than a quad
+    return sorted(set(edge for vertex in mesh.edgeVertices[edge1] for edge in mesh.vertexEdges(vertex)
+                      if edge != edge1 and face1 in mesh.edgeFaces[edge]))
+
+def moveSideVertices(mesh, sides, newVerts, edge2, movedVertices, deletedEdges):
+    """Moves the vertex of each side edge closest to its new position there, and marks edge2 for deletion.
+        Returns the moved vertices, or None when a side edge is parallel to the face"""
+    if None in newVerts:
+        return None
+    movingVerts = [closestVertex(mesh, side, newVert) for side, newVert in zip(sides, newVerts)]
+    for movingVert, newVert in zip(movingVerts, newVerts):
+        mesh.move(movingVert, *newVert)
+    movedVertices.update(movingVerts)
+
+    # deleting now would renumber the mesh and invalidate the topology, so it is left to whoever applies the plan
+    deletedEdges.append(edge2)
+    return movingVerts
+
+def matchEdge(mesh, edge1, face1, edge2, face2, movedVertices, deletedEdges, strict = True):
+    """Moves edge1 on face1 to the projected position on face2, and marks edge2 for deletion. Returns the moved vertices.
+        If face1 doesn't have 2 side edges it's a BevelError, or when not strict just not a match"""
+    sides = sideEdges(mesh, edge1, face1)
+    if len(sides) != 2:
+        if strict:
+            raise BevelError("Invalid Bevel")
+        return False
+
+    newVerts = calculateColisions(mesh, sides, [face2, face2])
+    return moveSideVertices(mesh, sides, newVerts, edge2, movedVertices, deletedEdges) or False
+
+def shorterEdgeFirst(mesh, edge1, edge2):
+    if (edgeLength(mesh, edge2) < edgeLength(mesh, edge1)):
+        return edge2, edge1
+    return edge1, edge2
+
+def longerEdgeFirst(mesh, edge1, edge2):
+    if (edgeLength(mesh, edge2) > edgeLength(mesh, edge1)):
+        return edge2, edge1
+    return edge1, edge2
+
+def fewerCornersFirst(mesh, edgeCombos):
+    """Sorts (edge1, edge2) pairs so the ones moving edge1 along a face with fewer corners come first, keeping the order
+        otherwise. The sides of a quad lead straight across a bevel, those of an n-gon cap run along its rim"""
+    def corners(edges):
+        faces = getNonSharedFaces(mesh, edges)
+        return len(mesh.faceEdges[faces[0]]) if len(faces) == 2 else 0
+    return sorted(edgeCombos, key = corners)
+
+def matchEdgePair(mesh, edge1, edge2, movedVertices, deletedEdges, strict = True, ordered = False):
+    """Given the 2 rails of a bevel, collapses it onto one of the faces either side, moving the edge next to a face
+        with fewer corners then the shorter edge first, or edge1 first when ordered. Returns the moved vertices"""
+    edgeCombos = []
+    if ordered:
+        edgeCombos.append((edge1, edge2))
+        edgeCombos.append((edge2, edge1))
+    else:
+        edgeCombos.append(shorterEdgeFirst(mesh, edge1, edge2))
+        edgeCombos.append(longerEdgeFirst(mesh, edge1, edge2))
+        edgeCombos = fewerCornersFirst(mesh, edgeCombos)
+
+    for edge1, edge2 in edgeCombos:
+        faces = getNonSharedFaces(mesh, [edge1, edge2])
+        if len(faces) != 2:
+            continue
+        face1, face2 = faces
+        matched = matchEdge(mesh, edge1, face1, edge2, face2, movedVertices, deletedEdges, strict)
+        if matched:
+            return matched
+    return False
+
+def weldTargets(mesh, vertices, tolerance):
+    """Returns where the moved vertices are, and how close another vertex has to be to weld to each one: tolerance times
+        the length of its shortest edge. Has to be taken before the edges are deleted and the vertices renumbered"""
+    ids = np.array(sorted(vertices), dtype = np.int64)
+    radii = tolerance * bevelKernel.shortestEdgeLengths(mesh.points, mesh.edgeVertexArray)[ids]
+    return mesh.points[ids].copy(), radii
+
+def orderPairs(mesh, edge1, edge2, edge3, edge4, otherFaces):
+    longestEdge = edge1
+    longestLength = 0.0
+    edges = [edge1, edge2, edge3, edge4]
+    for edge in edges:
+        length = edgeLength(mesh, edge)
+        if length > longestLength:
+            longestEdge = edge
+            longestLength = length
+    # a pair on an open border has only 1 face across it
+    faces12 = getNonSharedFaces(mesh, [edge1, edge2])
+    faces34 = getNonSharedFaces(mesh, [edge3, edge4])
+    if any(face in otherFaces for face in faces34):
+        return edge1, edge2, edge3, edge4
+    elif any(face in otherFaces for face in faces12):
+        return edge3, edge4, edge1, edge2
+    if longestEdge == edge1 or longestEdge == edge2:
+        return edge1, edge2, edge3, edge4
+    else:
+        return edge3, edge4, edge1, edge2
+
+def undoBevelFace(mesh, face, otherFaces, movedVertices, deletedEdges):
+    edges = mesh.faceEdges[face]
+
+    if len(edges) == 4:
+        edge1 = edges[0]
+        edge2 = None
+        for edge in edges:
+            if not edgesTouching(mesh, edge1, edge) and edge != edge1:
+                if edge2 is not None:
+                    raise BevelError("Invalid face")
+                edge2 = edge 
+
+        edge3 = None
+        edge4 = None 
+        for edge in edges:
+            if edgesTouching(mesh, edge1, edge):
+                if edge3 is None:
+                    edge3 = edge
+                elif edge4 is None:
+                    edge4 = edge
+                else:
+                    raise BevelError("Invalid face")
+        if edge2 is None or edge4 is None:
+            raise BevelError("Invalid face")
+        
+        edge1, edge2, edge3, edge4 = orderPairs(mesh, edge1, edge2, edge3, edge4, otherFaces)
+        
+        # each pair's edge next to a face with fewer corners first, keeping the pair orderPairs chose first
+        combos12 = fewerCornersFirst(mesh, [shorterEdgeFirst(mesh, edge1, edge2), longerEdgeFirst(mesh, edge1, edge2)])
+        combos34 = fewerCornersFirst(mesh, [shorterEdgeFirst(mesh, edge3, edge4), longerEdgeFirst(mesh, edge3, edge4)])
+        edgeCombos = [combos12[0], combos34[0], combos12[1], combos34[1]]
+
+        for edge1, edge2 in edgeCombos:
+            faces = getNonSharedFaces(mesh, [edge1, edge2])
+            # an edge on an open border has no face across it to collapse onto
+            if len(faces) != 2:
+                continue
+            face1, face2 = faces
+            matched = matchEdge(mesh, edge1, face1, edge2, face2, movedVertices, deletedEdges)
+            if matched:
+                return
+    else:
+        raise BevelError("faces must have 4 or 3 sides")
+    raise BevelError("Invalid")
+
+def solveSelection(mesh, kind, selected, tolerance = DEFAULT_TOLERANCE):
+    """Plans collapsing the selected bevel faces, or the 2 selected edges, of one mesh then welding the moved vertices"""
+    movedVertices = set()
+    deletedEdges = []
+
+    if kind == "f":
+        otherFaces = set(selected.tolist())
+        for face in reversed(selected.tolist()):
+            undoBevelFace(mesh, face, otherFaces, movedVertices, deletedEdges)
+
+    elif kind == "e":
+        if len(selected) != 2:
+            raise BevelError("Select either a number of faces, or 2 edges")   
+        edge1 = int(selected[0])
+        edge2 = int(selected[1])
+
+        if matchEdgePair(mesh, edge1, edge2, movedVertices, deletedEdges):
+            return BevelPlan(mesh, movedVertices, deletedEdges)
+        raise BevelError("Invalid")
+
+    else:
+        raise BevelError("Select either a number of faces, or 2 edges")
+
+    return BevelPlan(mesh, movedVertices, deletedEdges, tolerance)
+
+def detectBevels(mesh, minAngle = DEFAULT_MIN_ANGLE, maxAngle = DEFAULT_MAX_ANGLE):
+    """Finds every single segment chamfer on a mesh from its face normals, returns the face ids and the rail edges of each,
+        the one to move first"""
+    quadFaces, quadEdges = mesh.quadArrays()
+    normals = bevelKernel.faceNormals(mesh.points, mesh.faceCornerArray())
+    return bevelKernel.detectChamfers(mesh.points, mesh.faceOffsets, mesh.faceVertexIds, normals, mesh.edgeVertexArray,
+                                      mesh.edgeFaceArray(), quadFaces, quadEdges, math.radians(minAngle), math.radians(maxAngle))
+
+def matchRound(mesh, rails, movedVertices, deletedEdges):
+    """Matches the chamfers of a mesh in order like matchEdgePair with their first rails first, intersecting the side
+        edges of all of them in one bevelKernel pass from the points as the round starts. A chamfer takes its points
+        unless one before it this round moved a corner of the face it lands on, or an end of one of its side edges
+        along another edge. Moving a vertex along the side edge itself leaves the line where it was, which is how the
+        chamfers of a run meet, so a run mostly goes in one round. The others wait for the next round, with every
+        later chamfer sharing a vertex with them so each one still sees the mesh as if they were matched one at a time.
+        Returns the rails left waiting"""
+    corners = mesh.faceCornerArray()
+    targets = []
+    footprints = []
+    for edge1, edge2 in rails:
+        faces = getNonSharedFaces(mesh, [edge1, edge2])
+        sides = sideEdges(mesh, edge1, faces[0]) if len(faces) == 2 else []
+        targets.append((sides, faces[1]) if len(sides) == 2 else None)
+        # the vertices matching it either way round reads or moves
+        footprint = set(mesh.edgeVertices[edge1] + mesh.edgeVertices[edge2])
+        if len(faces) == 2:
+            footprint.update(vertex for side in sides + sideEdges(mesh, edge2, faces[1]) for vertex in mesh.edgeVertices[side])
+            footprint.update(corners[faces].ravel().tolist())
+        footprints.append(footprint)
+    ready = [target for target in targets if target is not None]
+    newVerts = iter(calculateColisions(mesh, [side for sides, face2 in ready for side in sides],
+                                       [face2 for sides, face2 in ready for side in sides]))
+
+    # the side edge each vertex moved along this round, None when not known
+    movedAlong = {}
+    touched = set()
+    waiting = []
+    for (edge1, edge2), target, footprint in zip(rails, targets, footprints):
+        if target is not None:
+            sides, face2 = target
+            points = [next(newVerts), next(newVerts)]
+        if touched & footprint:
+            waiting.append((edge1, edge2))
+            touched |= footprint
+            continue
+        if target is not None and None not in points:
+            if any(vertex in movedAlong for vertex in corners[face2].tolist()) or \
+               any(movedAlong.get(vertex, side) != side for side in sides for vertex in mesh.edgeVertices[side]):
+                waiting.append((edge1, edge2))
+                touched |= footprint
+                continue
+            movingVerts = moveSideVertices(mesh, sides, points, edge2, movedVertices, deletedEdges)
+            movedAlong.update(zip(movingVerts, sides))
+        else:
+            # it can't go that way, so matchEdgePair tries the other way round from the points as they are now
+            movingVerts = matchEdgePair(mesh, edge1, edge2, movedVertices, deletedEdges, strict = False, ordered = True)
+            movedAlong.update((vertex, None) for vertex in movingVerts or [])
+    return waiting
+
+def solveMesh(mesh, minAngle = DEFAULT_MIN_ANGLE, maxAngle = DEFAULT_MAX_ANGLE, tolerance = DEFAULT_TOLERANCE):
+    """Plans collapsing every bevel detectBevels finds on a mesh, applied with a single edge delete and a single merge.
+        The chamfers are matched in rounds, see matchRound"""
+    movedVertices = set()
+    deletedEdges = []
+    faces, rails = detectBevels(mesh, minAngle, maxAngle)
+    rails = rails.tolist()
+    while rails:
+        rails = matchRound(mesh, rails, movedVertices, deletedEdges)
+    return BevelPlan(mesh, movedVertices, deletedEdges, tolerance)
+
+def solveMeshes(meshes, minAngle = DEFAULT_MIN_ANGLE, maxAngle = DEFAULT_MAX_ANGLE, tolerance = DEFAULT_TOLERANCE, workers = 1, mpContext = None):
+    """Runs solveMesh over a list of BevelMesh, in a pool of worker processes when workers is more than 1.
+        Returns the BevelPlans in the same order as the meshes"""
+    count = len(meshes)
+    if workers <= 1 or count <= 1:
+        return [solveMesh(mesh, minAngle, maxAngle, tolerance) for mesh in meshes]
+    with concurrent.futures.ProcessPoolExecutor(max_workers = min(workers, count), mp_context = mpContext) as pool:
+        return list(pool.map(solveMesh, meshes, [minAngle] * count, [maxAngle] * count, [tolerance] * count))
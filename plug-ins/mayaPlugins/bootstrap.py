@@ -0,0 +1,102 @@
+"""Registers the commands of every plug-in in this folder from one table. A plug-in only registers its own rows, the
+    AllPlugins loader all of them. Nothing a command needs is imported when it is registered: the module the command
+    lives in and the modules it imports with lazyImport are only run on the first call of something in them, so
+    auto-loading every plug-in at startup costs a table lookup per command"""
+import sys
+import types
+import collections
+import importlib.util
+import maya.OpenMaya as OpenMaya
+import maya.OpenMayaMPx as OpenMayaMPx
+from maya import cmds
+
+# a command, the plug-in module it lives in and the names of its MPxCommand class and syntax creator there
+Command = collections.namedtuple("Command", "name module commandClass syntaxCreator")
+
+COMMANDS = (
+    Command("createDisney", "CreatePxrDisney", "scriptedCommand", "syntaxCreator"),
+    Command("swapDisneyTextures", "CreatePxrDisney", "swapCommand", "swapSyntaxCreator"),
+    Command("relinkTextures", "CreatePxrDisney", "relinkCommand", "relinkSyntaxCreator"),
+    Command("createLambert", "CreateLambert", "scriptedCommand", "syntaxCreator"),
+    Command("consolidateMaterials", "CreateLambert", "consolidateCommand", "consolidateSyntaxCreator"),
+    Command("undoBevel", "UndoBevel", "scriptedCommand", "syntaxCreator"),
+    Command("selectHardSoftEdges", "SelectHardSoftEdges", "scriptedCommand", "syntaxCreator"),
+)
+
+
+def checkCommands(commands):
+    """Raises a ValueError naming the commands in the table more than once"""
+    counts = collections.Counter(command.name for command in commands)
+    duplicates = sorted(name for name, count in counts.items() if count > 1)
+    if duplicates:
+        raise ValueError("Commands in the table more than once: %s" % ", ".join(duplicates))
+
+checkCommands(COMMANDS)
+
+# plug-in name -> the commands it registered and their creators, which Maya only holds on to while they are referenced
+_registered = {}
+
+
+def lazyImport(name):
+    """Returns a module that is only run the first time one of its attributes is used, or the module if it has been
+        imported already. A module imported normally later on gets this one, whether it has been run yet or not"""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError("No module named %s" % name, name = name)
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    parent, _, child = name.rpartition(".")
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+def isLoaded(module):
+    """Whether a module from lazyImport has been run, so cleaning up after one that never was doesn't run it"""
+    return type(module) is types.ModuleType
+
+def commandCreator(module, command):
+    def creator():
+        return OpenMayaMPx.asMPxPtr(getattr(module, command.commandClass)())
+    return creator
+
+def syntaxCreator(module, command):
+    def creator():
+        return getattr(module, command.syntaxCreator)()
+    return creator
+
+def register(mobject, moduleName = None):
+    """Registers the commands of the plug-in module named, every command in the table when there is none. A command
+        that already exists, because another plug-in registered it, is left to that plug-in with a warning"""
+    mplugin = OpenMayaMPx.MFnPlugin(mobject)
+    commands = [command for command in COMMANDS if moduleName is None or command.module == moduleName]
+    if not commands:
+        raise ValueError("No commands in the table for %s" % moduleName)
+    registered = _registered.setdefault(mplugin.name(), [])
+    for command in commands:
+        if cmds.exists(command.name):
+            OpenMaya.MGlobal.displayWarning("%s is already registered, %s leaves it be" % (command.name, mplugin.name()))
+            continue
+        # a plug-in registering its own commands gets the module Maya loaded, the loader a lazy one
+        module = lazyImport(command.module)
+        creators = (commandCreator(module, command), syntaxCreator(module, command))
+        try:
+            mplugin.registerCommand(command.name, *creators)
+        except:
+            sys.stderr.write( "Failed to register command: %s\n" % command.name )
+            raise
+        registered.append((command.name, creators))
+
+def deregister(mobject):
+    """Deregisters the commands a plug-in registered"""
+    mplugin = OpenMayaMPx.MFnPlugin(mobject)
+    registered = _registered.pop(mplugin.name(), [])
+    for name, creators in registered:
+        try:
+            mplugin.deregisterCommand(name)
+        except:
+            sys.stderr.write( "Failed to unregister command: %s\n" % name )
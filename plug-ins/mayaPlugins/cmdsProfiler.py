@@ -0,0 +1,170 @@
+"""Opt-in profiling of the maya.cmds calls the plug-ins make. Each plug-in, and each shared module calling cmds such as
+    the edgeCache, registers its module here, and enabling swaps its cmds for a proxy that records the call count,
+    cumulative time and argument cardinality of every command, per calling helper and per call stack. Disabled, the
+    plug-ins hold the real maya.cmds and pay nothing.
+
+    Set MAYA_PLUGINS_PROFILE=1 to enable it as the plug-ins load, and MAYA_PLUGINS_PROFILE_OUTPUT to a .json or a
+    collapsed stack (.folded / .txt, for flamegraph.pl or speedscope) path to write the results when Maya exits"""
+import os
+import re
+import sys
+import json
+import time
+import atexit
+import threading
+
+PROFILE_VARIABLE = "MAYA_PLUGINS_PROFILE"
+OUTPUT_VARIABLE = "MAYA_PLUGINS_PROFILE_OUTPUT"
+# how many plug-in frames a collapsed stack keeps
+MAX_STACK_DEPTH = 32
+
+COMPONENT_RANGE = re.compile(r"\[(\d+):(\d+)\]$")
+
+_modules = {}
+_enabled = False
+_lock = threading.Lock()
+# (caller, command) -> [calls, seconds, total cardinality, max cardinality]
+_callers = {}
+# (frame names..., command) -> [calls, seconds]
+_stacks = {}
+
+
+def cardinality(args):
+    """How many things a call was given: list items and the ids in a component range count one each"""
+    count = 0
+    for arg in args:
+        if isinstance(arg, (list, tuple)):
+            count += cardinality(arg)
+        elif isinstance(arg, str):
+            match = COMPONENT_RANGE.search(arg)
+            count += int(match.group(2)) - int(match.group(1)) + 1 if match else 1
+        else:
+            count += 1
+    return count
+
+def pluginStack(frame):
+    """Returns the names of the plug-in functions on the stack, outermost first, stopping at the first frame outside them"""
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        module = frame.f_globals.get("__name__", "")
+        if module not in _modules and not module.startswith("mayaPlugins"):
+            break
+        names.append(frame.f_code.co_name)
+        frame = frame.f_back
+    names.reverse()
+    return tuple(names)
+
+def record(command, frame, args, seconds):
+    stack = pluginStack(frame)
+    caller = stack[-1] if stack else "<maya>"
+    size = cardinality(args)
+    with _lock:
+        stats = _callers.get((caller, command))
+        if stats is None:
+            stats = _callers[(caller, command)] = [0, 0.0, 0, 0]
+        stats[0] += 1
+        stats[1] += seconds
+        stats[2] += size
+        stats[3] = max(stats[3], size)
+        stats = _stacks.get(stack + (command,))
+        if stats is None:
+            stats = _stacks[stack + (command,)] = [0, 0.0]
+        stats[0] += 1
+        stats[1] += seconds
+
+
+class ProfiledCmds(object):
+    """Stands in for maya.cmds while profiling, each command is wrapped the first time it is looked up"""
+    def __init__(self, cmds):
+        self._cmds = cmds
+
+    def __getattr__(self, name):
+        command = getattr(self._cmds, name)
+        if not callable(command):
+            return command
+        def profiled(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return command(*args, **kwargs)
+            finally:
+                record(name, sys._getframe(1), args, time.perf_counter() - start)
+        profiled.__name__ = name
+        profiled.__doc__ = command.__doc__
+        setattr(self, name, profiled)
+        return profiled
+
+
+def register(moduleName):
+    """Called by each plug-in with its __name__ once it has imported cmds. Profiles it straight away if enabled"""
+    module = sys.modules[moduleName]
+    _modules[moduleName] = module.cmds
+    if _enabled:
+        module.cmds = ProfiledCmds(_modules[moduleName])
+
+def enable():
+    """Swaps every registered plug-in's cmds for a ProfiledCmds, and profiles plug-ins registered later too"""
+    global _enabled
+    _enabled = True
+    for name, cmds in _modules.items():
+        sys.modules[name].cmds = ProfiledCmds(cmds)
+
+def disable():
+    """Gives every registered plug-in back the real cmds, the results so far are kept"""
+    global _enabled
+    _enabled = False
+    for name, cmds in _modules.items():
+        sys.modules[name].cmds = cmds
+
+def isEnabled():
+    return _enabled
+
+def reset():
+    with _lock:
+        _callers.clear()
+        _stacks.clear()
+
+def results():
+    """Returns the results as a dict: per command totals, and per calling helper -> command, each with calls,
+        seconds and the total and largest argument cardinality"""
+    with _lock:
+        callers = dict((key, list(stats)) for key, stats in _callers.items())
+    commands = {}
+    for (caller, command), (calls, seconds, size, largest) in callers.items():
+        totals = commands.setdefault(command, {"calls" : 0, "seconds" : 0.0, "cardinality" : 0, "maxCardinality" : 0})
+        totals["calls"] += calls
+        totals["seconds"] += seconds
+        totals["cardinality"] += size
+        totals["maxCardinality"] = max(totals["maxCardinality"], largest)
+    return {
+        "commands" : commands,
+        "callers" : [{"caller" : caller, "command" : command, "calls" : calls, "seconds" : seconds, "cardinality" : size, "maxCardinality" : largest}
+                     for (caller, command), (calls, seconds, size, largest) in sorted(callers.items(), key = lambda item: -item[1][1])],
+    }
+
+def collapsedStacks(weight = "time"):
+    """Returns the call stacks in the collapsed format flamegraph.pl reads, one "a;b;command value" line each.
+        The value is microseconds when weighted by time, or the number of calls when weighted by calls"""
+    with _lock:
+        stacks = dict((key, list(stats)) for key, stats in _stacks.items())
+    lines = []
+    for stack, (calls, seconds) in sorted(stacks.items()):
+        value = calls if weight == "calls" else int(round(seconds * 1e6))
+        lines.append("%s %d" % (";".join(stack), value))
+    return "\n".join(lines) + "\n"
+
+def dump(path, weight = "time"):
+    """Writes the results to path, as JSON for a .json path and as collapsed stacks otherwise"""
+    with open(path, "w") as f:
+        if path.lower().endswith(".json"):
+            json.dump(results(), f, indent = 2, sort_keys = True)
+        else:
+            f.write(collapsedStacks(weight))
+
+def _dumpAtExit():
+    path = os.environ.get(OUTPUT_VARIABLE)
+    if path and (_callers or _stacks):
+        dump(path)
+
+if os.environ.get(PROFILE_VARIABLE, "") not in ("", "0"):
+    enable()
+    atexit.register(_dumpAtExit)
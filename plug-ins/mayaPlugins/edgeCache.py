@@ -0,0 +1,189 @@
+"""Keeps the edgeSharpness.EdgeMesh of every mesh queried between commands, so selecting hard and soft edges again
+    while modeling only rereads and recomputes what changed. Callbacks on each mesh shape record the vertices tweaked
+    since the last query, whether it moved as a whole and whether anything else about it changed. Deleted meshes are
+    dropped, and the least recently used ones once the cache is over its memory cap"""
+import os
+import collections
+import numpy as np
+import maya.OpenMaya as OpenMaya
+from maya import cmds
+
+from mayaPlugins import cmdsProfiler
+from mayaPlugins import edgeSharpness
+from mayaPlugins.bevelSolver import componentNames
+
+cmdsProfiler.register(__name__)
+
+# the memory cap in megabytes
+EDGE_CACHE_SIZE_VARIABLE = "MAYA_EDGE_CACHE_SIZE"
+DEFAULT_CACHE_SIZE = 1024
+
+# vertex tweaks, an element of pnts or one of its children
+TWEAK_ATTRIBUTES = {"pnts", "pntx", "pnty", "pntz"}
+# dirtied when a parent transform moves, which moves every world space point
+MATRIX_ATTRIBUTES = {"worldMatrix", "parentMatrix"}
+# a new mesh from the history, the flags or the points may have changed with the same topology
+INPUT_ATTRIBUTES = {"inMesh"}
+# dirtied by every edit, tweaks included, and by edits made without history
+OUTPUT_ATTRIBUTES = {"outMesh", "worldMesh"}
+
+
+class CacheEntry(object):
+    """A mesh's EdgeMesh and what its callbacks have seen change since it was last brought up to date"""
+    def __init__(self, shape, edgeMesh):
+        self.handle = OpenMaya.MObjectHandle(shape)
+        self.edgeMesh = edgeMesh
+        self.callbacks = []
+        self.clean()
+
+    def clean(self):
+        self.tweaked = set()
+        self.moved = False
+        self.stale = False
+
+    def isDirty(self):
+        return self.stale or self.moved or len(self.tweaked) > 0
+
+
+_entries = collections.OrderedDict()
+_sceneCallbacks = []
+# the callbacks of deleted meshes, removed on the next query rather than from inside one of them
+_removedCallbacks = []
+
+
+def cacheSize():
+    """The memory cap in bytes"""
+    return int(os.environ.get(EDGE_CACHE_SIZE_VARIABLE) or DEFAULT_CACHE_SIZE) * 1024 * 1024
+
+def shapeNode(mesh):
+    """The MObject of a mesh's shape, given the shape or its transform"""
+    selection = OpenMaya.MSelectionList()
+    selection.add(mesh)
+    dagPath = OpenMaya.MDagPath()
+    selection.getDagPath(0, dagPath)
+    dagPath.extendToShape()
+    return dagPath.node()
+
+def readArrays(mesh, withFaces = False):
+    """Reads the edges of a mesh and their smoothing flags with one polyInfo query, for the angle test the world space
+        points with one xform query and the face vertices with one more polyInfo. Returns the arguments of an EdgeMesh
+        after its name"""
+    edgeVertices, hard = edgeSharpness.parseEdgeInfo(cmds.polyInfo("%s.e[*]" % mesh, edgeToVertex = True) or [])
+    if not withFaces:
+        return edgeVertices, hard
+    faceCounts, faceVertexIds = edgeSharpness.parseFaceInfo(cmds.polyInfo("%s.f[*]" % mesh, faceToVertex = True) or [])
+    return edgeVertices, hard, readPoints(mesh), faceCounts, faceVertexIds
+
+def readPoints(mesh, vertices = None):
+    """Reads the world space points of a mesh, or of the sorted vertices given, with one xform query"""
+    components = "%s.vtx[*]" % mesh if vertices is None else componentNames(mesh, "vtx", vertices)
+    return np.array(cmds.xform(components, query = True, worldSpace = True, translation = True), dtype = np.float64).reshape(-1, 3)
+
+def edgeMesh(mesh, withFaces = False):
+    """Returns the EdgeMesh of a mesh, read the first time it is asked for and afterwards only brought up to date with
+        what its callbacks saw change. withFaces asks for the points and faces the angle test needs"""
+    while _removedCallbacks:
+        OpenMaya.MMessage.removeCallback(_removedCallbacks.pop())
+    shape = shapeNode(mesh)
+    entry = _entries.get(mesh)
+    if entry is not None and (not entry.handle.isValid() or entry.handle.object() != shape or (withFaces and not entry.edgeMesh.hasFaces())):
+        # the name is another mesh's now, or the points and faces weren't read
+        drop(mesh)
+        entry = None
+    if entry is None:
+        entry = CacheEntry(shape, edgeSharpness.EdgeMesh(mesh, *readArrays(mesh, withFaces)))
+        watch(mesh, entry)
+        _entries[mesh] = entry
+    elif entry.isDirty():
+        update(mesh, entry)
+    _entries.move_to_end(mesh)
+    evict(cacheSize(), keep = mesh)
+    return entry.edgeMesh
+
+def update(mesh, entry):
+    """Brings an entry up to date with the least it can read: nothing for tweaks to a mesh only its flags are kept
+        for, the tweaked points alone, every point, or the whole mesh, compared with the copy to keep what is the same"""
+    current = entry.edgeMesh
+    tweaked = np.array(sorted(entry.tweaked), dtype = np.int64)
+    if entry.stale or (current.hasFaces() and len(tweaked) > 0 and tweaked[-1] >= len(current.points)):
+        current.refresh(*readArrays(mesh, current.hasFaces()))
+    elif current.hasFaces() and entry.moved:
+        current.movePoints(readPoints(mesh))
+    elif current.hasFaces():
+        current.movePoints(readPoints(mesh, tweaked), tweaked)
+    entry.clean()
+
+def watch(mesh, entry):
+    """Adds the callbacks that keep an entry's record of what changed"""
+    shape = entry.handle.object()
+    entry.callbacks = [
+        OpenMaya.MNodeMessage.addNodeDirtyPlugCallback(shape, plugDirtied, mesh),
+        OpenMaya.MPolyMessage.addPolyTopologyChangedCallback(shape, topologyChanged, mesh),
+        OpenMaya.MNodeMessage.addNodePreRemovalCallback(shape, meshRemoved, mesh),
+    ]
+    if not _sceneCallbacks:
+        for message in (OpenMaya.MSceneMessage.kBeforeNew, OpenMaya.MSceneMessage.kBeforeOpen):
+            _sceneCallbacks.append(OpenMaya.MSceneMessage.addCallback(message, sceneChanged))
+
+def plugDirtied(node, plug, mesh):
+    entry = _entries.get(mesh)
+    if entry is None:
+        return
+    name = OpenMaya.MFnAttribute(plug.attribute()).name()
+    if name in TWEAK_ATTRIBUTES:
+        if plug.isChild():
+            plug = plug.parent()
+        if plug.isElement():
+            entry.tweaked.add(plug.logicalIndex())
+        else:
+            entry.moved = True
+    elif name in MATRIX_ATTRIBUTES:
+        entry.moved = True
+    elif name in INPUT_ATTRIBUTES:
+        entry.stale = True
+    elif name in OUTPUT_ATTRIBUTES and not (entry.tweaked or entry.moved):
+        # not a tweak going through, some edit made without history
+        entry.stale = True
+
+def topologyChanged(node, mesh):
+    entry = _entries.get(mesh)
+    if entry is not None:
+        entry.stale = True
+
+def meshRemoved(node, mesh):
+    entry = _entries.pop(mesh, None)
+    if entry is not None:
+        _removedCallbacks.extend(entry.callbacks)
+
+def sceneChanged(clientData = None):
+    clear()
+
+def drop(mesh):
+    """Forgets a mesh and removes its callbacks"""
+    entry = _entries.pop(mesh, None)
+    if entry is not None:
+        for callback in entry.callbacks:
+            OpenMaya.MMessage.removeCallback(callback)
+
+def evict(limit, keep = None):
+    """Drops the least recently used meshes until the cache is under limit bytes, never the one in keep. Returns how
+        many bytes were freed"""
+    sizes = collections.OrderedDict((mesh, entry.edgeMesh.nbytes()) for mesh, entry in _entries.items())
+    total = sum(sizes.values())
+    freed = 0
+    for mesh, size in sizes.items():
+        if total - freed <= limit:
+            break
+        if mesh == keep:
+            continue
+        drop(mesh)
+        freed += size
+    return freed
+
+def clear():
+    """Forgets every mesh and removes every callback, for a new scene and when a plug-in using the cache unloads"""
+    for mesh in list(_entries):
+        drop(mesh)
+    for callbacks in (_removedCallbacks, _sceneCallbacks):
+        while callbacks:
+            OpenMaya.MMessage.removeCallback(callbacks.pop())
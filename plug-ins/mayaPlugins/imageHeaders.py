@@ -0,0 +1,213 @@
+"""Reads the resolution, channels, bit depth and colour encoding of PNG, JPEG, TIFF and OpenEXR images from their headers
+    alone, with no Maya in it. No pixels are decoded and at most MAX_BLOCKS small blocks of a file are read, so probing
+    a whole library stays fast on network storage where loading the images would not"""
+import struct
+import concurrent.futures
+
+from mayaPlugins import pbrTextures
+
+BLOCK_SIZE = 16 * 1024
+# 128KB, the most of any one file a header is looked for in
+MAX_BLOCKS = 8
+
+# the colour encodings a header tells apart
+SRGB = "srgb"
+LINEAR = "linear"
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+EXR_MAGIC = b"\x76\x2f\x31\x01"
+# PNG colour type -> channels
+PNG_CHANNELS = {0 : 1, 2 : 3, 3 : 3, 4 : 2, 6 : 4}
+# the JPEG start of frame markers, every C0 to CF but the DHT, JPG and DAC ones
+JPEG_FRAMES = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# TIFF field type -> bytes per value
+TIFF_SIZES = {1 : 1, 2 : 1, 3 : 2, 4 : 4, 5 : 8, 6 : 1, 7 : 1, 8 : 2, 9 : 4, 10 : 8, 11 : 4, 12 : 8}
+TIFF_FORMATS = {3 : "H", 4 : "I", 8 : "h", 9 : "i"}
+# EXR pixel type -> bits, UINT, HALF and FLOAT
+EXR_BITS = {0 : 32, 1 : 16, 2 : 32}
+
+
+class ImageInfo(object):
+    """What an image header says about it"""
+    def __init__(self, width, height, channels, bits, floating, alpha, encoding):
+        self.width = width
+        self.height = height
+        self.channels = channels
+        # bits per channel, and whether they hold floats
+        self.bits = bits
+        self.floating = floating
+        self.alpha = alpha
+        # SRGB or LINEAR
+        self.encoding = encoding
+
+    def __repr__(self):
+        return "ImageInfo(%dx%d, %d channels, %d bit%s%s, %s)" % (self.width, self.height, self.channels, self.bits,
+                                                                 " float" if self.floating else "", ", alpha" if self.alpha else "", self.encoding)
+
+
+class BlockReader(object):
+    """Reads a file a block at a time, only the blocks the parser asks for and no more than MAX_BLOCKS of them"""
+    def __init__(self, f):
+        self.f = f
+        self.blocks = {}
+
+    def read(self, offset, size):
+        """Up to size bytes at offset, fewer at the end of the file"""
+        data = b""
+        while size > 0:
+            index, start = divmod(offset, BLOCK_SIZE)
+            chunk = self.block(index)[start:start + size]
+            if not chunk:
+                break
+            data += chunk
+            offset += len(chunk)
+            size -= len(chunk)
+        return data
+
+    def unpack(self, offset, format):
+        return struct.unpack(format, self.read(offset, struct.calcsize(format)))
+
+    def string(self, offset):
+        """The null terminated string at offset"""
+        data = self.read(offset, 256)
+        return data[:data.index(b"\0")].decode("latin-1")
+
+    def block(self, index):
+        if index not in self.blocks:
+            if len(self.blocks) >= MAX_BLOCKS:
+                raise ValueError("no header in the first %d blocks" % MAX_BLOCKS)
+            self.f.seek(index * BLOCK_SIZE)
+            self.blocks[index] = self.f.read(BLOCK_SIZE)
+        return self.blocks[index]
+
+
+def read_png(reader):
+    width, height, bits, color_type = reader.unpack(16, ">IIBB")
+    channels = PNG_CHANNELS[color_type]
+    alpha = color_type in (4, 6)
+    encoding = SRGB
+    # the chunks before the pixels, a gamma of 1.0 or a linear profile means linear
+    offset = 8
+    while True:
+        length, chunk = reader.unpack(offset, ">I4s")
+        if chunk in (b"IDAT", b"IEND"):
+            break
+        if chunk == b"tRNS":
+            alpha = True
+            channels = max(channels, 2 if color_type == 0 else 4)
+        elif chunk == b"gAMA" and reader.unpack(offset + 8, ">I")[0] == 100000:
+            encoding = LINEAR
+        elif chunk == b"iCCP" and "linear" in reader.string(offset + 8).lower():
+            encoding = LINEAR
+        offset += 12 + length
+    return ImageInfo(width, height, channels, bits, False, alpha, encoding)
+
+def read_jpeg(reader):
+    offset = 2
+    while True:
+        fill, marker = reader.unpack(offset, ">BB")
+        if fill != 0xFF:
+            raise ValueError("not a JPEG marker")
+        if marker == 0xFF:
+            offset += 1
+        elif marker in JPEG_FRAMES:
+            bits, height, width, channels = reader.unpack(offset + 4, ">BHHB")
+            return ImageInfo(width, height, channels, bits, False, False, SRGB)
+        elif marker in (0xDA, 0xD9):
+            raise ValueError("no JPEG frame header before the scan")
+        elif marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            offset += 2
+        else:
+            offset += 2 + reader.unpack(offset + 2, ">H")[0]
+
+def read_tiff(reader):
+    order = {b"II" : "<", b"MM" : ">"}[reader.read(0, 2)]
+    magic, offset = reader.unpack(2, order + "HI")
+    if magic != 42:
+        raise ValueError("not a classic TIFF")
+    fields = {}
+    count = reader.unpack(offset, order + "H")[0]
+    for entry in range(offset + 2, offset + 2 + 12 * count, 12):
+        tag, field_type, values = reader.unpack(entry, order + "HHI")
+        if tag not in (256, 257, 258, 262, 277, 338, 339) or field_type not in TIFF_FORMATS:
+            continue
+        size = TIFF_SIZES[field_type] * values
+        # values that fit in the entry are stored in it, the rest at the offset it holds
+        at = entry + 8 if size <= 4 else reader.unpack(entry + 8, order + "I")[0]
+        fields[tag] = reader.unpack(at, order + TIFF_FORMATS[field_type] * values)
+    channels = fields.get(277, (1,))[0]
+    if fields.get(262, (2,))[0] == 3:
+        # a palette, expanded to RGB
+        channels = 3
+    floating = fields.get(339, (1,))[0] == 3
+    return ImageInfo(fields[256][0], fields[257][0], channels, fields.get(258, (1,))[0], floating, 338 in fields, LINEAR if floating else SRGB)
+
+def read_exr(reader):
+    offset = 8
+    width = height = None
+    names = []
+    bits = set()
+    while True:
+        name = reader.string(offset)
+        if not name:
+            break
+        attribute_type = reader.string(offset + len(name) + 1)
+        value = offset + len(name) + len(attribute_type) + 2
+        size = reader.unpack(value, "<i")[0]
+        value += 4
+        if name == "channels":
+            at = value
+            while True:
+                channel = reader.string(at)
+                if not channel:
+                    break
+                names.append(channel)
+                bits.add(reader.unpack(at + len(channel) + 1, "<i")[0])
+                at += len(channel) + 17
+        elif name == "dataWindow":
+            xmin, ymin, xmax, ymax = reader.unpack(value, "<iiii")
+            width, height = xmax - xmin + 1, ymax - ymin + 1
+        offset = value + size
+    # layers beyond the first are other images, only the unprefixed channels are counted
+    channels = [channel for channel in names if "." not in channel] or names
+    return ImageInfo(width, height, len(channels), max(EXR_BITS[pixel_type] for pixel_type in bits), bits != {0}, "A" in channels, LINEAR)
+
+READERS = [
+    (PNG_SIGNATURE, read_png),
+    (b"\xff\xd8", read_jpeg),
+    (b"II*\0", read_tiff),
+    (b"MM\0*", read_tiff),
+    (EXR_MAGIC, read_exr),
+]
+
+def read_header(path):
+    """Returns an ImageInfo for an image, the first tile of a <UDIM> path, or None if it can't be read or its
+        format isn't one of PNG, JPEG, TIFF and OpenEXR. Formats are told apart by their magic numbers"""
+    if "<UDIM>" in path:
+        tiles = pbrTextures.tiles(path)
+        if not tiles:
+            return None
+        path = tiles[0]
+    try:
+        with open(path, "rb") as f:
+            reader = BlockReader(f)
+            magic = reader.read(0, 8)
+            for signature, read in READERS:
+                if magic.startswith(signature):
+                    return read(reader)
+    except (OSError, ValueError, KeyError, IndexError, struct.error):
+        pass
+    return None
+
+def read_headers(paths, workers = None):
+    """Reads the headers of many images with a pool of threads, returns their ImageInfo or None in the same order"""
+    with concurrent.futures.ThreadPoolExecutor(max_workers = workers) as pool:
+        return list(pool.map(read_header, paths))
+
+def read_texture_sets(texture_sets, workers = None):
+    """Reads the headers of the source images of the texture sets in one pool and sets their headers"""
+    headers = read_headers([path for texture_set in texture_sets for path in texture_set.sources], workers)
+    start = 0
+    for texture_set in texture_sets:
+        texture_set.headers = headers[start:start + len(texture_set.sources)]
+        start += len(texture_set.sources)
@@ -0,0 +1,205 @@
+"""Keeps one shading network per material definition in a scene. Every shading group createLambert and createDisney
+    make is stamped with a hash of the definition it was made from, its node type, attribute values and texture
+    paths, and a registry of the stamped groups in the scene turns a repeat of the same definition into the network
+    already there. consolidate merges the duplicates that are there anyway, grouped by a hash of each network as the
+    scene has it rather than compared two at a time"""
+import json
+import hashlib
+import maya.OpenMaya as OpenMaya
+from maya import cmds
+
+from mayaPlugins import cmdsProfiler
+from mayaPlugins import shadingNetworks
+
+cmdsProfiler.register(__name__)
+
+# the definition hash a shading group is stamped with
+HASH_ATTRIBUTE = ("materialHash", "mth")
+# the shading group inputs a network hangs from, a RenderMan material is preferred to the viewport one
+SHADER_SLOTS = ["rman__surface", "surfaceShader", "displacementShader", "volumeShader"]
+# the shading groups every scene has, never merged
+DEFAULT_SHADING_GROUPS = {"initialShadingGroup", "initialParticleSE"}
+
+
+def definition_key(*parts):
+    """The hash of a material definition made of JSON-able parts, the same however dictionaries are ordered"""
+    return hashlib.sha1(json.dumps(parts, sort_keys = True, default = str).encode("utf-8")).hexdigest()
+
+def shader_key(node_type, values = None):
+    """The definition hash of a shader of a node type with attribute values"""
+    return definition_key(node_type, values or {})
+
+def source_node(node, attribute):
+    """The node connected into an attribute of a node, None if there is nothing"""
+    function = OpenMaya.MFnDependencyNode(node)
+    if not function.hasAttribute(attribute):
+        return None
+    sources = OpenMaya.MPlugArray()
+    function.findPlug(attribute).connectedTo(sources, True, False)
+    return sources[0].node() if sources.length() > 0 else None
+
+def shading_group_shader(sg):
+    """The material of a shading group, the node in the first of its shader slots with one"""
+    for slot in SHADER_SLOTS[:2]:
+        shader = source_node(sg, slot)
+        if shader is not None:
+            return shader
+    return None
+
+def node_handle(node):
+    return shadingNetworks.Node(OpenMaya.MFnDependencyNode(node).typeName(), node)
+
+
+class MaterialRegistry(object):
+    """Definition hash -> the shader and shading group made from it, for the stamped shading groups in the scene and
+        the ones queued since. Shading groups about to be deleted can be left out"""
+    def __init__(self, exclude = ()):
+        exclude = set(exclude)
+        names = [name for name in cmds.ls("*.%s" % HASH_ATTRIBUTE[0], recursive = True, objectsOnly = True) or []
+                 if name not in exclude]
+        # hash -> (shader, shading group) Nodes, the shader only looked up on a hit
+        self.index = {}
+        for sg in shadingNetworks.depend_nodes(names):
+            key = OpenMaya.MFnDependencyNode(sg).findPlug(HASH_ATTRIBUTE[0]).asString()
+            self.index.setdefault(key, (None, node_handle(sg)))
+
+    def shader_key(self, node_type, values = None):
+        return shader_key(node_type, values)
+
+    def find(self, key):
+        """Returns the (shader, shading group) Nodes made from a definition hash, None if there are none"""
+        entry = self.index.get(key)
+        if entry is None:
+            return None
+        shader, sg = entry
+        if shader is None:
+            shader = shading_group_shader(sg.mobject)
+            if shader is None:
+                return None
+            entry = self.index[key] = (node_handle(shader), sg)
+        return entry
+
+    def network(self, key):
+        """Returns every node of the network made from a definition hash, the shading group and shader first"""
+        shader, sg = self.find(key)
+        nodes = [sg, shader]
+        for node in upstream_nodes(sg.mobject):
+            if node != shader.mobject:
+                nodes.append(node_handle(node))
+        return nodes
+
+    def add(self, builder, key, shader, sg):
+        """Stamps a queued shading group with the definition hash it is made from and registers it"""
+        builder.add_string(sg, HASH_ATTRIBUTE[0], HASH_ATTRIBUTE[1], key)
+        self.index[key] = (shader, sg)
+
+
+def upstream_nodes(sg):
+    """The nodes feeding a shading group's shader slots, not the meshes and sets it is connected to"""
+    nodes = []
+    seen = set()
+    for slot in SHADER_SLOTS:
+        shader = source_node(sg, slot)
+        if shader is None:
+            continue
+        graph = OpenMaya.MItDependencyGraph(shader, OpenMaya.MFn.kInvalid, OpenMaya.MItDependencyGraph.kUpstream,
+                                            OpenMaya.MItDependencyGraph.kDepthFirst, OpenMaya.MItDependencyGraph.kNodeLevel)
+        while not graph.isDone():
+            node = graph.currentItem()
+            name = OpenMaya.MFnDependencyNode(node).name()
+            if name not in seen:
+                seen.add(name)
+                nodes.append(node)
+            graph.next()
+    return nodes
+
+
+class NetworkHasher(object):
+    """Hashes shading networks as the scene has them: each node's type, its non default values as setAttr would
+        write them and, for each connected input, the hash of the node it comes from. Every node is hashed once
+        however many networks share it"""
+    def __init__(self):
+        # node name -> hash
+        self.hashes = {}
+
+    def node_hash(self, node):
+        function = OpenMaya.MFnDependencyNode(node)
+        name = function.name()
+        if name in self.hashes:
+            return self.hashes[name]
+        # stops a cycle, the node is hashed without whatever loops back into it
+        self.hashes[name] = None
+        values = []
+        for i in range(function.attributeCount()):
+            attribute = OpenMaya.MFnAttribute(function.attribute(i))
+            if not attribute.parent().isNull() or attribute.name() == HASH_ATTRIBUTE[0]:
+                continue
+            plug = OpenMaya.MPlug(node, function.attribute(i))
+            commands = OpenMaya.MStringArray()
+            plug.getSetAttrCmds(commands, OpenMaya.MPlug.kNonDefault, True)
+            values += [commands[j] for j in range(commands.length())]
+        inputs = []
+        plugs = OpenMaya.MPlugArray()
+        function.getConnections(plugs)
+        for i in range(plugs.length()):
+            sources = OpenMaya.MPlugArray()
+            plugs[i].connectedTo(sources, True, False)
+            if sources.length() > 0:
+                inputs.append((plugs[i].partialName(False, False, False, False, False, True),
+                               sources[0].partialName(False, False, False, False, False, True), self.node_hash(sources[0].node())))
+        self.hashes[name] = definition_key(function.typeName(), sorted(values), sorted(inputs))
+        return self.hashes[name]
+
+    def network_hash(self, sg):
+        """The hash of everything feeding a shading group's shader slots"""
+        return definition_key([(slot, self.node_hash(shader)) for slot, shader in
+                               ((slot, source_node(sg, slot)) for slot in SHADER_SLOTS) if shader is not None])
+
+
+def consolidate(names = None):
+    """Merges the shading groups with identical networks, all of them or the ones named, in one MDGModifier. The
+        members of each duplicate are moved to the group kept, then the duplicate and the nodes only its network
+        used are deleted. A referenced group, which can't be deleted, is kept in preference to a stamped one and a
+        stamped one to the rest. Shading groups with nothing in their shader slots are left alone, they all hash the
+        same without being the same material. Returns the number of shading groups merged away and the modifier to
+        undo it"""
+    names = [name for name in (names or cmds.ls(type = "shadingEngine") or []) if name not in DEFAULT_SHADING_GROUPS]
+    nodes = dict(zip(names, shadingNetworks.depend_nodes(names)))
+    names = [name for name in names if any(source_node(nodes[name], slot) is not None for slot in SHADER_SLOTS)]
+    if not names:
+        return 0, shadingNetworks.NetworkBuilder().doIt()
+    referenced = set(cmds.ls(names, referencedNodes = True) or [])
+    stamped = set(cmds.ls(["%s.%s" % (name, HASH_ATTRIBUTE[0]) for name in names], objectsOnly = True) or [])
+    hasher = NetworkHasher()
+    groups = {}
+    for name in names:
+        groups.setdefault(hasher.network_hash(nodes[name]), []).append(name)
+
+    builder = shadingNetworks.NetworkBuilder()
+    merged = []
+    for key, group in sorted(groups.items()):
+        group.sort(key = lambda name: (name not in referenced, name not in stamped, name))
+        keep = group[0]
+        duplicates = [name for name in group[1:] if name not in referenced]
+        members = []
+        for duplicate in duplicates:
+            members += cmds.sets(duplicate, query = True) or []
+        if members:
+            builder.modifier.commandToExecute("sets -edit -forceElement %s %s" % (keep, " ".join(members)))
+        stamps = [name for name in duplicates if name in stamped]
+        if keep not in stamped and stamps:
+            stamp = OpenMaya.MFnDependencyNode(nodes[stamps[0]]).findPlug(HASH_ATTRIBUTE[0]).asString()
+            builder.add_string(node_handle(nodes[keep]), HASH_ATTRIBUTE[0], HASH_ATTRIBUTE[1], stamp)
+        merged += duplicates
+
+    # a node any shading group left in the scene uses stays, not only the ones consolidated here
+    merged_away = set(merged)
+    remaining = [name for name in cmds.ls(type = "shadingEngine") or [] if name not in merged_away]
+    others = [name for name in remaining if name not in nodes]
+    nodes.update(zip(others, shadingNetworks.depend_nodes(others)))
+    used = set(OpenMaya.MFnDependencyNode(node).name() for name in remaining for node in upstream_nodes(nodes[name]))
+    deleted = set(merged)
+    for name in merged:
+        deleted.update(OpenMaya.MFnDependencyNode(node).name() for node in upstream_nodes(nodes[name]))
+    builder.delete(sorted(deleted - used))
+    return len(merged), builder.doIt()
@@ -0,0 +1,245 @@
+"""Finding and classifying PBR textures for createDisney, with no Maya in it: the walk over a texture library and the
+    classification of every file run in threads before any node is created"""
+import os
+import re
+import json
+import functools
+import collections
+import concurrent.futures
+
+BASE_COLOR = 0
+EMIT_COLOR = 1
+METALLIC = 2
+SPECULAR = 3
+ROUGHNESS = 4
+BUMP_NORMAL = 5
+DISPLACEMENT = 6
+# channel packed occlusion / roughness / metallic
+ORM = 7
+
+NUM_IMAGE_TYPES = 8
+
+# matched as whole tokens of the file name, so "col" no longer hits "collection" and "nor" no longer hits "north"
+IMAGE_KEY_WORDS = {
+    BASE_COLOR : {"col", "color", "colour", "basecolor", "base_color", "diff", "diffuse", "albedo"},
+    EMIT_COLOR : {"emit", "emission", "emissive", "glow"},
+    METALLIC : {"metal", "metallic", "metalness"},
+    SPECULAR : {"spec", "specular"},
+    ROUGHNESS : {"rough", "roughness"},
+    BUMP_NORMAL : {"bump", "nor", "nrm", "norm", "normal"},
+    DISPLACEMENT : {"disp", "displacement", "height"},
+    ORM : {"orm", "arm", "occlusion_roughness_metallic"},
+}
+
+IMAGE_TYPE_NAMES = {
+    BASE_COLOR : "Base",
+    EMIT_COLOR : "Emit",
+    METALLIC : "Metal",
+    SPECULAR : "Specular",
+    ROUGHNESS : "Rough",
+    BUMP_NORMAL : "Bump",
+    DISPLACEMENT : "Disp",
+    ORM : "ORM",
+}
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".tif", ".tiff", ".exr", ".tga", ".hdr", ".bmp", ".tx"}
+
+# a JSON file of extra key words, {"Rough" : ["rgh"], ...} keyed by IMAGE_TYPE_NAMES, added when this module loads
+KEY_WORDS_VARIABLE = "MAYA_PBR_KEY_WORDS"
+
+# lowercase to uppercase, where a camel case name like rustyBaseColor splits into tokens
+CAMEL_CASE = re.compile(r"(?<=[a-z])(?=[A-Z])")
+# a Mari UDIM tile number, 1001 to 1999, or an unexpanded <UDIM> token, in a file name after a . or _ and right before
+# the extension, so a 2048 or a 1k in the rest of the name is never taken for one
+UDIM_TILE = re.compile(r"(?<=[._])(?:1(?!000)[0-9]{3}|<udim>)(?=\.[^.]*$)", re.IGNORECASE)
+
+# the library index createDisney -root keeps, at the top of the library unless it is given another path
+MANIFEST_NAME = ".createDisney.json"
+MANIFEST_VERSION = 1
+
+_key_words = None
+
+
+class TextureSet(object):
+    """The classified textures of one folder, the files of one PxrDisney network"""
+    def __init__(self, name, folder, files, stats = None):
+        self.name = name
+        self.folder = folder
+        # (image type, path) for every classified file, in file name order
+        self.files = files
+        # file name -> [mtime in ns, size] of every classified file, what the manifest compares
+        self.stats = stats or {}
+        # the paths as found, files may be pointed at converted copies of them
+        self.sources = [path for image_type, path in files]
+        # the imageHeaders.ImageInfo of every source, None until they are read or when one can't be
+        self.headers = [None] * len(files)
+        # the longest side of the proxies the file nodes show, 0 for none, and the proxy of every source or None
+        self.proxy_size = 0
+        self.proxies = [None] * len(files)
+
+
+def compile_key_words():
+    """Builds the one regex every key word is matched with, a named group per image type, and empties the cache.
+        Runs when the module loads and whenever key words are added"""
+    global _key_words
+    alternatives = []
+    for image_type in sorted(IMAGE_KEY_WORDS):
+        # longest first, so "normal" is tried before "nor" at the same place
+        key_words = sorted(IMAGE_KEY_WORDS[image_type], key = lambda key_word: (-len(key_word), key_word))
+        alternatives.append("(?P<t%d>%s)" % (image_type, "|".join(re.escape(key_word) for key_word in key_words)))
+    _key_words = re.compile(r"(?<![a-z])(?:%s)(?![a-z])" % "|".join(alternatives))
+    classify.cache_clear()
+
+def add_key_words(image_type, key_words):
+    """Adds key words for an image type, for naming conventions the defaults don't know"""
+    IMAGE_KEY_WORDS[image_type].update(key_word.lower() for key_word in key_words)
+    compile_key_words()
+
+def load_key_words(path):
+    """Adds the key words in a JSON file of {"Rough" : ["rgh"], ...}, keyed by IMAGE_TYPE_NAMES"""
+    with open(path) as f:
+        rules = json.load(f)
+    image_types = dict((name.lower(), image_type) for image_type, name in IMAGE_TYPE_NAMES.items())
+    for name, key_words in rules.items():
+        if name.lower() not in image_types:
+            raise ValueError("Unknown image type %s in %s, expected one of %s" % (name, path, ", ".join(sorted(IMAGE_TYPE_NAMES.values()))))
+        IMAGE_KEY_WORDS[image_types[name.lower()]].update(key_word.lower() for key_word in key_words)
+    compile_key_words()
+
+@functools.lru_cache(maxsize = 1 << 18)
+def classify(file):
+    """Returns the image type of a texture file name, -1 if it isn't one, and its UDIM tile or None.
+        Key words only match whole tokens of the name, and the one furthest into the name wins"""
+    stem, extension = os.path.splitext(file)
+    if extension.lower() not in IMAGE_EXTENSIONS:
+        return -1, None
+    image_type = -1
+    for match in _key_words.finditer(CAMEL_CASE.sub("_", stem).lower()):
+        image_type = int(match.lastgroup[1:])
+    tile = UDIM_TILE.search(file)
+    return image_type, tile.group(0) if tile else None
+
+def classify_file(file):
+    """Returns the image type of a texture file name, -1 if it isn't one"""
+    return classify(file)[0]
+
+def udim_path(folder, file):
+    """The path of a UDIM texture with its tile number swapped for the <UDIM> token Maya's file node expands"""
+    tile = UDIM_TILE.search(file)
+    return folder + "/" + file[:tile.start()] + "<UDIM>" + file[tile.end():]
+
+def tiles(path):
+    """The files behind a texture path, every tile on disk for a <UDIM> path and the path itself otherwise"""
+    if "<UDIM>" not in path:
+        return [path]
+    folder, name = path.rsplit("/", 1)
+    prefix, suffix = name.split("<UDIM>", 1)
+    pattern = re.compile(re.escape(prefix) + "1(?!000)[0-9]{3}" + re.escape(suffix) + "$")
+    try:
+        names = sorted(os.listdir(folder))
+    except OSError:
+        return []
+    return [folder + "/" + name for name in names if pattern.match(name)]
+
+def scan_folder(folder):
+    """Lists one folder, returns its classified textures as (image type, path) and its sub folders, both sorted by name,
+        and the [mtime in ns, size] of every classified file by name. Tiles of a UDIM texture become one <UDIM> path
+        when there are at least 2 of them, a lone numbered file is kept as it is"""
+    files = []
+    sub_folders = []
+    stats = {}
+    try:
+        entries = sorted(os.scandir(folder), key = lambda entry: entry.name)
+    except OSError:
+        # an unreadable folder is left out of the library rather than stopping the whole walk
+        return files, sub_folders, stats
+    textures = []
+    for entry in entries:
+        if entry.is_dir(follow_symlinks = False):
+            sub_folders.append(entry.path)
+        elif entry.is_file():
+            image_type, tile = classify(entry.name)
+            if image_type < 0:
+                continue
+            stat = entry.stat()
+            stats[entry.name] = [stat.st_mtime_ns, stat.st_size]
+            textures.append((image_type, entry.name, udim_path(folder, entry.name) if tile is not None else None))
+    tile_counts = collections.Counter(path for image_type, name, path in textures if path is not None)
+    tiled = set()
+    for image_type, name, path in textures:
+        if path is None or (tile_counts[path] < 2 and "<UDIM>" not in name):
+            files.append((image_type, folder + "/" + name))
+        # every tile of a UDIM texture is one file node
+        elif path not in tiled:
+            tiled.add(path)
+            files.append((image_type, path))
+    return files, sub_folders, stats
+
+def set_name(root, folder):
+    """A Maya node name for the texture set in folder, from its path under root"""
+    relative = os.path.relpath(folder, root)
+    if relative == os.curdir:
+        relative = os.path.basename(os.path.normpath(root))
+    name = re.sub(r"[^0-9A-Za-z_]", "_", relative)
+    return "_" + name if name[:1].isdigit() else name
+
+def find_texture_sets(root, workers = None):
+    """Walks root with a pool of threads, one folder listing per task, and returns a TextureSet for every folder
+        holding at least one classified texture, sorted by path"""
+    root = os.path.normpath(root).replace("\\", "/")
+    texture_sets = []
+    with concurrent.futures.ThreadPoolExecutor(max_workers = workers) as pool:
+        pending = dict([(pool.submit(scan_folder, root), root)])
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when = concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                folder = pending.pop(future)
+                files, sub_folders, stats = future.result()
+                for sub_folder in sub_folders:
+                    sub_folder = sub_folder.replace("\\", "/")
+                    pending[pool.submit(scan_folder, sub_folder)] = sub_folder
+                if files:
+                    texture_sets.append(TextureSet(set_name(root, folder), folder, files, stats))
+    texture_sets.sort(key = lambda texture_set: texture_set.folder)
+    return texture_sets
+
+def load_manifest(path):
+    """Returns the texture sets a manifest recorded, folder -> entry. A missing, unreadable or older manifest is empty"""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("sets", {})
+
+def save_manifest(path, texture_sets):
+    """Writes the folder -> entry manifest, through a temporary file so a failed write never leaves half a manifest"""
+    temporary = path + ".tmp"
+    with open(temporary, "w") as f:
+        json.dump({"version" : MANIFEST_VERSION, "sets" : texture_sets}, f, indent = 1, sort_keys = True)
+    os.replace(temporary, path)
+
+def manifest_entry(texture_set, nodes, owned = True):
+    """What the manifest keeps about a built texture set: its files' stats, their image types, the nodes of its network
+        and whether it made them, or reused a network something else made and mustn't delete"""
+    return {
+        "name" : texture_set.name,
+        "files" : texture_set.stats,
+        "textures" : [list(texture) for texture in texture_set.files],
+        "nodes" : nodes,
+        "owned" : owned,
+        "proxy" : texture_set.proxy_size,
+    }
+
+def is_unchanged(texture_set, entry):
+    """Whether a texture set has the same files, with the same mtimes and sizes, as its manifest entry, and its
+        nodes would read the same paths, which differ once the sources are converted to .tex, and show the same proxies"""
+    return (entry is not None and entry.get("name") == texture_set.name and entry.get("files") == texture_set.stats
+            and entry.get("textures") == [list(texture) for texture in texture_set.files]
+            and entry.get("proxy", 0) == texture_set.proxy_size)
+
+compile_key_words()
+if os.environ.get(KEY_WORDS_VARIABLE):
+    load_key_words(os.environ[KEY_WORDS_VARIABLE])
@@ -0,0 +1,243 @@
+"""Builds shading networks in batches on one MDGModifier rather than with a cmds call per node, connection and value.
+    Every attribute is looked up once per node type, the template each network is stamped from, so a network only
+    costs its creates, renames, connections and values, and a whole batch is one doIt a command can undo"""
+import re
+import maya.OpenMaya as OpenMaya
+from maya import cmds
+
+from mayaPlugins import cmdsProfiler
+
+cmdsProfiler.register(__name__)
+
+# the default lists shadingNode -asShader and -asTexture connect a node to, which the Hypershade shows
+SHADER = ("defaultShaderList1", "shaders")
+TEXTURE = ("defaultTextureList1", "textures")
+# what sets -renderable connects a shading group to
+RENDER_PARTITION = ("renderPartition", "sets")
+# the shading group of a shader is named after it
+SG_SUFFIX = "SG"
+
+
+def depend_node(name):
+    """The MObject of a node by name, raises RuntimeError if there is none"""
+    selection = OpenMaya.MSelectionList()
+    selection.add(name)
+    node = OpenMaya.MObject()
+    selection.getDependNode(0, node)
+    return node
+
+def parse_value(node_type, name, text):
+    """An attribute value given as text, as NetworkBuilder.set_value takes it: the text itself for a string attribute,
+        a whole number for a bool, integer or enum one, and floats otherwise, a tuple of them for a compound like a
+        colour, "0.5 0.2 0.1". Raises ValueError for an attribute the node type doesn't have or text that doesn't fit"""
+    try:
+        attribute = OpenMaya.MNodeClass(node_type).attribute(name)
+    except RuntimeError:
+        raise ValueError("%s has no attribute %s" % (node_type, name))
+    if attribute.hasFn(OpenMaya.MFn.kTypedAttribute) and OpenMaya.MFnTypedAttribute(attribute).attrType() == OpenMaya.MFnData.kString:
+        return text
+    # bools, integers and enums are set as whole numbers
+    numeric = OpenMaya.MFnNumericData
+    whole = attribute.hasFn(OpenMaya.MFn.kEnumAttribute) or (attribute.hasFn(OpenMaya.MFn.kNumericAttribute) and
+                                                              OpenMaya.MFnNumericAttribute(attribute).unitType() in
+                                                              (numeric.kBoolean, numeric.kByte, numeric.kChar, numeric.kShort, numeric.kInt, numeric.kLong))
+    try:
+        values = tuple(int(float(word)) if whole else float(word) for word in text.split())
+    except ValueError:
+        raise ValueError("%s.%s takes numbers, not %s" % (node_type, name, text))
+    if not values:
+        raise ValueError("%s.%s has no value" % (node_type, name))
+    return values[0] if len(values) == 1 else values
+
+def depend_nodes(names):
+    """The MObjects of the nodes named, in one selection list"""
+    selection = OpenMaya.MSelectionList()
+    for name in names:
+        selection.add(name)
+    nodes = []
+    for i in range(selection.length()):
+        node = OpenMaya.MObject()
+        selection.getDependNode(i, node)
+        nodes.append(node)
+    return nodes
+
+
+class Node(object):
+    """A node queued on a NetworkBuilder, its name is only final once the builder has run, a clash gets a number"""
+    def __init__(self, node_type, mobject):
+        self.node_type = node_type
+        self.mobject = mobject
+
+    def name(self):
+        return OpenMaya.MFnDependencyNode(self.mobject).name()
+
+
+class NetworkBuilder(object):
+    """Queues nodes, connections and values on one MDGModifier, run with doIt"""
+    def __init__(self):
+        self.modifier = OpenMaya.MDGModifier()
+        # (node type, attribute name) -> attribute MObject
+        self._attributes = {}
+        # default list -> [its array plug, the next free index]
+        self._lists = {}
+
+    def attribute(self, node_type, name):
+        key = (node_type, name)
+        attribute = self._attributes.get(key)
+        if attribute is None:
+            attribute = self._attributes[key] = OpenMaya.MNodeClass(node_type).attribute(name)
+        return attribute
+
+    def plug(self, node, name):
+        return OpenMaya.MPlug(node.mobject, self.attribute(node.node_type, name))
+
+    def list_plug(self, default_list):
+        """The next free element of a default list, counting the ones already queued"""
+        entry = self._lists.get(default_list)
+        if entry is None:
+            plug = OpenMaya.MFnDependencyNode(depend_node(default_list[0])).findPlug(default_list[1])
+            indices = OpenMaya.MIntArray()
+            plug.getExistingArrayAttributeIndices(indices)
+            entry = self._lists[default_list] = [plug, max([indices[i] for i in range(indices.length())] or [-1]) + 1]
+        plug, index = entry
+        entry[1] += 1
+        return plug.elementByLogicalIndex(index)
+
+    def create(self, node_type, name, default_list = None):
+        """Queues a node, connected to one of the default lists the way shadingNode does it"""
+        node = Node(node_type, self.modifier.createNode(node_type))
+        self.modifier.renameNode(node.mobject, name)
+        if default_list is not None:
+            self.modifier.connect(self.plug(node, "message"), self.list_plug(default_list))
+        return node
+
+    def shading_group(self, name):
+        """Queues an empty renderable shading group, what sets -renderable -noSurfaceShader -empty makes"""
+        sg = self.create("shadingEngine", name)
+        self.modifier.connect(self.plug(sg, "partition"), self.list_plug(RENDER_PARTITION))
+        return sg
+
+    def connect(self, source, source_attribute, destination, destination_attribute):
+        self.modifier.connect(self.plug(source, source_attribute), self.plug(destination, destination_attribute))
+
+    def set_string(self, node, attribute, value):
+        self.modifier.newPlugValueString(self.plug(node, attribute), value)
+
+    def set_bool(self, node, attribute, value):
+        self.modifier.newPlugValueBool(self.plug(node, attribute), value)
+
+    def set_int(self, node, attribute, value):
+        self.modifier.newPlugValueInt(self.plug(node, attribute), value)
+
+    def set_float(self, node, attribute, value):
+        self.modifier.newPlugValueFloat(self.plug(node, attribute), value)
+
+    def set_value(self, node, attribute, value):
+        """Queues setting an attribute from a bool, int, float or string, or a tuple of them for a compound like a
+            colour"""
+        plug = self.plug(node, attribute)
+        if isinstance(value, (tuple, list)):
+            for index, item in enumerate(value):
+                self.set_plug(plug.child(index), item)
+        else:
+            self.set_plug(plug, value)
+
+    def set_plug(self, plug, value):
+        if isinstance(value, bool):
+            self.modifier.newPlugValueBool(plug, value)
+        elif isinstance(value, int):
+            self.modifier.newPlugValueInt(plug, value)
+        elif isinstance(value, float):
+            self.modifier.newPlugValueFloat(plug, value)
+        else:
+            self.modifier.newPlugValueString(plug, value)
+
+    def add_string(self, node, long_name, short_name, value):
+        """Queues adding a string attribute to a node and setting it"""
+        attribute = OpenMaya.MFnTypedAttribute().create(long_name, short_name, OpenMaya.MFnData.kString)
+        self.modifier.addAttribute(node.mobject, attribute)
+        self.modifier.newPlugValueString(OpenMaya.MPlug(node.mobject, attribute), value)
+
+    def delete(self, names):
+        """Queues deleting the nodes named that still exist"""
+        for name in names:
+            try:
+                node = depend_node(name)
+            except RuntimeError:
+                continue
+            self.modifier.deleteNode(node)
+
+    def doIt(self):
+        """Runs everything queued, returns the modifier to undo and redo it with"""
+        self.modifier.doIt()
+        return self.modifier
+
+
+def unique_names(names, suffix = ""):
+    """Returns the names with a number added to the ones that would clash with a node in the scene or an earlier
+        name, checked for name and name + suffix alike so a shader and its shading group keep matching names. Takes
+        2 ls queries however many names there are"""
+    if not names:
+        # ls with nothing lists the whole scene
+        return []
+    wanted = [name + suffix for name in names] if suffix else []
+    taken = set(cmds.ls(list(names) + wanted) or [])
+    clashing = sorted(set(name for name in names if name in taken or name + suffix in taken))
+    if clashing:
+        # every numbered name the clashing ones could be given
+        taken.update(cmds.ls([name + "*" for name in clashing]) or [])
+    unique = []
+    for name in names:
+        if name in taken or name + suffix in taken:
+            # numbered the way Maya numbers a clash, from after any digits the name already ends with
+            stem = re.sub(r"\d+$", "", name)
+            number = 1
+            while "%s%d" % (stem, number) in taken or "%s%d%s" % (stem, number, suffix) in taken:
+                number += 1
+            name = "%s%d" % (stem, number)
+        taken.update((name, name + suffix))
+        unique.append(name)
+    return unique
+
+def queue_shaders(builder, specs):
+    """Queues a shader and its renderable shading group for each (name, node type, attribute values) spec, the
+        shader's outColor connected to the group's surfaceShader. Returns the (shader, shading group) Nodes"""
+    handles = []
+    for name, node_type, values in specs:
+        shader = builder.create(node_type, name, SHADER)
+        sg = builder.shading_group(name + SG_SUFFIX)
+        builder.connect(shader, "outColor", sg, "surfaceShader")
+        for attribute, value in sorted((values or {}).items()):
+            builder.set_value(shader, attribute, value)
+        handles.append((shader, sg))
+    return handles
+
+def create_shaders(specs, registry = None):
+    """Creates the shaders and shading groups of (name, node type, attribute values) specs in one MDGModifier, the
+        names made unique up front. Given a materialRegistry.MaterialRegistry, a spec with the same definition as a
+        network already in the scene, or as an earlier spec, gets that network rather than a new one, and the new
+        ones are stamped so later runs find them. Returns the (shader, shading group) Nodes of every spec and the
+        modifier to undo them with"""
+    handles = [None] * len(specs)
+    keys = [registry.shader_key(node_type, values) if registry else None for name, node_type, values in specs]
+    missing = []
+    seen = set()
+    for index, key in enumerate(keys):
+        found = registry.find(key) if registry else None
+        if found is not None:
+            handles[index] = found
+        elif key is None or key not in seen:
+            missing.append(index)
+            seen.add(key)
+
+    builder = NetworkBuilder()
+    names = unique_names([specs[index][0] for index in missing], SG_SUFFIX)
+    for index, name in zip(missing, names):
+        handles[index] = shader, sg = queue_shaders(builder, [(name,) + tuple(specs[index][1:])])[0]
+        if registry:
+            registry.add(builder, keys[index], shader, sg)
+    # a repeat of a spec queued here
+    for index, handle in enumerate(handles):
+        if handle is None:
+            handles[index] = registry.find(keys[index])
+    return handles, builder.doIt()
@@ -0,0 +1,263 @@
+"""Stand-ins for the maya, maya.cmds, maya.OpenMaya, maya.OpenMayaMPx and maya.standalone modules, so the plug-ins
+    themselves can be imported and run on standInMesh meshes without Maya, for benchmarks and tests. maya.cmds answers
+    with whichever StandInCmds was set last. OpenMaya has what UndoBevel's planning and applying and the edgeCache use:
+    selection lists and DAG paths to the mesh shapes, the dirty plug, topology and scene callbacks, fired by the
+    stand-in's edits, and MDGModifier, which runs the MEL it is given on the stand-in and can undo it"""
+import re
+import sys
+import types
+import itertools
+
+from mayaPlugins import standInMesh
+
+# the StandInCmds maya.cmds answers with
+_cmds = standInMesh.StandInCmds()
+# callback id -> (kind, mesh name or None, function, client data)
+_callbacks = {}
+_callbackIds = itertools.count()
+
+# a MEL word, quoted or not
+MEL_WORD = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def install(cmds = None):
+    """Puts the stand-in modules in sys.modules, answering with cmds if given. Raises an ImportError if the real
+        maya modules have been imported already"""
+    maya = sys.modules.get("maya")
+    if maya is not None and not getattr(maya, "standIn", False):
+        raise ImportError("The real maya modules are imported already, the stand-ins can't replace them")
+    if maya is None:
+        for name, module in modules().items():
+            sys.modules[name] = module
+    if cmds is not None:
+        setCmds(cmds)
+    return sys.modules["maya"]
+
+def setCmds(cmds):
+    """Makes maya.cmds answer with cmds, a StandInCmds or a wrapper of one, as a new scene: the scene callbacks fire"""
+    global _cmds
+    for kind, mesh, function, clientData in list(_callbacks.values()):
+        if kind == "scene":
+            function(clientData)
+    _cmds = cmds
+    standIn(cmds).listeners.append(meshChanged)
+
+def standIn(cmds):
+    """The StandInCmds under any wrappers, which hold it as cmds"""
+    while not isinstance(cmds, standInMesh.StandInCmds):
+        cmds = cmds.cmds
+    return cmds
+
+def modules():
+    maya = types.ModuleType("maya")
+    maya.standIn = True
+    cmds = types.ModuleType("maya.cmds")
+    cmds.__getattr__ = lambda name: getattr(_cmds, name)
+    openMaya = types.ModuleType("maya.OpenMaya")
+    for item in (MObject, MObjectHandle, MDagPath, MSelectionList, MFnAttribute, MMessage, MNodeMessage, MPolyMessage,
+                 MSceneMessage, MDGModifier, MGlobal):
+        setattr(openMaya, item.__name__, item)
+    openMayaMPx = types.ModuleType("maya.OpenMayaMPx")
+    openMayaMPx.MPxCommand = MPxCommand
+    # there is no session to start, the scene is whatever StandInCmds is set
+    standalone = types.ModuleType("maya.standalone")
+    standalone.initialize = lambda name = None: None
+    standalone.uninitialize = lambda: None
+    maya.cmds, maya.OpenMaya, maya.OpenMayaMPx, maya.standalone = cmds, openMaya, openMayaMPx, standalone
+    return {"maya" : maya, "maya.cmds" : cmds, "maya.OpenMaya" : openMaya, "maya.OpenMayaMPx" : openMayaMPx,
+            "maya.standalone" : standalone}
+
+
+def meshChanged(mesh, vertices):
+    """Fires the callbacks Maya would for an edit of a mesh: a dirty pnts element per moved vertex, or a topology change,
+        then a dirty outMesh"""
+    callbacks = [(kind, function, clientData) for kind, name, function, clientData in list(_callbacks.values()) if name == mesh]
+    for kind, function, clientData in callbacks:
+        if kind == "dirtyPlug" and vertices is not None:
+            for vertex in vertices:
+                function(MObject(mesh), MPlug("pnts", vertex), clientData)
+        elif kind == "topology" and vertices is None:
+            function(MObject(mesh), clientData)
+    for kind, function, clientData in callbacks:
+        if kind == "dirtyPlug":
+            function(MObject(mesh), MPlug("outMesh"), clientData)
+
+def addCallback(kind, node, function, clientData):
+    callback = next(_callbackIds)
+    _callbacks[callback] = (kind, node.mesh if node is not None else None, function, clientData)
+    return callback
+
+
+class MObject(object):
+    """A mesh shape, by the name of its mesh"""
+    def __init__(self, mesh = None):
+        self.mesh = mesh
+
+    def __eq__(self, other):
+        return isinstance(other, MObject) and self.mesh == other.mesh
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.mesh)
+
+class MObjectHandle(object):
+    def __init__(self, node):
+        self.node = node
+
+    def isValid(self):
+        return self.node.mesh in standIn(_cmds).meshes
+
+    def object(self):
+        return self.node
+
+class MDagPath(object):
+    def __init__(self):
+        self.mesh = None
+
+    def extendToShape(self):
+        pass
+
+    def node(self):
+        return MObject(self.mesh)
+
+class MSelectionList(object):
+    def __init__(self):
+        self.meshes = []
+
+    def add(self, name):
+        self.meshes.append(standIn(_cmds).meshName(name.partition('.')[0]))
+
+    def getDagPath(self, index, dagPath):
+        dagPath.mesh = self.meshes[index]
+
+class MPlug(object):
+    """An attribute of a mesh shape, an element of it when there is an index"""
+    def __init__(self, name, index = None):
+        self.name = name
+        self.index = index
+
+    def attribute(self):
+        return self.name
+
+    def isChild(self):
+        return False
+
+    def isElement(self):
+        return self.index is not None
+
+    def logicalIndex(self):
+        return self.index
+
+class MFnAttribute(object):
+    def __init__(self, attribute):
+        self.attribute = attribute
+
+    def name(self):
+        return self.attribute
+
+class MMessage(object):
+    @staticmethod
+    def removeCallback(callback):
+        del _callbacks[callback]
+
+class MNodeMessage(MMessage):
+    @staticmethod
+    def addNodeDirtyPlugCallback(node, function, clientData = None):
+        return addCallback("dirtyPlug", node, function, clientData)
+
+    @staticmethod
+    def addNodePreRemovalCallback(node, function, clientData = None):
+        return addCallback("preRemoval", node, function, clientData)
+
+class MPolyMessage(MMessage):
+    @staticmethod
+    def addPolyTopologyChangedCallback(node, function, clientData = None):
+        return addCallback("topology", node, function, clientData)
+
+class MSceneMessage(MMessage):
+    kBeforeNew = 0
+    kBeforeOpen = 1
+
+    @staticmethod
+    def addCallback(message, function, clientData = None):
+        return addCallback("scene", None, function, clientData)
+
+class MGlobal(object):
+    @staticmethod
+    def displayInfo(message):
+        sys.stdout.write("%s\n" % message)
+
+    @staticmethod
+    def displayWarning(message):
+        sys.stderr.write("// Warning: %s\n" % message)
+
+    @staticmethod
+    def displayError(message):
+        sys.stderr.write("// Error: %s\n" % message)
+
+
+def parseMel(command):
+    """Splits one MEL command into the cmds function name, the arguments and the flags. Every flag takes one value,
+        numbers become floats and true and false bools"""
+    words = [quoted or word for quoted, word in MEL_WORD.findall(command)]
+    args = []
+    flags = {}
+    i = 1
+    while i < len(words):
+        word = words[i]
+        if word.startswith("-") and not isNumber(word):
+            flags[word[1:]] = melValue(words[i + 1])
+            i += 2
+        else:
+            args.append(melValue(word))
+            i += 1
+    return words[0], args, flags
+
+def isNumber(word):
+    try:
+        float(word)
+    except ValueError:
+        return False
+    return True
+
+def melValue(word):
+    if word in ("true", "false"):
+        return word == "true"
+    return float(word) if isNumber(word) else word
+
+class MDGModifier(object):
+    """Runs the MEL commands queued with commandToExecute on the stand-in when done, keeping a copy of every mesh they
+        name to undo them with"""
+    def __init__(self):
+        self.commands = []
+        self.saved = {}
+
+    def commandToExecute(self, command):
+        self.commands.append(command)
+
+    def doIt(self):
+        cmds = standIn(_cmds)
+        for command in self.commands:
+            name, args, flags = parseMel(command)
+            for mesh in set(cmds.meshName(arg.partition('.')[0]) for arg in args if isinstance(arg, str)) - set(self.saved):
+                state = dict(cmds.meshes[mesh].__dict__)
+                state["points"], state["tweaks"] = state["points"].copy(), state["tweaks"].copy()
+                self.saved[mesh] = state
+            getattr(_cmds, name)(*args, **flags)
+
+    def undoIt(self):
+        cmds = standIn(_cmds)
+        for mesh, state in self.saved.items():
+            cmds.meshes[mesh].__dict__.update(state)
+            cmds.changed(mesh)
+        self.saved = {}
+
+
+class MPxCommand(object):
+    def __init__(self):
+        self.results = []
+
+    def appendToResult(self, result):
+        self.results.append(result)
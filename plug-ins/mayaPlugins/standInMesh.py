@@ -0,0 +1,474 @@
+"""In-memory stand-ins for the few maya.cmds queries the plug-ins make, so their geometry code can be run, profiled and
+    benchmarked without a Maya session. Only manifold polygon meshes in world space are modelled"""
+import numpy as np
+
+from mayaPlugins import bevelKernel
+from mayaPlugins import bevelSolver
+
+# the selectionMask numbers filterExpand takes for vertices, edges and faces
+SELECTION_MASKS = {31 : "vtx", 32 : "e", 34 : "f"}
+
+
+class HalfEdgeMesh(object):
+    """Polygon mesh stored as half-edges. Edges are numbered in the order they are first met walking the faces,
+        the way Maya numbers the edges of a mesh built from a vertex list per face. Edges are hard unless the set of
+        vertex pairs in soft says otherwise"""
+    def __init__(self, points, faces, soft = None):
+        self.rebuild(points, faces, soft)
+
+    def rebuild(self, points, faces, soft = None):
+        """Replaces the whole mesh in place, so whoever holds it sees the edit"""
+        self.points = np.array(points, dtype = np.float64).reshape(-1, 3)
+        # the pnts tweaks the points include, a topology edit bakes them in
+        self.tweaks = np.zeros_like(self.points)
+        self.soft = set(soft or ())
+        self.faceStart = []
+        # per half-edge: the vertex it starts at, the next one around its face, the opposite one (-1 on a border), its face and edge
+        self.origin = []
+        self.next = []
+        self.twin = []
+        self.face = []
+        self.edge = []
+        # one half-edge of each edge
+        self.edgeHalf = []
+
+        halves = {}
+        for face, vertices in enumerate(faces):
+            start = len(self.origin)
+            self.faceStart.append(start)
+            count = len(vertices)
+            for i, vertex in enumerate(vertices):
+                half = start + i
+                end = vertices[(i + 1) % count]
+                self.origin.append(vertex)
+                self.next.append(start + (i + 1) % count)
+                self.twin.append(-1)
+                self.face.append(face)
+
+                key = (vertex, end) if vertex < end else (end, vertex)
+                other = halves.get(key)
+                if other is None:
+                    halves[key] = half
+                    self.edge.append(len(self.edgeHalf))
+                    self.edgeHalf.append(half)
+                else:
+                    self.edge.append(self.edge[other])
+                    self.twin[half] = other
+                    self.twin[other] = half
+
+        self._vertexEdges = None
+        self._vertexFaces = None
+
+    def vertexCount(self):
+        return len(self.points)
+
+    def edgeCount(self):
+        return len(self.edgeHalf)
+
+    def faceCount(self):
+        return len(self.faceStart)
+
+    def faceHalfEdges(self, face):
+        """Yields the half-edges around a face in winding order"""
+        start = self.faceStart[face]
+        half = start
+        while True:
+            yield half
+            half = self.next[half]
+            if half == start:
+                return
+
+    def faceVertices(self, face):
+        return [self.origin[half] for half in self.faceHalfEdges(face)]
+
+    def faceEdges(self, face):
+        return [self.edge[half] for half in self.faceHalfEdges(face)]
+
+    def edgeVertices(self, edge):
+        half = self.edgeHalf[edge]
+        return self.origin[half], self.origin[self.next[half]]
+
+    def edgeFaces(self, edge):
+        half = self.edgeHalf[edge]
+        if self.twin[half] == -1:
+            return [self.face[half]]
+        return [self.face[half], self.face[self.twin[half]]]
+
+    def isHard(self, edge):
+        vertex1, vertex2 = self.edgeVertices(edge)
+        return (min(vertex1, vertex2), max(vertex1, vertex2)) not in self.soft
+
+    def faceLoops(self):
+        return [self.faceVertices(face) for face in range(self.faceCount())]
+
+    def vertexEdges(self, vertex):
+        if self._vertexEdges is None:
+            self._vertexEdges = [[] for i in range(self.vertexCount())]
+            for edge in range(self.edgeCount()):
+                for v in self.edgeVertices(edge):
+                    self._vertexEdges[v].append(edge)
+        return self._vertexEdges[vertex]
+
+    def vertexFaces(self, vertex):
+        if self._vertexFaces is None:
+            self._vertexFaces = [[] for i in range(self.vertexCount())]
+            for face in range(self.faceCount()):
+                for v in self.faceVertices(face):
+                    self._vertexFaces[v].append(face)
+        return self._vertexFaces[vertex]
+
+    def neighbours(self, kind, component, toKind):
+        """Returns the components of type toKind ("vtx", "e" or "f") touching one component of type kind"""
+        if kind == toKind:
+            return [component]
+        if kind == "vtx":
+            return self.vertexEdges(component) if toKind == "e" else self.vertexFaces(component)
+        if kind == "e":
+            return list(self.edgeVertices(component)) if toKind == "vtx" else self.edgeFaces(component)
+        return self.faceVertices(component) if toKind == "vtx" else self.faceEdges(component)
+
+    def componentCount(self, kind):
+        return {"vtx" : self.vertexCount, "e" : self.edgeCount, "f" : self.faceCount}[kind]()
+
+    def bevelMesh(self, name, points = None):
+        """Returns the bevelSolver.BevelMesh UndoBevel would read from the same mesh in Maya, with points from an
+            xform query if they are given"""
+        # the half-edges of each face are stored together in winding order, so they already are the face vertex lists
+        origin = np.array(self.origin, dtype = np.int64)
+        face = np.array(self.face, dtype = np.int64)
+        edge = np.array(self.edge, dtype = np.int64)
+        edgeHalf = np.array(self.edgeHalf, dtype = np.int64)
+        edgeVertices = np.sort(np.stack((origin[edgeHalf], origin[np.array(self.next)[edgeHalf]]), axis = 1), axis = 1)
+        faceOffsets = self.faceStart + [len(self.origin)]
+        faceEdgeIds = edge[np.lexsort((edge, face))]
+        return bevelSolver.BevelMesh(name, self.points if points is None else points, edgeVertices, faceOffsets, origin, faceEdgeIds)
+
+    def deleteEdges(self, edges, cleanVertices = True):
+        """Deletes edges the way polyDelEdge does: the faces either side of each become one, edges left dangling
+            inside a face go with it and, with cleanVertices, so do the vertices of the deleted edges left on only
+            2 edges. Border edges are kept, Maya won't delete them. The components are renumbered after"""
+        deleted = set(edge for edge in edges if self.twin[self.edgeHalf[edge]] != -1)
+        if not deleted:
+            return
+        dead = [self.edge[half] in deleted for half in range(len(self.origin))]
+        loops = []
+        visited = [False] * len(self.origin)
+        for start in range(len(self.origin)):
+            if dead[start] or visited[start]:
+                continue
+            loop = []
+            half = start
+            while not visited[half]:
+                visited[half] = True
+                loop.append(self.origin[half])
+                # across a deleted edge the face carries on in the one on the other side
+                half = self.next[half]
+                while dead[half]:
+                    half = self.next[self.twin[half]]
+            loops.append(removeSpikes(loop))
+
+        if cleanVertices:
+            ends = set(vertex for edge in deleted for vertex in self.edgeVertices(edge))
+            valence = {}
+            for key in set(loopEdges(loops)):
+                for vertex in key:
+                    if vertex in ends:
+                        valence[vertex] = valence.get(vertex, 0) + 1
+            winged = set(vertex for vertex, count in valence.items() if count == 2)
+            loops = [[vertex for vertex in loop if vertex not in winged] for loop in loops]
+        self.compact(self.points, loops)
+
+    def mergeVertices(self, vertices, distance):
+        """Merges the vertices given that are within distance of each other the way polyMergeVertex does, each
+            cluster into its lowest vertex at the cluster's centre. Faces left with under 3 corners go"""
+        vertices = np.unique(np.asarray(vertices, dtype = np.int64))
+        radii = np.full(len(vertices), max(distance, 1e-12))
+        clusters = bevelKernel.weldClusters(self.points[vertices], radii)
+        if not clusters:
+            return
+        points = self.points.copy()
+        target = list(range(self.vertexCount()))
+        for cluster in clusters:
+            ids = vertices[cluster]
+            points[ids.min()] = self.points[ids].mean(axis = 0)
+            for vertex in ids.tolist():
+                target[vertex] = int(ids.min())
+        loops = []
+        for loop in self.faceLoops():
+            merged = []
+            for vertex in loop:
+                vertex = target[vertex]
+                if not merged or merged[-1] != vertex:
+                    merged.append(vertex)
+            while len(merged) > 1 and merged[0] == merged[-1]:
+                merged.pop()
+            loops.append(merged)
+        self.compact(points, loops, target)
+
+    def compact(self, points, loops, target = None):
+        """Rebuilds the mesh from new face loops, dropping faces under 3 corners and the vertices no face uses.
+            What is left keeps its order, and soft edges stay soft"""
+        loops = [loop for loop in loops if len(loop) >= 3]
+        used = sorted(set(vertex for loop in loops for vertex in loop))
+        renumber = dict((vertex, i) for i, vertex in enumerate(used))
+        target = target or list(range(self.vertexCount()))
+        soft = set()
+        for vertex1, vertex2 in self.soft:
+            vertex1, vertex2 = target[vertex1], target[vertex2]
+            if vertex1 in renumber and vertex2 in renumber:
+                vertex1, vertex2 = renumber[vertex1], renumber[vertex2]
+                soft.add((min(vertex1, vertex2), max(vertex1, vertex2)))
+        self.rebuild(np.asarray(points)[used], [[renumber[vertex] for vertex in loop] for loop in loops], soft)
+
+
+def removeSpikes(loop):
+    """Takes the edges that go out and straight back, a, b, a, out of a face loop"""
+    stack = []
+    for vertex in loop:
+        if len(stack) >= 2 and stack[-2] == vertex:
+            stack.pop()
+        else:
+            stack.append(vertex)
+    # and the ones across the start of the loop
+    while len(stack) >= 3:
+        if stack[1] == stack[-1]:
+            stack = stack[1:-1]
+        elif stack[-2] == stack[0]:
+            stack = stack[:-2]
+        else:
+            break
+    return stack
+
+def loopEdges(loops):
+    """Yields every side of the face loops as a sorted vertex pair"""
+    for loop in loops:
+        for i, vertex in enumerate(loop):
+            other = loop[i - 1]
+            yield (min(vertex, other), max(vertex, other))
+
+
+def flag(kwargs, longName, shortName, default = None):
+    """Returns a cmds flag given either its long or its short name"""
+    return kwargs.get(longName, kwargs.get(shortName, default))
+
+def flatten(items):
+    """Turns the mix of strings and lists cmds accepts into one list of strings"""
+    names = []
+    for item in items:
+        if isinstance(item, (list, tuple)):
+            names += flatten(item)
+        else:
+            names.append(item)
+    return names
+
+
+class StandInCmds(object):
+    """Answers the maya.cmds calls the plug-ins make against HalfEdgeMesh objects by name, and can be put in place of
+        maya.cmds. Each mesh is a transform with an identity matrix and a shape named after it, mesh and meshShape.
+        Vertex moves change the mesh, and polyDelEdge and polyMergeVertex change its topology and renumber it like
+        Maya does"""
+    def __init__(self, meshes = None):
+        self.meshes = dict(meshes or {})
+        self.selection = []
+        # called with the mesh name and the vertices moved, or None when the topology changed, after every edit
+        self.listeners = []
+
+    def addMesh(self, name, mesh):
+        self.meshes[name] = mesh
+
+    def changed(self, mesh, vertices = None):
+        for listener in self.listeners:
+            listener(mesh, vertices)
+
+    def meshName(self, node):
+        """The mesh a transform or shape name, or a full path of either, is"""
+        node = node.rpartition('|')[2]
+        if node not in self.meshes and node.endswith("Shape") and node[:-len("Shape")] in self.meshes:
+            node = node[:-len("Shape")]
+        if node not in self.meshes:
+            self.error("No object matches name: %s" % node)
+        return node
+
+    def expand(self, name):
+        """Given a mesh or component name, returns the mesh name, the component type and the list of ids.
+            A mesh name on its own is returned with no component type"""
+        mesh, _, component = name.partition('.')
+        mesh = self.meshName(mesh)
+        if not component:
+            return mesh, None, []
+        kind, _, numbers = component.partition('[')
+        numbers = numbers.rstrip(']')
+        if numbers == "*":
+            return mesh, kind, list(range(self.meshes[mesh].componentCount(kind)))
+        first, _, last = numbers.partition(':')
+        return mesh, kind, list(range(int(first), int(last or first) + 1))
+
+    def error(self, message):
+        raise RuntimeError(message)
+
+    def select(self, *items, **kwargs):
+        names = flatten(items)
+        if flag(kwargs, "clear", "cl"):
+            self.selection = []
+        elif flag(kwargs, "add", "add"):
+            self.selection += [name for name in names if name not in self.selection]
+        elif flag(kwargs, "deselect", "d"):
+            self.selection = [name for name in self.selection if name not in names]
+        else:
+            self.selection = names
+
+    def ls(self, *items, **kwargs):
+        names = flatten(items)
+        if flag(kwargs, "selection", "sl") or flag(kwargs, "orderedSelection", "os"):
+            names = names + self.selection
+        if flag(kwargs, "objectsOnly", "o"):
+            meshes = []
+            for name in names:
+                mesh = name.partition('.')[0]
+                if mesh not in meshes:
+                    meshes.append(mesh)
+            return meshes
+        if flag(kwargs, "flatten", "fl"):
+            return self.filterExpand(names)
+        return list(names)
+
+    def filterExpand(self, *items, **kwargs):
+        """Expands components to one name each, keeping only the types in the selection mask"""
+        masks = flag(kwargs, "selectionMask", "sm")
+        if masks is not None and not isinstance(masks, (list, tuple)):
+            masks = [masks]
+        kinds = None if masks is None else [SELECTION_MASKS[mask] for mask in masks]
+
+        names = []
+        for name in flatten(items):
+            mesh, kind, ids = self.expand(name)
+            if kind is None or (kinds is not None and kind not in kinds):
+                continue
+            names += ["%s.%s[%d]" % (mesh, kind, component) for component in ids]
+        return names or None
+
+    def listRelatives(self, *items, **kwargs):
+        """The shape of each mesh, or the transform of each shape with parent"""
+        fullPath = flag(kwargs, "fullPath", "f")
+        names = []
+        for name in flatten(items):
+            node = name.partition('.')[0].rpartition('|')[2]
+            mesh = self.meshName(node)
+            if flag(kwargs, "parent", "p") and node != mesh:
+                names.append("|" + mesh if fullPath else mesh)
+            elif flag(kwargs, "shapes", "s") and node == mesh:
+                names.append("|%s|%sShape" % (mesh, mesh) if fullPath else mesh + "Shape")
+        return names or None
+
+    def getAttr(self, attribute, **kwargs):
+        """Answers pnts, element ranges included, and worldMatrix, the identity"""
+        node, _, plug = attribute.partition('.')
+        mesh = self.meshes[self.meshName(node)]
+        name, _, numbers = plug.partition('[')
+        if name in ("pnts", "pt"):
+            first, _, last = numbers.rstrip(']').partition(':')
+            return [tuple(tweak) for tweak in mesh.tweaks[int(first):int(last or first) + 1].tolist()]
+        if name == "worldMatrix":
+            return np.identity(4).ravel().tolist()
+        self.error("getAttr only answers pnts and worldMatrix here, not %s" % attribute)
+
+    def setAttr(self, attribute, *values, **kwargs):
+        """Sets pnts, element ranges included, moving the points by the change in their tweaks"""
+        node, _, plug = attribute.partition('.')
+        mesh = self.meshes[self.meshName(node)]
+        name, _, numbers = plug.partition('[')
+        if name not in ("pnts", "pt"):
+            self.error("setAttr only sets pnts here, not %s" % attribute)
+        first, _, last = numbers.rstrip(']').partition(':')
+        ids = slice(int(first), int(last or first) + 1)
+        tweaks = np.array(flatten(values), dtype = np.float64).reshape(-1, 3)
+        mesh.points[ids] += tweaks - mesh.tweaks[ids]
+        mesh.tweaks[ids] = tweaks
+        self.changed(self.meshName(node), list(range(ids.start, ids.stop)))
+
+    def pointPosition(self, name, **kwargs):
+        mesh, kind, ids = self.expand(name)
+        return self.meshes[mesh].points[ids[0]].tolist()
+
+    def xform(self, *items, **kwargs):
+        """Queries or sets the world space translation of vertices, queries return x, y, z for each vertex in one flat list"""
+        translation = flag(kwargs, "translation", "t")
+        if flag(kwargs, "query", "q"):
+            positions = []
+            for name in flatten(items):
+                mesh, kind, ids = self.expand(name)
+                positions += self.meshes[mesh].points[ids].ravel().tolist()
+            return positions
+        if translation is not None:
+            for name in flatten(items):
+                mesh, kind, ids = self.expand(name)
+                halfEdgeMesh = self.meshes[mesh]
+                halfEdgeMesh.tweaks[ids] += np.asarray(translation) - halfEdgeMesh.points[ids]
+                halfEdgeMesh.points[ids] = translation
+                self.changed(mesh, ids)
+
+    def polyMoveVertex(self, *items, **kwargs):
+        offset = [flag(kwargs, "translateX", "tx", 0.0), flag(kwargs, "translateY", "ty", 0.0), flag(kwargs, "translateZ", "tz", 0.0)]
+        for name in flatten(items):
+            mesh, kind, ids = self.expand(name)
+            self.meshes[mesh].points[ids] += offset
+            self.changed(mesh, ids)
+
+    def polyListComponentConversion(self, *items, **kwargs):
+        """Converts components to vertices, edges or faces. Without internal every touching component is returned,
+            with it only the ones whose own neighbours are all in the input"""
+        toKind = "vtx" if flag(kwargs, "toVertex", "tv") else "e" if flag(kwargs, "toEdge", "te") else "f"
+        internal = flag(kwargs, "internal", "in", False)
+
+        groups = {}
+        for name in flatten(items):
+            mesh, kind, ids = self.expand(name)
+            if kind is None:
+                kind, ids = "f", list(range(self.meshes[mesh].faceCount()))
+            groups.setdefault((mesh, kind), set()).update(ids)
+
+        names = []
+        for (mesh, kind), sources in groups.items():
+            halfEdgeMesh = self.meshes[mesh]
+            targets = set()
+            for component in sources:
+                targets.update(halfEdgeMesh.neighbours(kind, component, toKind))
+            if internal and kind != toKind:
+                targets = [target for target in targets if sources.issuperset(halfEdgeMesh.neighbours(toKind, target, kind))]
+            names += bevelSolver.componentNames(mesh, toKind, targets)
+        return names
+
+    def groups(self, items):
+        """The ids of the components named, by mesh, in the order the meshes first appear"""
+        groups = {}
+        for name in flatten(items):
+            mesh, kind, ids = self.expand(name)
+            groups.setdefault(mesh, []).extend(ids)
+        return groups
+
+    def polyInfo(self, *items, **kwargs):
+        """The lines polyInfo prints for -edgeToVertex, "EDGE      0:      0      1  Hard", and -faceToVertex,
+            "FACE      0:      0      1      3      2", one per component"""
+        lines = []
+        for mesh, ids in self.groups(items).items():
+            halfEdgeMesh = self.meshes[mesh]
+            if flag(kwargs, "edgeToVertex", "ev"):
+                for edge in ids:
+                    vertex1, vertex2 = halfEdgeMesh.edgeVertices(edge)
+                    lines.append("EDGE %6d: %6d %6d  %s\n" % (edge, vertex1, vertex2, "Hard" if halfEdgeMesh.isHard(edge) else "Soft"))
+            elif flag(kwargs, "faceToVertex", "fv"):
+                for face in ids:
+                    lines.append("FACE %6d: %s \n" % (face, " ".join("%6d" % vertex for vertex in halfEdgeMesh.faceVertices(face))))
+            else:
+                self.error("polyInfo only answers -edgeToVertex and -faceToVertex here")
+        return lines
+
+    def polyDelEdge(self, *items, **kwargs):
+        for mesh, ids in self.groups(items).items():
+            self.meshes[mesh].deleteEdges(ids, flag(kwargs, "cleanVertices", "cv", False))
+            self.changed(mesh)
+
+    def polyMergeVertex(self, *items, **kwargs):
+        for mesh, ids in self.groups(items).items():
+            self.meshes[mesh].mergeVertices(ids, flag(kwargs, "distance", "d", 0.0))
+            self.changed(mesh)
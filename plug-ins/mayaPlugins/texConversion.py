@@ -0,0 +1,103 @@
+"""Converting PBR textures to RenderMan .tex files when they are imported rather than on every render, with no Maya in it.
+    Each source image without an up to date .tex beside it is handed to an external converter, txmake unless another
+    is given, with as many conversions running at once as there are cores"""
+import os
+import shlex
+import shutil
+import subprocess
+import concurrent.futures
+
+from mayaPlugins import pbrTextures
+
+# the converter command line, "txmake -mode periodic" say, used when createDisney isn't given one
+CONVERTER_VARIABLE = "MAYA_PBR_CONVERTER"
+TEX_EXTENSION = ".tex"
+# mip-mapped already, RenderMan reads these as they are
+CONVERTED_EXTENSIONS = {".tex", ".tx"}
+
+# keeps Windows from opening a console for every conversion
+CREATION_FLAGS = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+def find_command(command):
+    """Returns a command line split into an argument list with its executable found, None if it can't be"""
+    if isinstance(command, str):
+        command = shlex.split(command, posix = os.name != "nt")
+    executable = shutil.which(command[0]) if command else None
+    if executable is None:
+        return None
+    return [executable] + command[1:]
+
+def converter_command(converter = None):
+    """Returns the converter as an argument list: the command line given, else $MAYA_PBR_CONVERTER, else txmake from
+        $RMANTREE or the PATH. None if the executable can't be found"""
+    converter = converter or os.environ.get(CONVERTER_VARIABLE)
+    if converter:
+        return find_command(converter)
+    if os.environ.get("RMANTREE"):
+        return find_command([os.path.join(os.environ["RMANTREE"], "bin", "txmake")])
+    return find_command(["txmake"])
+
+def tex_path(path):
+    """The .tex sibling of a source image, a <UDIM> token is kept"""
+    return os.path.splitext(path)[0] + TEX_EXTENSION
+
+def is_up_to_date(source, target):
+    """Whether target exists and is no older than source"""
+    try:
+        return os.stat(target).st_mtime_ns >= os.stat(source).st_mtime_ns
+    except OSError:
+        return False
+
+def run_converter(command, source, target, **fields):
+    """Runs a converter from source to target, returns its error or None if it succeeded. {source}, {target} and any
+        other fields in its arguments are filled in, without them the source and target are added to the end.
+        The converter writes to a temporary file that replaces target only once it is finished, so an interrupted
+        conversion is never taken for an up to date one"""
+    root, extension = os.path.splitext(target)
+    temporary = root + ".partial" + extension
+    if any("{source}" in argument for argument in command):
+        arguments = [argument.format(source = source, target = temporary, **fields) for argument in command]
+    else:
+        arguments = command + [source, temporary]
+    try:
+        result = subprocess.run(arguments, stdout = subprocess.PIPE, stderr = subprocess.STDOUT,
+                                universal_newlines = True, creationflags = CREATION_FLAGS)
+        if result.returncode != 0 or not os.path.isfile(temporary):
+            return result.stdout.strip() or "%s exited with %d" % (os.path.basename(command[0]), result.returncode)
+        os.replace(temporary, target)
+    except OSError as error:
+        return str(error)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+    return None
+
+def convert(command, source):
+    """Converts one image unless its .tex is up to date. Returns whether the converter ran and its error, None if it
+        succeeded"""
+    target = tex_path(source)
+    if is_up_to_date(source, target):
+        return False, None
+    return True, run_converter(command, source, target)
+
+def convert_texture_sets(texture_sets, command, workers = None):
+    """Converts every source image of the texture sets that needs it with a pool of at most workers conversions,
+        one per core by default, then points each set's files at their .tex. A texture with a tile that failed keeps
+        its source image. Returns the number of conversions run and the (source, error) of each failure"""
+    paths = set()
+    for texture_set in texture_sets:
+        paths.update(path for image_type, path in texture_set.files if os.path.splitext(path)[1].lower() not in CONVERTED_EXTENSIONS)
+    sources = dict((path, pbrTextures.tiles(path)) for path in sorted(paths))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = workers or os.cpu_count()) as pool:
+        # each task only waits on its converter, the conversions run in their own processes
+        results = dict((source, pool.submit(convert, command, source)) for tiled in sources.values() for source in tiled)
+        results = dict((source, future.result()) for source, future in results.items())
+
+    failures = [(source, error) for source, (ran, error) in sorted(results.items()) if error is not None]
+    failed = set(source for source, error in failures)
+    converted = dict((path, tex_path(path)) for path, tiled in sources.items() if tiled and failed.isdisjoint(tiled))
+    for texture_set in texture_sets:
+        texture_set.files = [(image_type, converted.get(path, path)) for image_type, path in texture_set.files]
+    return sum(ran for ran, error in results.values()), failures
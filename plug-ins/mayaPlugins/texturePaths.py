@@ -0,0 +1,130 @@
+"""Checking the texture paths of a scene and finding the ones that moved, with no Maya in it. Paths are checked a
+    folder listing at a time in a pool of threads, so 50k paths in a few thousand folders cost a few thousand
+    listings rather than 50k serial stats, and missing files are looked up in a filename index of the search roots
+    built in one parallel walk"""
+import os
+import concurrent.futures
+
+from mayaPlugins import pbrTextures
+
+# the folders moved textures are looked for under, separated like PATH
+SEARCH_ROOTS_VARIABLE = "MAYA_PBR_SEARCH_ROOTS"
+# what the index holds besides images, the converted textures
+INDEXED_EXTENSIONS = pbrTextures.IMAGE_EXTENSIONS | {".tex"}
+
+
+def search_roots(roots = None):
+    """The search roots given, else the ones in $MAYA_PBR_SEARCH_ROOTS, leaving out the ones that aren't folders"""
+    if not roots:
+        roots = [root for root in os.environ.get(SEARCH_ROOTS_VARIABLE, "").split(os.pathsep) if root]
+    return [root.replace("\\", "/") for root in roots if os.path.isdir(root)]
+
+def normalize(path):
+    return os.path.expandvars(path).replace("\\", "/")
+
+def list_folder(folder):
+    """The names in a folder, case folded where the file system ignores case, None if it can't be listed"""
+    try:
+        return set(os.path.normcase(name) for name in os.listdir(folder))
+    except OSError:
+        return None
+
+def find_missing(paths, workers = None):
+    """Returns the paths that aren't on disk, a <UDIM> path when it has no tile. Each folder is listed once, in a
+        pool of threads"""
+    folders = {}
+    for path in set(paths):
+        folder, name = os.path.split(normalize(path))
+        folders.setdefault(folder, []).append((path, name))
+    with concurrent.futures.ThreadPoolExecutor(max_workers = workers) as pool:
+        listings = dict(zip(folders, pool.map(list_folder, folders)))
+
+    missing = []
+    for folder, entries in folders.items():
+        names = listings[folder]
+        tiles = None
+        for path, name in entries:
+            if names is not None and "<UDIM>" in name:
+                tiles = tiles or set(index_key(other) for other in names)
+                found = index_key(name) in tiles
+            else:
+                found = names is not None and os.path.normcase(name) in names
+            if not found:
+                missing.append(path)
+    return sorted(missing)
+
+def index_key(name):
+    """What a file name is indexed and looked up under, case folded, with a UDIM tile number as <UDIM>"""
+    return os.path.normcase(pbrTextures.UDIM_TILE.sub("<UDIM>", name))
+
+def scan_folder(folder):
+    """Returns the texture file names and the sub folders of one folder, nothing for one that can't be listed"""
+    files = []
+    sub_folders = []
+    try:
+        for entry in os.scandir(folder):
+            if entry.is_dir():
+                sub_folders.append(entry.path.replace("\\", "/"))
+            elif os.path.splitext(entry.name)[1].lower() in INDEXED_EXTENSIONS:
+                files.append(entry.name)
+    except OSError:
+        pass
+    return files, sub_folders
+
+def build_index(roots, workers = None):
+    """Walks the search roots with a pool of threads, one folder listing per task, and returns file name -> the
+        folders it is in, by index_key. A UDIM tile is indexed both by its own name and as its <UDIM> path"""
+    index = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers = workers) as pool:
+        pending = dict((pool.submit(scan_folder, root), root) for root in roots)
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when = concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                folder = pending.pop(future)
+                files, sub_folders = future.result()
+                for sub_folder in sub_folders:
+                    pending[pool.submit(scan_folder, sub_folder)] = sub_folder
+                for name in files:
+                    for key in set((os.path.normcase(name), index_key(name))):
+                        index.setdefault(key, []).append((folder, name))
+    return index
+
+def shared_folders(path, folder):
+    """How many of the folders a path is in, from the innermost out, a candidate folder ends with"""
+    wanted = os.path.normcase(os.path.dirname(path)).split("/")[::-1]
+    found = os.path.normcase(folder).split("/")[::-1]
+    count = 0
+    for a, b in zip(wanted, found):
+        if a != b:
+            break
+        count += 1
+    return count
+
+def resolve(path, index):
+    """Returns where a missing texture is now, None if the index has no file of its name. Of several, the one whose
+        folders end the most like the old ones wins, then the shortest path. A <UDIM> path stays one"""
+    path = normalize(path)
+    name = os.path.basename(path)
+    key = index_key(name) if "<UDIM>" in name else os.path.normcase(name)
+    candidates = index.get(key)
+    if not candidates:
+        return None
+    folder, found = min(candidates, key = lambda candidate: (-shared_folders(path, candidate[0]), len(candidate[0]), candidate[0]))
+    return folder + "/" + (name if "<UDIM>" in name else found)
+
+def relink(paths, roots, workers = None):
+    """Finds the missing paths and where they are under the search roots, the index only built when something is
+        missing. Returns old path -> new path for the ones found and the ones that weren't, sorted"""
+    missing = find_missing(paths, workers)
+    if not missing or not roots:
+        return {}, missing
+    index = build_index(roots, workers)
+    fixes = {}
+    unresolved = []
+    for path in missing:
+        found = resolve(path, index)
+        if found is None:
+            unresolved.append(path)
+        else:
+            fixes[path] = found
+    return fixes, unresolved
@@ -0,0 +1,120 @@
+"""Downsampled proxies of PBR textures for interactive work, with no Maya in it. Proxies are made by an external
+    resizer into one local cache folder, named after their source and size so every scene and library shares them,
+    and the least recently used ones are deleted once the folder is over its size cap"""
+import os
+import hashlib
+import concurrent.futures
+
+from mayaPlugins import pbrTextures
+from mayaPlugins import texConversion
+
+# the resizer command line, with {source}, {target} and {size} (the longest side) filled in
+PROXY_COMMAND_VARIABLE = "MAYA_PBR_PROXY_COMMAND"
+# the cache folder, and its size cap in megabytes
+PROXY_CACHE_VARIABLE = "MAYA_PBR_PROXY_CACHE"
+PROXY_CACHE_SIZE_VARIABLE = "MAYA_PBR_PROXY_CACHE_SIZE"
+
+DEFAULT_PROXY_SIZE = 512
+DEFAULT_CACHE_SIZE = 4096
+# the ImageMagick convert Maya ships as imconvert, ">" only ever shrinks
+DEFAULT_PROXY_COMMAND = ["imconvert", "{source}", "-resize", "{size}x{size}>", "{target}"]
+
+
+def proxy_command(command = None):
+    """Returns the resizer as an argument list: the command line given, else $MAYA_PBR_PROXY_COMMAND, else Maya's
+        imconvert from $MAYA_LOCATION or the PATH. None if the executable can't be found. Raises ValueError for a
+        command line with no {size}, which would make full size proxies"""
+    command = command or os.environ.get(PROXY_COMMAND_VARIABLE)
+    if command:
+        found = texConversion.find_command(command)
+        if found is not None and not any("{size}" in argument for argument in found):
+            raise ValueError("The proxy command %s has no {size} for the longest side, it would make full size proxies" % " ".join(found))
+        return found
+    if os.environ.get("MAYA_LOCATION"):
+        found = texConversion.find_command([os.path.join(os.environ["MAYA_LOCATION"], "bin", DEFAULT_PROXY_COMMAND[0])] + DEFAULT_PROXY_COMMAND[1:])
+        if found is not None:
+            return found
+    return texConversion.find_command(DEFAULT_PROXY_COMMAND)
+
+def cache_folder():
+    return os.environ.get(PROXY_CACHE_VARIABLE) or os.path.join(os.path.expanduser("~"), ".cache", "createDisney", "proxies")
+
+def cache_size():
+    """The cache size cap in bytes"""
+    return int(os.environ.get(PROXY_CACHE_SIZE_VARIABLE) or DEFAULT_CACHE_SIZE) * 1024 * 1024
+
+def proxy_path(cache, path, size):
+    """The proxy of a texture path in the cache, a <UDIM> path gets a <UDIM> proxy path"""
+    key = hashlib.sha1(os.path.abspath(path).replace("\\", "/").encode("utf-8")).hexdigest()[:20]
+    udim = ".<UDIM>" if "<UDIM>" in path else ""
+    return cache.replace("\\", "/") + "/%s_%d%s%s" % (key, size, udim, os.path.splitext(path)[1].lower())
+
+def make_proxy(command, source, target, size):
+    """Makes or reuses the proxy of one image or tile, returns the resizer's error or None. A reused proxy is touched
+        so the cache keeps the recently used ones"""
+    if texConversion.is_up_to_date(source, target):
+        os.utime(target, None)
+        return None
+    return texConversion.run_converter(command, source, target, size = size)
+
+def make_proxies(paths, command, size = DEFAULT_PROXY_SIZE, cache = None, limit = None, headers = None, workers = None):
+    """Makes the missing proxies of texture paths with a pool of resizers, one per core by default, then evicts the
+        least recently used proxies over the cache cap. Headers, imageHeaders.ImageInfo in the same order as paths,
+        let textures already no bigger than size be their own proxy. Returns path -> its proxy, leaving out the ones
+        a tile failed for, and the (source, error) of each failure"""
+    cache = cache or cache_folder()
+    if not os.path.isdir(cache):
+        os.makedirs(cache)
+    proxies = {}
+    jobs = {}
+    for path, info in zip(paths, headers or [None] * len(paths)):
+        if info is not None and info.width is not None and max(info.width, info.height) <= size:
+            proxies[path] = path
+            continue
+        target = proxy_path(cache, path, size)
+        sources = pbrTextures.tiles(path)
+        if not sources:
+            continue
+        for source in sources:
+            tile = pbrTextures.UDIM_TILE.search(os.path.basename(source)) if source != path else None
+            jobs[source] = (path, target.replace("<UDIM>", tile.group(0)) if tile else target)
+        proxies[path] = target
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers = workers or os.cpu_count()) as pool:
+        results = dict((source, pool.submit(make_proxy, command, source, target, size)) for source, (path, target) in jobs.items())
+        results = dict((source, future.result()) for source, future in results.items())
+    failures = [(source, error) for source, error in sorted(results.items()) if error is not None]
+
+    for source, error in failures:
+        proxies.pop(jobs[source][0], None)
+    evict(cache, cache_size() if limit is None else limit, set(target for path, target in jobs.values()))
+    return proxies, failures
+
+def cache_key(path):
+    """A path as evict compares it, the same whichever separators and, where the file system ignores it, case"""
+    return os.path.normcase(os.path.normpath(path))
+
+def evict(cache, limit, keep = ()):
+    """Deletes the least recently used files in the cache until it is under limit bytes, never the ones in keep.
+        Returns how many bytes were freed"""
+    keep = set(cache_key(path) for path in keep)
+    entries = []
+    total = 0
+    for entry in os.scandir(cache):
+        if entry.is_file():
+            stat = entry.stat()
+            entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+            total += stat.st_size
+    freed = 0
+    for mtime, size, path in sorted(entries):
+        if total - freed <= limit:
+            break
+        if cache_key(path) in keep:
+            continue
+        try:
+            os.remove(path)
+            freed += size
+        except OSError:
+            # in use by another session, it goes next time
+            pass
+    return freed
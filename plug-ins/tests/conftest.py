@@ -0,0 +1,8 @@
+import sys
+import os
+
+# the tests import mayaPlugins the way the plug-ins do, from the plug-in folder, and the benchmark meshes from next to it
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in (PLUGIN_DIR, os.path.join(PLUGIN_DIR, "benchmarks")):
+    if folder not in sys.path:
+        sys.path.append(folder)
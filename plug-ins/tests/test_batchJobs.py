@@ -0,0 +1,87 @@
+import os
+import time
+import multiprocessing
+import pytest
+
+from mayaPlugins import batchJobs
+from mayaPlugins import standInMaya
+from mayaPlugins import standInMesh
+
+
+class SceneCmds(object):
+    """A stand-in session for batch workers: opening a scene writes its name and the worker's pid to a log, and
+        opening crash.mb kills the worker the way a Maya crash would"""
+    def __init__(self, log):
+        self.cmds = standInMesh.StandInCmds()
+        self.log = log
+
+    def undoInfo(self, **kwargs):
+        pass
+
+    def loadPlugin(self, path, **kwargs):
+        pass
+
+    def file(self, scene = None, **kwargs):
+        if kwargs.get("open"):
+            with open(self.log, "a") as f:
+                f.write("%s %d\n" % (os.path.basename(scene), os.getpid()))
+            # long enough for the other workers to be in a job when one dies
+            time.sleep(0.05)
+            if os.path.basename(scene) == "crash.mb":
+                os._exit(11)
+
+    def consolidateMaterials(self, *objects, **flags):
+        return 0
+
+    def __getattr__(self, name):
+        return getattr(self.cmds, name)
+
+
+def test_expandJobsMakesAJobPerScene():
+    jobs = batchJobs.expandJobs([{"name" : "lib", "scenes" : ["a.mb", "b.mb"], "operations" : ["undoBevel"], "save" : "out/"},
+                                 {"scene" : "props/crate.ma", "operations" : [{"command" : "createDisney", "flags" : {"root" : "textures"}}], "save" : True},
+                                 {"operations" : ["consolidateMaterials"]}], "/farm")
+    assert [(job["index"], job["name"], job["scene"], job["save"]) for job in jobs] == [
+        (0, "lib/a.mb", "/farm/a.mb", "/farm/out/a.mb"), (1, "lib/b.mb", "/farm/b.mb", "/farm/out/b.mb"),
+        (2, "crate", "/farm/props/crate.ma", "/farm/props/crate.ma"), (3, "job2", None, None)]
+    # undoBevel with nothing selected finds the bevels itself, path flags are made absolute
+    assert jobs[0]["operations"] == [{"command" : "undoBevel", "objects" : [], "flags" : {"auto" : True}, "select" : []}]
+    assert jobs[2]["operations"][0]["flags"] == {"root" : "/farm/textures"}
+
+@pytest.mark.parametrize("job", [{"operations" : ["selectHardSoftEdges"]}, {"operations" : ["createDisney"]},
+                                 {"operations" : ["undoBevel"], "save" : True}, {"scene" : "a.mb"}],
+                         ids = ["notABatchCommand", "dialog", "saveWithNoScene", "noOperations"])
+def test_expandJobsRejectsAJobItCantRun(job):
+    with pytest.raises(ValueError):
+        batchJobs.expandJobs([job], "/farm")
+
+def test_shardJobsSplitsEveryNthJob():
+    jobs = batchJobs.expandJobs([{"scenes" : ["s%d.mb" % i for i in range(5)], "operations" : ["undoBevel"]}], "/farm")
+    assert [job["index"] for job in batchJobs.shardJobs(jobs, 0, 2)] == [0, 2, 4]
+    assert [job["index"] for job in batchJobs.shardJobs(jobs, 1, 2)] == [1, 3]
+    with pytest.raises(ValueError):
+        batchJobs.shardJobs(jobs, 2, 2)
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason = "the workers fork to keep the stand-in modules")
+def test_runJobsOnlyFailsTheJobThatCrashed(tmp_path, monkeypatch):
+    standInMaya.install()
+    log = str(tmp_path / "opened.log")
+    standInMaya.setCmds(SceneCmds(log))
+    poolResults = batchJobs.poolResults
+    alone = []
+    def recordingPoolResults(jobs, workers, *args):
+        if workers == 1:
+            alone.extend(job["name"] for job in jobs)
+        return poolResults(jobs, workers, *args)
+    monkeypatch.setattr(batchJobs, "poolResults", recordingPoolResults)
+
+    scenes = ["s%d.mb" % i for i in range(4)] + ["crash.mb"] + ["t%d.mb" % i for i in range(4)]
+    jobs = batchJobs.expandJobs([{"scenes" : scenes, "operations" : ["consolidateMaterials"]}], str(tmp_path))
+    results = batchJobs.runJobs(jobs, 3, mpContext = multiprocessing.get_context("fork"))
+    assert [result["index"] for result in results] == list(range(len(scenes)))
+    assert [result["name"] for result in results if result["status"] != "ok"] == ["crash.mb"]
+    assert results[4]["error"] == "the worker process running it died"
+    # the workers stopped with the pool said which jobs they were in, so only the crashing one was run again alone
+    assert alone == ["crash.mb"]
+    with open(log) as f:
+        assert [line.split()[0] for line in f].count("crash.mb") == 2
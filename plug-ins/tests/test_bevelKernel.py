@@ -0,0 +1,92 @@
+import math
+import pytest
+import numpy as np
+
+from mayaPlugins import bevelKernel
+from mayaPlugins import bevelSolver
+import undoBevelBenchmark
+
+
+def chamferedBar(rows = 1, size = 1.0, chamfer = 0.1):
+    """A square bar along y with its 2 top edges chamfered, the top face left between the chamfers"""
+    h = size / 2.0
+    profile = [(-h, -h), (h, -h), (h, h - chamfer), (h - chamfer, h), (-h + chamfer, h), (-h, h - chamfer)]
+    heights = np.linspace(0.0, 2.0 * size, rows + 1).tolist()
+    return undoBevelBenchmark.SweptMesh([[(u, y, v) for y in heights] for u, v in profile], True, False, set([2, 4]))
+
+def roundedBar(size = 1.0, chamfer = 0.1):
+    """A square bar with one edge rounded over 2 segments, a multi segment bevel"""
+    h = size / 2.0
+    middle = h - chamfer * (1.0 - math.sqrt(0.5))
+    profile = [(-h, -h), (h, -h), (h, h - chamfer), (middle, middle), (h - chamfer, h), (-h, h)]
+    return undoBevelBenchmark.SweptMesh([[(u, y, v) for y in (0.0, 1.0)] for u, v in profile], True, False, set())
+
+def detected(swept):
+    faces, rails = bevelSolver.detectBevels(swept.mesh.bevelMesh("bevelMesh"))
+    return sorted(faces.tolist())
+
+
+def test_intersectLinesPlanesFlagsParallelLines():
+    b = np.array([[0.0, 0.0, 1.0], [0.0, 0.0, 1.0]])
+    p = np.array([[0.0, 0.0, 1.0], [1.0, 0.0, 0.0]])
+    n = np.array([[0.0, 0.0, 2.0], [0.0, 0.0, 2.0]])
+    d = np.array([4.0, 4.0])
+    points, valid = bevelKernel.intersectLinesPlanes(b, p, n, d)
+    assert valid.tolist() == [True, False]
+    assert np.allclose(points[0], (0.0, 0.0, 2.0))
+    assert np.allclose(points[1], b[1])
+
+def test_edgeBendsAreZeroOnBorders():
+    normals = np.array([[0.0, 0.0, 1.0], [1.0, 0.0, 0.0]])
+    bends = bevelKernel.edgeBends(normals, np.array([[0, 1], [0, -1]]))
+    assert np.allclose(bends, [math.pi / 2.0, 0.0])
+
+def test_weldClustersUsesTheSmallerRadius():
+    points = np.array([[0.0, 0.0, 0.0], [0.05, 0.0, 0.0], [1.0, 0.0, 0.0], [1.2, 0.0, 0.0], [5.0, 0.0, 0.0]])
+    radii = np.array([0.1, 0.1, 0.1, 0.5, 0.1])
+    clusters = sorted(cluster.tolist() for cluster in bevelKernel.weldClusters(points, radii))
+    assert clusters == [[0, 1]]
+
+def test_pointsNearMatchesOnlyWithinTheRadius():
+    points = np.array([[0.0, 0.0, 0.0], [0.5, 0.0, 0.0], [3.0, 0.0, 0.0]])
+    ids, radii = bevelKernel.pointsNear(points, np.array([[0.1, 0.0, 0.0]]), np.array([0.2]))
+    assert ids.tolist() == [0]
+    assert radii.tolist() == [0.2]
+
+@pytest.mark.parametrize("shape", sorted(undoBevelBenchmark.GENERATORS))
+@pytest.mark.parametrize("bevels", [4, 16, 1000])
+def test_detectChamfersFindsTheBenchmarkBevels(shape, bevels):
+    swept = undoBevelBenchmark.GENERATORS[shape](bevels)
+    assert detected(swept) == sorted(swept.chamfers)
+
+@pytest.mark.parametrize("rows", [1, 5])
+def test_detectChamfersSkipsTheFaceBetweenTwoChamfers(rows):
+    swept = chamferedBar(rows)
+    assert detected(swept) == sorted(swept.chamfers)
+
+def test_detectChamfersLeavesMultiSegmentBevels():
+    assert detected(roundedBar()) == []
+
+def test_detectChamfersCollapsesARunTheSameWay():
+    swept = undoBevelBenchmark.beveledCylinder(32)
+    mesh = swept.mesh.bevelMesh("bevelMesh")
+    faces, rails = bevelSolver.detectBevels(mesh)
+    # the rail moved is the one next to the side quads, not the one on a cap
+    for edge in rails[:, 0].tolist():
+        assert sorted(len(mesh.faceEdges[face]) for face in mesh.edgeFaces[edge]) == [4, 4]
+    # and the moved rails of a run meet end to end
+    for rim in (rails[:len(faces) // 2, 0], rails[len(faces) // 2:, 0]):
+        vertices = mesh.edgeVertexArray[rim].ravel()
+        assert (np.bincount(vertices)[vertices] == 2).all()
+
+def test_shortestEdgeLengthsSkipsEdgesOfNoLength():
+    points = np.array([[0.0, 0.0, 0.0], [0.0, 1e-17, 0.0], [1.0, 0.0, 0.0], [1.0, 3.0, 0.0], [9.0, 9.0, 9.0]])
+    edgeVertices = np.array([[0, 1], [1, 2], [2, 3], [0, 3]])
+    assert np.allclose(bevelKernel.shortestEdgeLengths(points, edgeVertices), [math.sqrt(10.0), 1.0, 1.0, 3.0, 0.0])
+
+def test_weldTargetsOfADenseBevelDontReachTheNextRow():
+    swept = undoBevelBenchmark.beveledCube(4000)
+    mesh = swept.mesh.bevelMesh("bevelMesh")
+    plan = bevelSolver.solveMesh(mesh)
+    # the rows are 1 / 1000 apart, closer than a hundredth of the chamfer's width
+    assert plan.radii.max() < 0.5 / 1000
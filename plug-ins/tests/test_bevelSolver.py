@@ -0,0 +1,114 @@
+import pickle
+import pytest
+import numpy as np
+
+from mayaPlugins import bevelSolver
+from mayaPlugins import standInMesh
+import undoBevelBenchmark
+from test_bevelKernel import chamferedBar
+
+
+def collapse(cmds, plan):
+    """Applies a plan's moves and edge deletes to the stand-in, and welds what landed on the same point"""
+    for vertex, position in plan.moves.items():
+        cmds.xform("%s.vtx[%d]" % (plan.mesh, vertex), worldSpace = True, translation = position)
+    cmds.polyDelEdge(bevelSolver.componentNames(plan.mesh, "e", plan.deletedEdges), cleanVertices = True)
+    cmds.polyMergeVertex("%s.vtx[*]" % plan.mesh, distance = 1e-6)
+
+
+def test_groupComponentsKeepsRangesTogether():
+    groups = bevelSolver.groupComponents(["pCube1.e[4:6]", "pCube1.f[2]", "pCube1.e[9]"])
+    assert [(mesh, kind, ids.tolist()) for mesh, kind, ids in groups] == [("pCube1", "e", [4, 5, 6, 9]), ("pCube1", "f", [2])]
+
+def test_groupComponentsSkipsWholeObjects():
+    groups = bevelSolver.groupComponents(["pCube1", "|group1|pCube2", "pCube1.f[3]"])
+    assert [(mesh, kind, ids.tolist()) for mesh, kind, ids in groups] == [("pCube1", "f", [3])]
+    assert bevelSolver.groupComponents(["pCube1"]) == []
+
+def test_parseComponentRaisesBevelErrorOnNoIds():
+    with pytest.raises(bevelSolver.BevelError):
+        bevelSolver.parseComponent("pCube1")
+    with pytest.raises(bevelSolver.BevelError):
+        bevelSolver.parseComponent("pCube1.e[*]")
+
+def test_componentNamesMakesRuns():
+    assert bevelSolver.componentNames("m", "vtx", [7, 1, 2, 3, 9, 8]) == ["m.vtx[1:3]", "m.vtx[7:9]"]
+    assert bevelSolver.componentNames("m", "e", []) == []
+
+def test_bevelMeshPicklesToTheSameMesh():
+    mesh = undoBevelBenchmark.beveledCube(4).mesh.bevelMesh("bevelMesh")
+    mesh.move(0, 1.0, 2.0, 3.0)
+    copy = pickle.loads(pickle.dumps(mesh))
+    assert copy.faceEdges == mesh.faceEdges and copy.edgeFaces == mesh.edgeFaces
+    assert copy.moved == set([0]) and copy.position(0) == (1.0, 2.0, 3.0)
+
+def test_undoBevelFacesOfACubeLeavesABox():
+    swept = undoBevelBenchmark.beveledCube(4)
+    cmds = standInMesh.StandInCmds({"bevelMesh" : swept.mesh})
+    plan = bevelSolver.solveSelection(swept.mesh.bevelMesh("bevelMesh"), "f", np.array(swept.chamfers))
+    assert len(plan.deletedEdges) == 4
+    collapse(cmds, plan)
+    assert (swept.mesh.vertexCount(), swept.mesh.edgeCount(), swept.mesh.faceCount()) == (8, 12, 6)
+    assert np.allclose(np.abs(swept.mesh.points[:, [0, 2]]), 0.5)
+
+def test_undoBevelFacesOfACylinderMovesTheSideRails():
+    # the cap rails are shorter, but moving them along the cap's rim edges sends the vertices far out
+    swept = undoBevelBenchmark.beveledCylinder(64)
+    cmds = standInMesh.StandInCmds({"bevelMesh" : swept.mesh})
+    plan = bevelSolver.solveSelection(swept.mesh.bevelMesh("bevelMesh"), "f", np.array(swept.chamfers))
+    assert len(plan.moves) == 64
+    collapse(cmds, plan)
+    assert (swept.mesh.vertexCount(), swept.mesh.faceCount()) == (64, 34)
+    assert np.allclose(np.linalg.norm(swept.mesh.points[:, [0, 2]], axis = 1), 1.0)
+    assert np.allclose(np.abs(swept.mesh.points[:, 1] - 1.0), 1.0)
+
+def test_undoBevelEdgesCollapsesOneChamfer():
+    swept = undoBevelBenchmark.beveledCylinder(16)
+    cmds = standInMesh.StandInCmds({"bevelMesh" : swept.mesh})
+    edge1, edge2 = swept.rails(swept.chamfers[0])
+    plan = bevelSolver.solveSelection(swept.mesh.bevelMesh("bevelMesh"), "e", np.array([edge1, edge2]))
+    assert len(plan.deletedEdges) == 1 and len(plan.moves) == 2
+    faces = swept.mesh.faceCount()
+    collapse(cmds, plan)
+    assert swept.mesh.faceCount() == faces - 1
+
+def test_undoBevelRejectsAFaceThatIsNotAQuad():
+    swept = undoBevelBenchmark.beveledCube(4)
+    mesh = swept.mesh.bevelMesh("bevelMesh")
+    cap = swept.mesh.faceCount() - 1
+    with pytest.raises(bevelSolver.BevelError):
+        bevelSolver.solveSelection(mesh, "f", np.array([cap]))
+
+@pytest.mark.parametrize("swept", [undoBevelBenchmark.beveledCube(16), undoBevelBenchmark.beveledCylinder(64),
+                                   undoBevelBenchmark.chamferedGrid(64), chamferedBar(4)], ids = ["cube", "cylinder", "grid", "bar"])
+def test_solveMeshUndoesEveryBevel(swept):
+    cmds = standInMesh.StandInCmds({"bevelMesh" : swept.mesh})
+    plan = bevelSolver.solveMesh(swept.mesh.bevelMesh("bevelMesh"))
+    assert len(plan.deletedEdges) == len(swept.chamfers)
+    faces = swept.mesh.faceCount()
+    collapse(cmds, plan)
+    assert swept.mesh.faceCount() == faces - len(swept.chamfers)
+    assert len(bevelSolver.detectBevels(swept.mesh.bevelMesh("bevelMesh"))[0]) == 0
+    # every face is still flat
+    normals = [np.cross(*(swept.mesh.points[loop[1:3]] - swept.mesh.points[loop[0]])) for loop in swept.mesh.faceLoops()]
+    for loop, normal in zip(swept.mesh.faceLoops(), normals):
+        assert np.allclose(np.dot(swept.mesh.points[loop] - swept.mesh.points[loop[0]], normal), 0.0)
+
+@pytest.mark.parametrize("swept", [undoBevelBenchmark.beveledCube(16), undoBevelBenchmark.beveledCylinder(64),
+                                   undoBevelBenchmark.chamferedGrid(64), chamferedBar(4)], ids = ["cube", "cylinder", "grid", "bar"])
+def test_solveMeshMatchesLikeOneChamferAtATime(swept, monkeypatch):
+    mesh = swept.mesh.bevelMesh("bevelMesh")
+    moved, deleted = set(), []
+    faces, rails = bevelSolver.detectBevels(mesh)
+    for edge1, edge2 in rails.tolist():
+        bevelSolver.matchEdgePair(mesh, edge1, edge2, moved, deleted, strict = False, ordered = True)
+    expected = bevelSolver.BevelPlan(mesh, moved, deleted, bevelSolver.DEFAULT_TOLERANCE)
+
+    intersect = bevelSolver.bevelKernel.intersectEdgesFaces
+    calls = []
+    monkeypatch.setattr(bevelSolver.bevelKernel, "intersectEdgesFaces", lambda *args: calls.append(len(args[3])) or intersect(*args))
+    plan = bevelSolver.solveMesh(swept.mesh.bevelMesh("bevelMesh"))
+    # every chamfer's side edges in one pass
+    assert calls == [2 * len(swept.chamfers)]
+    assert plan.deletedEdges == expected.deletedEdges and sorted(plan.moves) == sorted(expected.moves)
+    assert np.allclose([plan.moves[vertex] for vertex in plan.moves], [expected.moves[vertex] for vertex in plan.moves])
@@ -0,0 +1,22 @@
+import os
+import pytest
+
+from mayaPlugins import standInMaya
+
+standInMaya.install()
+from mayaPlugins import bootstrap
+
+PLUGIN_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_checkCommandsNamesTheDuplicates():
+    commands = bootstrap.COMMANDS + (bootstrap.Command("undoBevel", "Other", "scriptedCommand", "syntaxCreator"),
+                                     bootstrap.Command("createLambert", "Other", "scriptedCommand", "syntaxCreator"))
+    with pytest.raises(ValueError) as error:
+        bootstrap.checkCommands(commands)
+    assert str(error.value).endswith(": createLambert, undoBevel")
+
+def test_everyCommandIsInAPluginOfThisFolder():
+    bootstrap.checkCommands(bootstrap.COMMANDS)
+    for command in bootstrap.COMMANDS:
+        assert os.path.isfile(os.path.join(PLUGIN_DIR, command.module + ".py")), command
@@ -0,0 +1,78 @@
+import numpy as np
+
+from mayaPlugins import edgeSharpness
+
+# a strip of 3 quads, flat over the first 2 and folded down 90 degrees at the last. Vertex column * 2 + row
+STRIP_POINTS = [(0.0, 0.0, 0.0), (0.0, 1.0, 0.0), (1.0, 0.0, 0.0), (1.0, 1.0, 0.0),
+                (2.0, 0.0, 0.0), (2.0, 1.0, 0.0), (2.0, 0.0, -1.0), (2.0, 1.0, -1.0)]
+# the edges across the strip, 1 the flat one and 2 the fold, then the ones along it
+STRIP_EDGES = [(0, 1), (2, 3), (4, 5), (6, 7), (0, 2), (1, 3), (2, 4), (3, 5), (4, 6), (5, 7)]
+STRIP_FACES = [(0, 2, 3, 1), (2, 4, 5, 3), (4, 6, 7, 5)]
+BORDER = [0, 3, 4, 5, 6, 7, 8, 9]
+
+
+def edgeInfo(edges, hard):
+    """The lines polyInfo -edgeToVertex prints"""
+    return ["EDGE %6d: %6d %6d  %s\n" % (edge, a, b, "Hard" if isHard else "Soft") for edge, ((a, b), isHard) in enumerate(zip(edges, hard))]
+
+def faceInfo(faces):
+    """The lines polyInfo -faceToVertex prints"""
+    return ["FACE %6d: %s \n" % (face, " ".join("%6d" % vertex for vertex in vertices)) for face, vertices in enumerate(faces)]
+
+def strip(hard = None):
+    edgeVertices, flags = edgeSharpness.parseEdgeInfo(edgeInfo(STRIP_EDGES, hard or [False] * len(STRIP_EDGES)))
+    faceCounts, faceVertexIds = edgeSharpness.parseFaceInfo(faceInfo(STRIP_FACES))
+    return edgeSharpness.EdgeMesh("strip", edgeVertices, flags, STRIP_POINTS, faceCounts, faceVertexIds)
+
+
+def test_parseEdgeInfoReadsTheVerticesAndFlags():
+    edgeVertices, hard = edgeSharpness.parseEdgeInfo(edgeInfo([(0, 1), (12, 345), (7, 2)], [True, False, True]))
+    assert edgeVertices.tolist() == [[0, 1], [12, 345], [7, 2]]
+    assert hard.tolist() == [True, False, True]
+
+def test_parseFaceInfoReadsFacesOfAnySize():
+    counts, vertexIds = edgeSharpness.parseFaceInfo(faceInfo([(0, 1, 3, 2), (4, 5, 6), (7, 8, 9, 10, 11)]))
+    assert counts.tolist() == [4, 3, 5]
+    assert vertexIds.tolist() == [0, 1, 3, 2, 4, 5, 6, 7, 8, 9, 10, 11]
+
+def test_classifyEdgesBySmoothingFlag():
+    hard = [edge in (2, 5) for edge in range(len(STRIP_EDGES))]
+    mesh = strip(hard)
+    assert edgeSharpness.classifyEdges(mesh).tolist() == [2, 5]
+    assert edgeSharpness.classifyEdges(mesh, hard = False).tolist() == [edge for edge in range(len(STRIP_EDGES)) if edge not in (2, 5)]
+
+def test_classifyEdgesByAngleCountsBordersAsHard():
+    mesh = strip()
+    assert mesh.edgeFaceArray()[[1, 2]].tolist() == [[0, 1], [1, 2]]
+    assert edgeSharpness.classifyEdges(mesh, angle = 45.0).tolist() == sorted(BORDER + [2])
+    assert edgeSharpness.classifyEdges(mesh, hard = False, angle = 45.0).tolist() == [1]
+    # a 90 degree fold is soft under a wider angle, the flags play no part
+    assert edgeSharpness.classifyEdges(mesh, hard = False, angle = 100.0).tolist() == [1, 2]
+
+def test_movePointsOnlyRecomputesTheFacesAroundTheMovedVertices():
+    mesh = strip()
+    assert edgeSharpness.classifyEdges(mesh, hard = False, angle = 45.0).tolist() == [1]
+    points = np.array(STRIP_POINTS)
+    # unfolding the last quad flattens the fold
+    points[[6, 7], 0] = 3.0
+    points[[6, 7], 2] = 0.0
+    assert mesh.movePoints(points) == 1
+    assert mesh.geometryVersion == 1
+    assert edgeSharpness.classifyEdges(mesh, hard = False, angle = 45.0).tolist() == [1, 2]
+    fresh = strip()
+    fresh.movePoints(points)
+    assert np.allclose(mesh.edgeCosines()[[1, 2]], fresh.edgeCosines()[[1, 2]])
+    # the same points again change nothing
+    assert mesh.movePoints(points) == 0 and mesh.geometryVersion == 1
+
+def test_refreshKeepsTheTopologyWhenItIsTheSame():
+    mesh = strip()
+    edgeFaces = mesh.edgeFaceArray()
+    hard = [edge == 1 for edge in range(len(STRIP_EDGES))]
+    faceCounts, faceVertexIds = edgeSharpness.parseFaceInfo(faceInfo(STRIP_FACES))
+    assert not mesh.refresh(STRIP_EDGES, hard, STRIP_POINTS, faceCounts, faceVertexIds)
+    assert mesh.edgeFaceArray() is edgeFaces and mesh.topologyVersion == 0
+    assert edgeSharpness.classifyEdges(mesh).tolist() == [1]
+    # a face less is new topology
+    assert mesh.refresh(STRIP_EDGES, hard, STRIP_POINTS, faceCounts[:2], faceVertexIds[:8])
+    assert mesh.topologyVersion == 1 and mesh.edgeFaceArray()[2].tolist() == [1, -1]
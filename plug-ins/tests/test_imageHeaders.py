@@ -0,0 +1,72 @@
+import struct
+import pytest
+
+from mayaPlugins import imageHeaders
+
+
+def pngChunk(kind, data):
+    # the CRC isn't checked
+    return struct.pack(">I", len(data)) + kind + data + b"\0\0\0\0"
+
+def png(width, height, bits, colorType, *chunks):
+    header = pngChunk(b"IHDR", struct.pack(">IIBBBBB", width, height, bits, colorType, 0, 0, 0))
+    return imageHeaders.PNG_SIGNATURE + header + b"".join(chunks) + pngChunk(b"IDAT", b"\0" * 16) + pngChunk(b"IEND", b"")
+
+def jpeg(width, height, channels):
+    app0 = b"\xff\xe0" + struct.pack(">H", 16) + b"JFIF\0" + b"\0" * 9
+    frame = b"\xff\xc0" + struct.pack(">HBHHB", 8 + 3 * channels, 8, height, width, channels) + b"\0" * 3 * channels
+    return b"\xff\xd8" + app0 + frame + b"\xff\xda"
+
+def tiff(width, height, bits, sampleFormat = 1):
+    """A little endian TIFF whose bits per sample, 3 of them, are stored past the directory"""
+    entries = [struct.pack("<HHIH2x", 256, 3, 1, width), struct.pack("<HHII", 257, 4, 1, height),
+               struct.pack("<HHII", 258, 3, 3, 8 + 2 + 12 * 5 + 4), struct.pack("<HHIH2x", 277, 3, 1, 3),
+               struct.pack("<HHIH2x", 339, 3, 1, sampleFormat)]
+    return b"II*\0" + struct.pack("<I", 8) + struct.pack("<H", len(entries)) + b"".join(entries) + b"\0" * 4 + struct.pack("<HHH", bits, bits, bits)
+
+def exrAttribute(name, kind, value):
+    return name + b"\0" + kind + b"\0" + struct.pack("<i", len(value)) + value
+
+def exr(width, height, channels, pixelType):
+    channelList = b"".join(channel + b"\0" + struct.pack("<iB3xii", pixelType, 0, 1, 1) for channel in channels) + b"\0"
+    return (imageHeaders.EXR_MAGIC + struct.pack("<I", 2) + exrAttribute(b"channels", b"chlist", channelList) +
+            exrAttribute(b"dataWindow", b"box2i", struct.pack("<iiii", 0, 0, width - 1, height - 1)) + b"\0")
+
+def header(tmp_path, name, data):
+    path = tmp_path / name
+    path.write_bytes(data)
+    info = imageHeaders.read_header(str(path))
+    return info and (info.width, info.height, info.channels, info.bits, info.floating, info.alpha, info.encoding)
+
+
+def test_readPngHeaders(tmp_path):
+    assert header(tmp_path, "rgba.png", png(64, 32, 8, 6)) == (64, 32, 4, 8, False, True, imageHeaders.SRGB)
+    # a gamma of 1.0 is linear
+    gamma = pngChunk(b"gAMA", struct.pack(">I", 100000))
+    assert header(tmp_path, "grey.png", png(16, 16, 16, 0, gamma)) == (16, 16, 1, 16, False, False, imageHeaders.LINEAR)
+    # a transparent colour adds an alpha channel
+    assert header(tmp_path, "rgb.png", png(8, 4, 8, 2, pngChunk(b"tRNS", b"\0" * 6))) == (8, 4, 4, 8, False, True, imageHeaders.SRGB)
+
+def test_readJpegHeaderSkipsTheSegmentsBeforeTheFrame(tmp_path):
+    assert header(tmp_path, "photo.jpg", jpeg(640, 480, 3)) == (640, 480, 3, 8, False, False, imageHeaders.SRGB)
+
+def test_readTiffHeaders(tmp_path):
+    assert header(tmp_path, "rgb.tif", tiff(300, 200, 16)) == (300, 200, 3, 16, False, False, imageHeaders.SRGB)
+    # float samples are linear
+    assert header(tmp_path, "float.tif", tiff(300, 200, 32, 3)) == (300, 200, 3, 32, True, False, imageHeaders.LINEAR)
+
+def test_readExrHeaderCountsTheFirstLayerOnly(tmp_path):
+    channels = [b"A", b"B", b"G", b"R", b"diffuse.R"]
+    assert header(tmp_path, "half.exr", exr(1024, 512, channels, 1)) == (1024, 512, 4, 16, True, True, imageHeaders.LINEAR)
+    assert header(tmp_path, "uint.exr", exr(4, 4, [b"Y"], 0)) == (4, 4, 1, 32, False, False, imageHeaders.LINEAR)
+
+@pytest.mark.parametrize("data", [b"GIF89a" + b"\0" * 16, imageHeaders.PNG_SIGNATURE + b"\0" * 4, b""], ids = ["gif", "truncated", "empty"])
+def test_readHeaderIsNoneForWhatItCantRead(tmp_path, data):
+    assert header(tmp_path, "image", data) is None
+
+def test_readHeadersReadsTheFirstTileOfAUdimPath(tmp_path):
+    (tmp_path / "rock_BaseColor.1002.png").write_bytes(png(32, 32, 8, 2))
+    (tmp_path / "rock_BaseColor.1001.png").write_bytes(png(64, 64, 8, 2))
+    folder = str(tmp_path).replace("\\", "/")
+    infos = imageHeaders.read_headers([folder + "/rock_BaseColor.<UDIM>.png", folder + "/missing.png"])
+    assert infos[0].width == 64 and infos[1] is None
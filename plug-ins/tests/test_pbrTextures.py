@@ -0,0 +1,30 @@
+import pytest
+
+from mayaPlugins import pbrTextures
+from mayaPlugins import texturePaths
+
+
+@pytest.mark.parametrize("file, tile", [("rock_BaseColor.1001.exr", "1001"), ("rock_BaseColor_1999.png", "1999"),
+                                        ("rock_BaseColor.<UDIM>.exr", "<UDIM>"), ("rock_BaseColor.1000.exr", None),
+                                        ("rock_1001_BaseColor.exr", None), ("rock_BaseColor1001.exr", None),
+                                        ("rock_BaseColor_1024.tif", "1024"), ("rock_1024_BaseColor.tif", None)])
+def test_classifyOnlyTakesATileBeforeTheExtension(file, tile):
+    assert pbrTextures.classify(file) == (pbrTextures.BASE_COLOR, tile)
+
+def touch(folder, *names):
+    for name in names:
+        (folder / name).write_bytes(b"")
+
+def test_scanFolderCollapsesTilesOnlyWhenThereAreSeveral(tmp_path):
+    touch(tmp_path, "rock_BaseColor.1001.exr", "rock_BaseColor.1002.exr", "rock_Roughness_1024.tif", "rock_Normal.1000.exr")
+    files, sub_folders, stats = pbrTextures.scan_folder(str(tmp_path))
+    folder = str(tmp_path)
+    assert sorted(files) == sorted([(pbrTextures.BASE_COLOR, folder + "/rock_BaseColor.<UDIM>.exr"),
+                                    (pbrTextures.ROUGHNESS, folder + "/rock_Roughness_1024.tif"),
+                                    (pbrTextures.BUMP_NORMAL, folder + "/rock_Normal.1000.exr")])
+    assert pbrTextures.tiles(folder + "/rock_BaseColor.<UDIM>.exr") == [folder + "/rock_BaseColor.1001.exr", folder + "/rock_BaseColor.1002.exr"]
+
+def test_findMissingOnlyMatchesTilesForAUdimPath(tmp_path):
+    touch(tmp_path, "rock_BaseColor.1001.exr")
+    folder = str(tmp_path)
+    assert texturePaths.find_missing([folder + "/rock_BaseColor.<UDIM>.exr", folder + "/rock_BaseColor.1002.exr"]) == [folder + "/rock_BaseColor.1002.exr"]
@@ -0,0 +1,46 @@
+import fnmatch
+import pytest
+
+from mayaPlugins import standInMaya
+from mayaPlugins import standInMesh
+
+standInMaya.install()
+from mayaPlugins import shadingNetworks
+
+
+class NodeCmds(object):
+    """A stand-in scene with nodes besides its meshes, which ls finds by name or wildcard, counting its queries"""
+    def __init__(self, nodes):
+        self.cmds = standInMesh.StandInCmds()
+        self.nodes = set(nodes)
+        self.queries = 0
+
+    def ls(self, names):
+        self.queries += 1
+        return [node for node in sorted(self.nodes) if any(fnmatch.fnmatchcase(node, name) for name in names)]
+
+    def __getattr__(self, name):
+        return getattr(self.cmds, name)
+
+
+@pytest.fixture
+def scene():
+    cmds = NodeCmds(["rock", "metal2SG", "metal3", "rock1SG"])
+    standInMaya.setCmds(cmds)
+    return cmds
+
+
+def test_uniqueNamesNumbersTheClashesLikeMaya(scene):
+    # rock is taken, rock1 clashes as a shading group, and a name ending in digits is numbered from its stem
+    names = shadingNetworks.unique_names(["rock", "rock", "metal2", "wood"], shadingNetworks.SG_SUFFIX)
+    assert names == ["rock2", "rock3", "metal1", "wood"]
+    assert scene.queries == 2
+
+def test_uniqueNamesKeepsTheNamesOfABatchApart(scene):
+    assert shadingNetworks.unique_names(["wood", "wood", "wood1"]) == ["wood", "wood1", "wood2"]
+    # nothing clashing with the scene needs no second query
+    assert scene.queries == 1
+
+def test_uniqueNamesOfNothingListsNothing(scene):
+    assert shadingNetworks.unique_names([]) == []
+    assert scene.queries == 0
@@ -0,0 +1,105 @@
+import numpy as np
+
+from mayaPlugins import edgeSharpness
+from mayaPlugins import standInMesh
+
+
+def gridMesh(columns, rows):
+    """A flat sheet of columns by rows quads, vertex (i, j) numbered j * (columns + 1) + i"""
+    points = [(i, j, 0.0) for j in range(rows + 1) for i in range(columns + 1)]
+    vertex = lambda i, j: j * (columns + 1) + i
+    faces = [(vertex(i, j), vertex(i + 1, j), vertex(i + 1, j + 1), vertex(i, j + 1)) for j in range(rows) for i in range(columns)]
+    return standInMesh.HalfEdgeMesh(points, faces)
+
+def cubeMesh():
+    points = [(x, y, z) for z in (0.0, 1.0) for y in (0.0, 1.0) for x in (0.0, 1.0)]
+    faces = [(0, 2, 3, 1), (4, 5, 7, 6), (0, 1, 5, 4), (1, 3, 7, 5), (3, 2, 6, 7), (2, 0, 4, 6)]
+    return standInMesh.HalfEdgeMesh(points, faces)
+
+def edgeBetween(mesh, vertex1, vertex2):
+    return [edge for edge in mesh.vertexEdges(vertex1) if vertex2 in mesh.edgeVertices(edge)][0]
+
+
+def test_polyInfoPrintsWhatEdgeSharpnessParses():
+    mesh = cubeMesh()
+    cmds = standInMesh.StandInCmds({"cube" : mesh})
+    edgeVertices, hard = edgeSharpness.parseEdgeInfo(cmds.polyInfo("cube.e[*]", edgeToVertex = True))
+    assert edgeVertices.tolist() == [list(mesh.edgeVertices(edge)) for edge in range(mesh.edgeCount())]
+    assert hard.all()
+
+    counts, vertexIds = edgeSharpness.parseFaceInfo(cmds.polyInfo("cube.f[*]", faceToVertex = True))
+    assert counts.tolist() == [4] * 6
+    assert vertexIds.tolist() == [vertex for loop in mesh.faceLoops() for vertex in loop]
+
+def test_polyInfoReportsSoftEdges():
+    mesh = standInMesh.HalfEdgeMesh(cubeMesh().points, cubeMesh().faceLoops(), soft = [(0, 1)])
+    cmds = standInMesh.StandInCmds({"cube" : mesh})
+    lines = cmds.polyInfo("cube.e[%d]" % edgeBetween(mesh, 0, 1), ev = True)
+    assert lines[0].rstrip().endswith("Soft")
+
+def test_polyDelEdgeJoinsTheFacesEitherSide():
+    mesh = cubeMesh()
+    cmds = standInMesh.StandInCmds({"cube" : mesh})
+    cmds.polyDelEdge("cube.e[%d]" % edgeBetween(mesh, 0, 1), cleanVertices = True)
+    # both ends are left on 2 edges and go with it, the cube becomes a wedge
+    assert (mesh.vertexCount(), mesh.edgeCount(), mesh.faceCount()) == (6, 9, 5)
+    assert sorted(len(loop) for loop in mesh.faceLoops()) == [3, 3, 4, 4, 4]
+
+    kept = cubeMesh()
+    standInMesh.StandInCmds({"cube" : kept}).polyDelEdge("cube.e[%d]" % edgeBetween(kept, 0, 1), cleanVertices = False)
+    assert (kept.vertexCount(), kept.edgeCount(), kept.faceCount()) == (8, 11, 5)
+
+def test_polyDelEdgeCleansVerticesLeftOnTwoEdges():
+    mesh = gridMesh(2, 1)
+    cmds = standInMesh.StandInCmds({"sheet" : mesh})
+    cmds.polyDelEdge("sheet.e[%d]" % edgeBetween(mesh, 1, 4), cleanVertices = True)
+    assert mesh.faceLoops() == [[0, 1, 3, 2]]
+    assert mesh.points.tolist() == [[0.0, 0.0, 0.0], [2.0, 0.0, 0.0], [0.0, 1.0, 0.0], [2.0, 1.0, 0.0]]
+
+    kept = gridMesh(2, 1)
+    standInMesh.StandInCmds({"sheet" : kept}).polyDelEdge("sheet.e[%d]" % edgeBetween(kept, 1, 4))
+    assert (kept.vertexCount(), kept.faceCount()) == (6, 1)
+
+def test_polyDelEdgeRemovesDanglingEdges():
+    mesh = gridMesh(2, 2)
+    cmds = standInMesh.StandInCmds({"sheet" : mesh})
+    # 3 of the 4 edges around the middle vertex leave the 4th hanging into the one face left
+    cmds.polyDelEdge(["sheet.e[%d]" % edgeBetween(mesh, 4, other) for other in (1, 3, 5)], cleanVertices = True)
+    assert mesh.faceCount() == 1
+    assert mesh.edgeCount() == len(mesh.faceLoops()[0])
+    assert [1.0, 1.0, 0.0] not in mesh.points.tolist()
+    assert all(mesh.twin[half] == -1 for half in range(len(mesh.origin)))
+
+def test_polyDelEdgeKeepsBorderEdges():
+    mesh = gridMesh(1, 1)
+    standInMesh.StandInCmds({"sheet" : mesh}).polyDelEdge("sheet.e[0]", cleanVertices = True)
+    assert (mesh.vertexCount(), mesh.edgeCount(), mesh.faceCount()) == (4, 4, 1)
+
+def test_polyMergeVertexWeldsCloseVerticesIntoTheLowest():
+    points = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (1.0, 0.0, 0.0), (1.001, 1.0, 0.0), (0.0, 1.0, 0.0)]
+    mesh = standInMesh.HalfEdgeMesh(points, [(0, 1, 2), (3, 4, 5)])
+    cmds = standInMesh.StandInCmds({"pair" : mesh})
+    cmds.polyMergeVertex("pair.vtx[*]", distance = 0.01)
+    assert mesh.vertexCount() == 4
+    assert mesh.faceLoops() == [[0, 1, 2], [1, 3, 2]]
+    # the two triangles share their diagonal now
+    assert mesh.edgeCount() == 5
+
+def test_polyMergeVertexDropsCollapsedFaces():
+    mesh = gridMesh(2, 1)
+    mesh.points[1] = mesh.points[2]
+    mesh.points[4] = mesh.points[5]
+    standInMesh.StandInCmds({"sheet" : mesh}).polyMergeVertex("sheet.vtx[*]", distance = 0.0)
+    assert (mesh.vertexCount(), mesh.faceCount()) == (4, 1)
+    assert np.allclose(mesh.points, [(0, 0, 0), (2, 0, 0), (0, 1, 0), (2, 1, 0)])
+
+def test_setAttrOfTweaksMovesThePoints():
+    mesh = gridMesh(2, 1)
+    cmds = standInMesh.StandInCmds({"sheet" : mesh})
+    shape = cmds.listRelatives("sheet", shapes = True, fullPath = True)[0]
+    assert cmds.listRelatives(shape, parent = True) == ["sheet"]
+    assert cmds.getAttr("%s.worldMatrix[0]" % shape) == np.identity(4).ravel().tolist()
+    cmds.setAttr("%s.pnts[1:2]" % shape, 0.0, 0.0, 1.0, 0.0, 0.5, 0.0, type = "float3")
+    cmds.setAttr("%s.pnts[1]" % shape, 0.0, 0.0, 2.0, type = "float3")
+    assert cmds.getAttr("%s.pnts[0:2]" % shape) == [(0.0, 0.0, 0.0), (0.0, 0.0, 2.0), (0.0, 0.5, 0.0)]
+    assert mesh.points[1:3].tolist() == [[1.0, 0.0, 2.0], [2.0, 0.5, 0.0]]
@@ -0,0 +1,40 @@
+import os
+import sys
+
+from mayaPlugins import texConversion
+
+# a converter that copies the source, like txmake without the mip-maps
+COPY_COMMAND = [sys.executable, "-c", "import shutil, sys; shutil.copy(sys.argv[1], sys.argv[2])"]
+FAILING_COMMAND = [sys.executable, "-c", "import sys; open(sys.argv[2], 'w').write('half'); sys.exit(3)"]
+
+
+def test_convertSkipsAnUpToDateTex(tmp_path):
+    source = tmp_path / "rock_BaseColor.png"
+    source.write_bytes(b"image")
+    assert texConversion.convert(COPY_COMMAND, str(source)) == (True, None)
+    target = texConversion.tex_path(str(source))
+    assert open(target, "rb").read() == b"image"
+    # a .tex no older than its source isn't converted again, not even by a converter that would fail
+    os.utime(str(source), ns = (1000000000, 1000000000))
+    os.utime(target, ns = (2000000000, 2000000000))
+    assert texConversion.is_up_to_date(str(source), target)
+    assert texConversion.convert(FAILING_COMMAND, str(source)) == (False, None)
+
+def test_convertRunsAgainForANewerSource(tmp_path):
+    source = tmp_path / "rock_BaseColor.png"
+    source.write_bytes(b"new")
+    target = tmp_path / "rock_BaseColor.tex"
+    target.write_bytes(b"old")
+    os.utime(str(target), ns = (1000000000, 1000000000))
+    assert not texConversion.is_up_to_date(str(source), str(target))
+    assert texConversion.convert(COPY_COMMAND, str(source)) == (True, None)
+    assert target.read_bytes() == b"new"
+
+def test_aFailedConversionLeavesNoTex(tmp_path):
+    source = tmp_path / "rock_BaseColor.png"
+    source.write_bytes(b"image")
+    ran, error = texConversion.convert(FAILING_COMMAND, str(source))
+    assert ran and error
+    # the half written file was a temporary one, so the next import tries again
+    assert os.listdir(str(tmp_path)) == ["rock_BaseColor.png"]
+    assert not texConversion.is_up_to_date(str(source), texConversion.tex_path(str(source)))
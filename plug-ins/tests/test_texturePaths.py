@@ -0,0 +1,42 @@
+from mayaPlugins import texturePaths
+
+
+def touch(folder, *paths):
+    for path in paths:
+        path = folder / path
+        path.parent.mkdir(parents = True, exist_ok = True)
+        path.write_bytes(b"")
+
+def test_buildIndexFindsEveryTextureUnderTheRoots(tmp_path):
+    touch(tmp_path, "a/rock_BaseColor.png", "a/b/rock_BaseColor.png", "a/b/c/metal_Roughness.1001.exr", "a/notes.txt")
+    root = str(tmp_path).replace("\\", "/")
+    index = texturePaths.build_index([root + "/a"])
+    assert sorted(index[texturePaths.index_key("rock_BaseColor.png")]) == [(root + "/a", "rock_BaseColor.png"), (root + "/a/b", "rock_BaseColor.png")]
+    # a tile is found by its own name and as its <UDIM> path
+    assert index[texturePaths.index_key("metal_Roughness.1001.exr")] == [(root + "/a/b/c", "metal_Roughness.1001.exr")]
+    assert index[texturePaths.index_key("metal_Roughness.<UDIM>.exr")] == [(root + "/a/b/c", "metal_Roughness.1001.exr")]
+    assert texturePaths.index_key("notes.txt") not in index
+
+def test_resolvePrefersTheFolderEndingLikeTheOldOne():
+    index = {texturePaths.index_key("rock_BaseColor.png") : [("/new/library/rock", "rock_BaseColor.png"), ("/new/old/rock", "rock_BaseColor.png"),
+                                                             ("/backup/library/rock", "rock_BaseColor.png")]}
+    assert texturePaths.resolve("/old/library/rock/rock_BaseColor.png", index) == "/new/library/rock/rock_BaseColor.png"
+    assert texturePaths.resolve("/old/library/rock/rock_Normal.png", index) is None
+
+def test_resolveKeepsAUdimPath():
+    index = {texturePaths.index_key("rock_BaseColor.<UDIM>.exr") : [("/new/rock", "rock_BaseColor.1001.exr")]}
+    assert texturePaths.resolve("/old/rock/rock_BaseColor.<UDIM>.exr", index) == "/new/rock/rock_BaseColor.<UDIM>.exr"
+
+def test_relinkFindsTheMovedTextures(tmp_path):
+    touch(tmp_path, "scene/rock_BaseColor.png", "moved/rock/rock_Roughness.png", "moved/metal/metal_Normal.1001.exr")
+    root = str(tmp_path).replace("\\", "/")
+    paths = [root + "/scene/rock_BaseColor.png", root + "/scene/rock/rock_Roughness.png",
+             root + "/scene/metal/metal_Normal.<UDIM>.exr", root + "/scene/rock_Height.png"]
+    fixes, unresolved = texturePaths.relink(paths, [root + "/moved"])
+    assert fixes == {root + "/scene/rock/rock_Roughness.png" : root + "/moved/rock/rock_Roughness.png",
+                     root + "/scene/metal/metal_Normal.<UDIM>.exr" : root + "/moved/metal/metal_Normal.<UDIM>.exr"}
+    assert unresolved == [root + "/scene/rock_Height.png"]
+
+def test_relinkDoesNothingWhenNothingIsMissing(tmp_path):
+    touch(tmp_path, "rock_BaseColor.png")
+    assert texturePaths.relink([str(tmp_path / "rock_BaseColor.png")], [str(tmp_path)]) == ({}, [])
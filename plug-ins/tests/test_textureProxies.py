@@ -0,0 +1,58 @@
+import os
+import sys
+import pytest
+
+from mayaPlugins import textureProxies
+
+# a resizer that copies the source, the size only checked for
+COPY_COMMAND = [sys.executable, "-c", "import shutil, sys; shutil.copy(sys.argv[1], sys.argv[2])", "{source}", "{target}", "{size}"]
+
+
+def cacheFile(folder, name, size, mtime):
+    path = folder / name
+    path.write_bytes(b"x" * size)
+    os.utime(str(path), ns = (mtime, mtime))
+    return str(path)
+
+
+def test_proxyPathIsTheSameForTheSameSourceAndSize(tmp_path):
+    cache = str(tmp_path)
+    path = textureProxies.proxy_path(cache, "/library/rock/Rock_BaseColor.PNG", 512)
+    assert path == textureProxies.proxy_path(cache, "/library/rock/../rock/Rock_BaseColor.PNG", 512)
+    assert path != textureProxies.proxy_path(cache, "/library/rock/Rock_BaseColor.PNG", 256)
+    assert path.startswith(cache + "/") and path.endswith("_512.png")
+    assert textureProxies.proxy_path(cache, "/library/rock/Rock_BaseColor.<UDIM>.exr", 512).endswith("_512.<UDIM>.exr")
+
+def test_evictDeletesTheLeastRecentlyUsedFirst(tmp_path):
+    oldest = cacheFile(tmp_path, "a.png", 100, 1000000000)
+    middle = cacheFile(tmp_path, "b.png", 100, 2000000000)
+    newest = cacheFile(tmp_path, "c.png", 100, 3000000000)
+    assert textureProxies.evict(str(tmp_path), 150) == 200
+    assert [os.path.exists(path) for path in (oldest, middle, newest)] == [False, False, True]
+
+def test_evictNeverDeletesAProxyInUse(tmp_path):
+    oldest = cacheFile(tmp_path, "a.png", 100, 1000000000)
+    middle = cacheFile(tmp_path, "b.png", 100, 2000000000)
+    newest = cacheFile(tmp_path, "c.png", 100, 3000000000)
+    # kept paths are compared however they are written
+    keep = [os.path.join(str(tmp_path), ".", "a.png").replace(os.sep, "/")]
+    assert textureProxies.evict(str(tmp_path), 150, keep) == 200
+    assert [os.path.exists(path) for path in (oldest, middle, newest)] == [True, False, False]
+
+def test_proxyCommandNeedsASize():
+    with pytest.raises(ValueError):
+        textureProxies.proxy_command(COPY_COMMAND[:-1])
+    assert textureProxies.proxy_command(COPY_COMMAND)[-1] == "{size}"
+
+def test_makeProxiesReusesAnUpToDateProxy(tmp_path):
+    source = tmp_path / "Rock_BaseColor.png"
+    source.write_bytes(b"image")
+    cache = tmp_path / "cache"
+    proxies, failures = textureProxies.make_proxies([str(source)], COPY_COMMAND, 64, cache = str(cache), limit = 1 << 20)
+    proxy = proxies[str(source)]
+    assert failures == [] and open(proxy, "rb").read() == b"image"
+    # a proxy newer than its source isn't made again
+    os.utime(str(source), ns = (1000000000, 1000000000))
+    os.utime(proxy, ns = (2000000000, 2000000000))
+    broken = [sys.executable, "-c", "import sys; sys.exit(3)", "{source}", "{target}", "{size}"]
+    assert textureProxies.make_proxies([str(source)], broken, 64, cache = str(cache), limit = 1 << 20) == ({str(source) : proxy}, [])
@@ -0,0 +1,84 @@
+import pytest
+import numpy as np
+
+from mayaPlugins import cmdsProfiler
+from mayaPlugins import standInMaya
+from mayaPlugins import standInMesh
+import undoBevelBenchmark
+
+# the plug-in itself, on the stand-in maya modules the benchmark installs
+UndoBevel = undoBevelBenchmark.UndoBevel
+
+
+@pytest.fixture
+def scene():
+    """A fresh stand-in scene, the callers add their meshes"""
+    cmds = undoBevelBenchmark.CountingCmds(standInMesh.StandInCmds())
+    standInMaya.setCmds(cmds)
+    return cmds
+
+
+def test_undoBevelFacesThroughThePlugin(scene):
+    swept = undoBevelBenchmark.beveledCube(40)
+    scene.cmds.addMesh("bevelMesh", swept.mesh)
+    points, faces = swept.mesh.points.copy(), swept.mesh.faceLoops()
+    scene.select(["bevelMesh.f[%d]" % face for face in swept.chamfers])
+    modifiers = [modifier for plan in UndoBevel.planUndoBevel() for modifier in UndoBevel.applyPlan(plan)]
+    assert (swept.mesh.vertexCount(), swept.mesh.faceCount()) == (44, 42)
+    assert np.allclose(np.abs(swept.mesh.points[:, [0, 2]]), 0.5)
+    # a mesh read costs 2 polyInfo and an xform, applying a plan a setAttr per run of moved vertex ids, a polyDelEdge,
+    # the weld's setAttrs and a polyMergeVertex
+    setAttrs = [command for modifier in modifiers for command in modifier.commands if command.startswith("setAttr")]
+    assert (scene.calls["polyInfo"], scene.calls["xform"], scene.calls["setAttr"], scene.calls["polyDelEdge"], scene.calls["polyMergeVertex"]) == (4, 2, len(setAttrs), 1, 1)
+
+    for modifier in reversed(modifiers):
+        modifier.undoIt()
+    assert np.array_equal(swept.mesh.points, points)
+    assert swept.mesh.faceLoops() == faces
+
+def test_queueMovesOnlyWritesTheMovedVertices(scene):
+    swept = undoBevelBenchmark.beveledCube(40)
+    scene.cmds.addMesh("bevelMesh", swept.mesh)
+    last = swept.mesh.vertexCount() - 1
+    points = swept.mesh.points.copy()
+    modifier = standInMaya.MDGModifier()
+    UndoBevel.clearMeshCache()
+    UndoBevel.queueMoves(modifier, "bevelMesh", [last, 0, 1], points[[last, 0, 1]] + [0.0, 1.0, 0.0])
+    # a run of 2 ids and a run of 1, not every vertex in between
+    assert [command.split()[3] for command in modifier.commands] == ["|bevelMesh|bevelMeshShape.pnts[0:1]", "|bevelMesh|bevelMeshShape.pnts[%d:%d]" % (last, last)]
+    modifier.doIt()
+    assert np.allclose(swept.mesh.points[[0, 1, last]], points[[0, 1, last]] + [0.0, 1.0, 0.0])
+    assert np.array_equal(swept.mesh.points[2:last], points[2:last])
+    modifier.undoIt()
+    assert np.array_equal(swept.mesh.points, points)
+
+@pytest.mark.parametrize("shape", sorted(undoBevelBenchmark.GENERATORS))
+def test_undoBevelAutoFindsEveryBevel(scene, shape):
+    swept = undoBevelBenchmark.GENERATORS[shape](200)
+    scene.cmds.addMesh("bevelMesh", swept.mesh)
+    plans = UndoBevel.planUndoBevelMeshes(["bevelMesh"])
+    assert len(plans[0].deletedEdges) == len(swept.chamfers)
+    faces = swept.mesh.faceCount()
+    UndoBevel.applyPlan(plans[0])
+    assert swept.mesh.faceCount() == faces - len(swept.chamfers)
+    assert len(UndoBevel.planUndoBevelMeshes(["bevelMesh"])[0].deletedEdges) == 0
+
+def test_undoBevelSkipsAWholeObjectSelected(scene):
+    swept = undoBevelBenchmark.beveledCube(4)
+    scene.cmds.addMesh("bevelMesh", swept.mesh)
+    scene.select(["bevelMesh"])
+    assert UndoBevel.planUndoBevel() == []
+
+def test_profilerCountsTheEdgeCacheReads(scene):
+    swept = undoBevelBenchmark.beveledCube(4)
+    scene.cmds.addMesh("bevelMesh", swept.mesh)
+    scene.select(["bevelMesh.f[%d]" % face for face in swept.chamfers])
+    cmdsProfiler.reset()
+    cmdsProfiler.enable()
+    try:
+        UndoBevel.planUndoBevel()
+    finally:
+        cmdsProfiler.disable()
+    calls = dict(((caller["caller"], caller["command"]), caller["calls"]) for caller in cmdsProfiler.results()["callers"])
+    cmdsProfiler.reset()
+    assert calls[("readArrays", "polyInfo")] == 2 and calls[("readPoints", "xform")] == 1